@@ -0,0 +1,79 @@
+"""
+Throughput of DomaNamesService.get_names against a per-name get_name loop.
+
+The GraphQL transport is replaced by a fake with a fixed round-trip latency, so the numbers
+reflect request count rather than network conditions. Run from the repository root:
+
+    python bench/bench_get_names.py [names] [latency_ms]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import caller_graphql  # noqa: E402
+from caller_graphql import DomaGraphQLClient  # noqa: E402
+from doma_names_service import DomaNamesService  # noqa: E402
+from lru_cache import LRUCache  # noqa: E402
+
+
+class _FakeResponse:
+    def __init__(self, obj):
+        self._payload = json.dumps(obj).encode("utf-8")
+
+    def read(self):
+        return self._payload
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def _fake_urlopen(latency, counter):
+    def urlopen(req, timeout):
+        counter[0] += 1
+        time.sleep(latency)
+        payload = json.loads(req.data.decode("utf-8"))
+        variables = payload["variables"]
+        if payload["operationName"] == "Name":
+            return _FakeResponse({"data": {"name": {"name": variables["name"], "tokens": []}}})
+        return _FakeResponse({"data": {k: {"name": v, "tokens": []} for k, v in variables.items()}})
+    return urlopen
+
+
+def main(count=100, latency_ms=80.0):
+    names = [f"name{i}.com" for i in range(count)]
+    counter = [0]
+    caller_graphql.request.urlopen = _fake_urlopen(latency_ms / 1000.0, counter)
+    client = DomaGraphQLClient(api_key="bench")
+
+    service = DomaNamesService(client)
+    start = time.perf_counter()
+    for nm in names:
+        service.get_name(nm)
+    loop_s = time.perf_counter() - start
+    loop_requests, counter[0] = counter[0], 0
+
+    service = DomaNamesService(client, cache=LRUCache(maxsize=count * 2, ttl=60))
+    start = time.perf_counter()
+    service.get_names(names)
+    bulk_s = time.perf_counter() - start
+    bulk_requests, counter[0] = counter[0], 0
+
+    start = time.perf_counter()
+    service.get_names(names)
+    warm_s = time.perf_counter() - start
+    warm_requests = counter[0]
+
+    print(f"{count} names, {latency_ms:.0f} ms per request")
+    print(f"get_name loop     : {loop_requests:4d} requests  {loop_s:8.3f} s  {count / loop_s:10.1f} names/s")
+    print(f"get_names (cold)  : {bulk_requests:4d} requests  {bulk_s:8.3f} s  {count / bulk_s:10.1f} names/s")
+    print(f"get_names (cached): {warm_requests:4d} requests  {warm_s:8.3f} s  {count / max(warm_s, 1e-9):10.1f} names/s")
+
+
+if __name__ == "__main__":
+    main(*(int(a) if i == 0 else float(a) for i, a in enumerate(sys.argv[1:3])))
@@ -0,0 +1,65 @@
+"""
+Rendering a 100-activity response: per-item msg.get(lang).get(...) f-strings grown with +=
+against the precompiled templates. Run from the repository root:
+
+    python bench/bench_templates.py [activities] [rounds]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import msg_loader  # noqa: E402
+import templates as tpl  # noqa: E402
+from doma_name_activities_service import DomaNameActivitiesService  # noqa: E402
+
+
+def _items(count):
+    return [{"__typename": "NameTokenListedActivity", "type": "LISTED", "txHash": f"0x{i:064x}",
+             "createdAt": "2025-01-01T10:00:00.000Z"} for i in range(count)]
+
+
+def render_fstrings(msg, lang, items):
+    response_text = f'{msg.get(lang).get("recent_activities")}:\n\n'
+    for item in items:
+        response_text += (f'{msg.get(lang).get("event")}: '
+                          f'`{DomaNameActivitiesService.space_before_capitals(item.get("__typename"))}`\n'
+                          f'{msg.get(lang).get("status")}: `{item.get("type")}`\n'
+                          f'{msg.get(lang).get("tx_hash")}: `{item.get("txHash")}`\n'
+                          f'{msg.get(lang).get("event_time")}: `{item.get("createdAt").replace("T", " ")[:-5]}`\n\n')
+    return response_text
+
+
+def render_templates(lang, items):
+    rows = [(DomaNameActivitiesService.space_before_capitals(item.get("__typename")),
+             item.get("type"),
+             item.get("txHash"),
+             item.get("createdAt").replace("T", " ")[:-5]) for item in items]
+    return tpl.render(lang, 'recent_activities') + tpl.render_rows(lang, 'activity', rows)
+
+
+def _time(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main(count=100, rounds=2000):
+    os.chdir(ROOT)
+    msg = msg_loader.load_translations()
+    tpl.load_templates(msg)
+    items = _items(count)
+    assert render_fstrings(msg, 'en', items) == render_templates('en', items)
+
+    fstrings_s = _time(lambda: render_fstrings(msg, 'en', items), rounds)
+    templates_s = _time(lambda: render_templates('en', items), rounds)
+    print(f"{count} activities, {rounds} rounds")
+    print(f"f-strings + +=   : {fstrings_s * 1e6:10.1f} us per response")
+    print(f"templates        : {templates_s * 1e6:10.1f} us per response  ({fstrings_s / templates_s:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -1,26 +1,76 @@
-from telethon.sync import TelegramClient
+from telethon import TelegramClient
 from dotenv import load_dotenv
 from mongo import Mongo
 import poll_event_models as pem
 from caller_poll import poll_events, acknowledge_events
+from metrics import MetricsRegistry
+from send_queue import SendQueue
 import msg_loader
-import time
+from datetime import datetime, timezone
+import asyncio
 import os
 
 
-if __name__ == '__main__':
-    load_dotenv()
-    env = os.getenv("ENV")
-    if env == 'live':
-        import config_live
-        config = config_live
-    elif env == 'dev':
-        import config_dev
-        config = config_dev
-    else:
-        import config_test
-        config = config_test
+async def poll_forever(config, msg, db, bot, sender):
+    event_collection = 'doma_events'
+    users_collection = 'telegram_users'
+
+    try:
+        await asyncio.to_thread(db.create_index, event_collection, 'id', unique=True)
+    except Exception as e:
+        # Fails while duplicates from before the index exist; they have to be removed once by hand
+        print(f"Error creating the unique event id index: {e}")
 
+    while True:
+        try:
+            response = await asyncio.to_thread(poll_events, api_key=config.doma_api_key)
+            events = response.get("events") or []
+            last_id = response.get("lastId")
+            has_more = bool(response.get("hasMoreEvents"))
+
+            if events:
+                # Poll events carry no timestamp; stamp receipt time so activities can be served by time
+                now = datetime.now(timezone.utc)
+                received_at = now.strftime('%Y-%m-%dT%H:%M:%S.') + f'{now.microsecond // 1000:03d}Z'
+                for event in events:
+                    event.setdefault('createdAt', received_at)
+                # Upserted by event id: after a crash before the acknowledge, the same events are polled again
+                await asyncio.to_thread(db.insert_new, event_collection, events, 'id')
+                deliveries = []
+                for event in events:
+                    sub_users = await asyncio.to_thread(
+                        lambda: db.find(users_collection, {'subscriptions': { "$in": [event.get("name")] }}).to_list())
+                    if sub_users:
+                        event_data = pem.parse_event_data(event.get('type'), event.get('eventData'))
+                        for u in sub_users:
+                            if event_data:
+                                notification = (f'{msg.get(u.get("language", "en")).get("new_event_alert")} `{event.get("name")}`\n\n'
+                                                f'{pem.dataclass_to_string(event_data)}')
+                            else:
+                                notification = (f'{msg.get(u.get("language", "en")).get("new_event_alert")} `{event.get("name")}`\n\n'
+                                                f'{msg.get(u.get("language", "en")).get("event")}: `{event.get("type")}`')
+                            # Queued: paced per chat, FloodWait only delays that chat and never aborts the cycle
+                            deliveries.append(sender.notify(bot, u.get('user_id'), notification))
+                # Acknowledge only once every notification was delivered (or failed for good), so a crash
+                # in between gets the events polled again instead of losing the alerts
+                await asyncio.gather(*deliveries, return_exceptions=True)
+                if last_id is not None:
+                    await asyncio.to_thread(acknowledge_events, api_key=config.doma_api_key,
+                                            last_event_id=int(last_id))
+                    print(f"Saved and acknowledged {len(events)} events up to id {last_id}; "
+                          f"{len(deliveries)} notifications sent.")
+                if has_more:
+                    continue
+            else:
+                print("No new events received.")
+
+            await asyncio.sleep(config.bg_poll_interval_seconds)
+        except Exception as e:
+            print(f"Error during polling cycle: {e}")
+            await asyncio.sleep(config.bg_poll_interval_seconds)
+
+
+async def main(config):
     msg = msg_loader.load_translations()
 
     db = Mongo(config.db_host, config.db_port, config.db_name)
@@ -31,50 +81,37 @@ if __name__ == '__main__':
     else:
         bot = TelegramClient(session=config.background_name, api_id=config.api_id, api_hash=config.api_hash)
 
-    bot.start(bot_token=config.tg_bot_token)
-
-    event_collection = 'doma_events'
-    users_collection = 'telegram_users'
+    await bot.start(bot_token=config.tg_bot_token)
 
+    # The bot process sends with the same token at send_rate_per_second; the two rates share Telegram's limit
+    sender = SendQueue(global_rate=getattr(config, 'bg_send_rate_per_second', 5),
+                       chat_rate=getattr(config, 'send_chat_rate_per_second', 1),
+                       chat_burst=getattr(config, 'send_chat_burst', 3),
+                       max_in_flight=getattr(config, 'send_max_in_flight', 8),
+                       metrics=MetricsRegistry())
     try:
-        while True:
-            try:
-                response = poll_events(
-                    api_key=config.doma_api_key
-                )
-                events = response.get("events") or []
-                last_id = response.get("lastId")
-                has_more = bool(response.get("hasMoreEvents"))
+        await poll_forever(config, msg, db, bot, sender)
+    finally:
+        # Give queued notifications a chance to go out before disconnecting
+        await sender.drain(timeout=10)
+        db.close()
+        await bot.disconnect()
+
 
-                if events:
-                    db.insert(event_collection, events)
-                    for event in events:
-                        sub_users = db.find(users_collection, {'subscriptions': { "$in": [event.get("name")] }})
-                        if sub_users:
-                            event_data = pem.parse_event_data(event.get('type'), event.get('eventData'))
-                            for u in sub_users:
-                                if event_data:
-                                    notification = (f'{msg.get(u.get("language", "en")).get("new_event_alert")} `{event.get("name")}`\n\n'
-                                                    f'{pem.dataclass_to_string(event_data)}')
-                                else:
-                                    notification = (f'{msg.get(u.get("language", "en")).get("new_event_alert")} `{event.get("name")}`\n\n'
-                                                    f'{msg.get(u.get("language", "en")).get("event")}: `{event.get("type")}`')
-                                bot.send_message(u.get('user_id'), notification)
-                    if last_id is not None:
-                        acknowledge_events(api_key=config.doma_api_key,
-                                           last_event_id=int(last_id))
-                        print(f"Saved and acknowledged {len(events)} events up to id {last_id}.")
-                    if has_more:
-                        continue
-                else:
-                    print("No new events received.")
+if __name__ == '__main__':
+    load_dotenv()
+    env = os.getenv("ENV")
+    if env == 'live':
+        import config_live
+        config = config_live
+    elif env == 'dev':
+        import config_dev
+        config = config_dev
+    else:
+        import config_test
+        config = config_test
 
-                time.sleep(config.bg_poll_interval_seconds)
-            except Exception as e:
-                print(f"Error during polling cycle: {e}")
-                time.sleep(config.bg_poll_interval_seconds)
+    try:
+        asyncio.run(main(config))
     except KeyboardInterrupt:
         print("Poll worker interrupted; shutting down.")
-    finally:
-        db.close()
-        bot.disconnect()
\ No newline at end of file
@@ -1,18 +1,28 @@
+import time
+# Taken before the heavy imports so the startup profile includes them
+startup_started = time.perf_counter()
 from telethon import TelegramClient, events
+import asyncio
+import functools
 import os
 from dotenv import load_dotenv
-from mongo import Mongo
-from pymongo.errors import OperationFailure
 import nav
-from tg_users_service import TelegramUserManager
-from doma_names_service import DomaNamesService
+import callback_codec as cc
 from doma_name_activities_service import DomaNameActivitiesService
-from doma_listings_service import DomaListingsService
-from doma_offers_service import DomaOffersService
-from caller_graphql import DomaGraphQLClient
-from gemini_client import GeminiClient
+from services import ServiceContainer
+from tracing import traced, sample_loop_lag
+from inflight import deduplicated
+from rate_limit import limited, BUSY
+from router import CallbackRouter
+from conversation_state import PromptRouter
+from fanout import gather_within
 import msg_loader
+from startup import StartupProfile
+import templates as tpl
+from lru_cache import MISSING
 
+profile = StartupProfile(startup_started)
+profile.mark('imports')
 
 # Environment detection
 load_dotenv()
@@ -29,12 +39,16 @@ else:
 
 # Load the message file
 
-msg = msg_loader.load_translations()
+msg = msg_loader.load_translations(cache_file=getattr(config, 'translations_cache_file', None))
+# Static keyboards are built once per language and shared by every reply
+nav.load_keyboards(msg)
+# Handler texts are compiled once per language too
+tpl.load_templates(msg)
+profile.mark('translations')
 
-# Connect to database
-db = Mongo(config.db_host, config.db_port, config.db_name)
-tum = TelegramUserManager(db, 'telegram_users')
-dgc = DomaGraphQLClient(api_key=config.doma_api_key)
+# Shared clients, caches and services, built once and reused by every handler
+services = ServiceContainer(config)
+tum = services.users
 
 # Initialize Telegram client
 if config.proxy:
@@ -43,286 +57,583 @@ if config.proxy:
 else:
     bot = TelegramClient(session=config.session_name, api_id=config.api_id, api_hash=config.api_hash)
 
-try:
-    db.insert('counters', {"_id": "caip10", "seq": 0})
-except OperationFailure:
-    # The document already exists, which is fine
-    pass
+# Follow events stored by bg_poll.py to keep in-memory books current
+services.feed.start_from_latest()
+# Built now so they are subscribed to the feed before follow_events dispatches anything
+services.listings_book.begin_load()
+services.commands
+services.token_activities
+profile.mark('feed')
+
+
+async def load_listings():
+    # The book starts empty and is filled once the subgraph answers, so an outage does not stop the bot
+    delay = 5
+    while True:
+        try:
+            items = await services.run_doma(services.listings_book.fetch, services.listings)
+        except Exception as e:
+            print(f"Error loading listings, retrying in {delay}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 300)
+            continue
+        print(f'{services.listings_book.load(items)} listings loaded')
+        break
+    # One batched request fills the name cache for the pages users open first
+    names = services.hot_names()
+    if names:
+        try:
+            await services.run_doma(services.names.get_names, names)
+        except Exception as e:
+            print(f"Error warming names: {e}")
+
+
+async def follow_events():
+    while True:
+        try:
+            # Read in the Mongo pool, apply on the loop so books are only mutated from one thread
+            stored = await services.run_mongo(services.feed.fetch)
+            services.feed.apply(stored)
+            # Handlers only touch memory; their Mongo writes and name misses go through the pool
+            await services.run_mongo(services.token_cache.flush)
+            unnamed = services.listings_book.unnamed()
+            if unnamed:
+                names = await services.run_mongo(services.token_cache.names_for, unnamed)
+                services.listings_book.apply_names(names)
+        except Exception as e:
+            print(f"Error following events: {e}")
+        await asyncio.sleep(getattr(config, 'event_feed_interval_seconds', 5))
+
+
+async def refresh_name_stats():
+    while True:
+        try:
+            await services.run_doma(services.name_stats.refresh, services.offers)
+        except Exception as e:
+            print(f"Error refreshing name statistics: {e}")
+        await asyncio.sleep(getattr(config, 'name_stats_refresh_seconds', 10))
+
+
+async def refresh_token_history():
+    # Token histories are brought up to date from the feed here, never on a tap
+    while True:
+        try:
+            await services.run_doma(services.token_activities.refresh_stale,
+                                    getattr(config, 'token_history_refresh_batch', 20))
+        except Exception as e:
+            print(f"Error refreshing token activities: {e}")
+        await asyncio.sleep(getattr(config, 'token_history_refresh_seconds', 30))
+
+
+async def preload_ai():
+    # The AI SDK is imported lazily; load it in the AI pool once the bot is up so the first consult does not wait
+    try:
+        await services.run_ai(lambda: services.ai)
+    except Exception as e:
+        print(f"Error loading the AI client: {e}")
+
+
+async def respond(event, *args, **kwargs):
+    # All replies go through the shared send queue, which paces them per chat and handles FloodWait
+    return await services.sender.call(event.chat_id, functools.partial(event.respond, *args, **kwargs))
+
+
+async def get_user(sender_id):
+    # Most taps are answered from the user cache without a trip to the Mongo pool
+    user_info = tum.cached_user(sender_id)
+    if user_info is MISSING:
+        user_info = await services.run_mongo(tum.get_user, sender_id)
+    return user_info
+
+
+async def user_language(sender_id):
+    user_info = await get_user(sender_id)
+    return user_info.get('language', 'en')
+
+
+async def token_id_of(name):
+    # Memory first, then MongoDB on its pool; only names never seen before go to the subgraph
+    token_cache = services.token_cache
+    found = token_cache.cached(name)
+    if found is MISSING:
+        found = await services.run_mongo(token_cache.stored, name)
+    if found is MISSING:
+        found = await services.run_doma(token_cache.fetch, name)
+    return found[0] if found else None
+
+
+async def expired_button(event, error):
+    # Hashed callback fields are only known to the process that built the buttons
+    lang = await user_language(event.sender_id)
+    await event.answer(tpl.render(lang, 'button_expired'), alert=True)
+
+
+async def reject(event, reason):
+    # Rate-limited or shed requests: a popup for taps, a message for typed input
+    lang = await user_language(event.sender_id)
+    text = tpl.render(lang, reason)
+    if isinstance(event, events.CallbackQuery.Event):
+        await event.answer(text, alert=True)
+    else:
+        await respond(event, text)
+
+
+async def names_page(event, lang, the_filter, in_place=False, **query):
+    # While the Doma pool is overloaded, cached pages are still served but no new search is started
+    dns = services.names
+    if services.shedder.overloaded(services.doma_executor):
+        result = dns.cached_names_page(**query)
+        if result is MISSING:
+            await reject(event, BUSY)
+            return None
+    else:
+        result = MISSING
+    if in_place:
+        # Stop the button spinner now; the results replace the tapped message instead of a 'searching' note
+        await event.answer()
+    elif result is MISSING:
+        await respond(event, tpl.render(lang, 'searching', the_filter))
+    if result is MISSING:
+        result = await services.run_doma(dns.get_names_page, **query)
+    return result
+
+
+# Every button tap goes through one CallbackQuery handler and is routed by its data prefix
+router = CallbackRouter(on_invalid=expired_button, on_unknown=lambda event: event.answer())
+
+
+@bot.on(events.CallbackQuery())
+async def on_callback(event):
+    await router.dispatch(event)
+
+
+# Answers to bot questions ('enter a filter', ...) are routed by the sender's stored prompt state
+prompts = PromptRouter()
 
 
 @bot.on(events.NewMessage(pattern='/start', incoming=True))
-@bot.on(events.CallbackQuery(data=b'main_menu'))
+@router.route(b'main_menu')
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
 async def start(event):
-    user_info = tum.get_user(event.sender_id)
+    user_info = await get_user(event.sender_id)
     if not user_info:
-        text = f'{msg.get('en').get("change_language_1")}:'
-        buttons = nav.get_language_buttons(msg.get('en'))
-        await event.respond(text, buttons=buttons)
+        text = tpl.render('en', 'choose_language')
+        buttons = nav.keyboards('en').language
+        await respond(event, text, buttons=buttons)
     else:
-        lang = tum.get_user(event.sender_id).get('language', 'en')
-        text = f'{msg.get(lang).get("main_menu_1")}! {msg.get(lang).get("main_menu_2")}?'
+        lang = user_info.get('language', 'en')
+        text = tpl.render(lang, 'main_menu')
         if event.sender_id in config.admin_list:
-            await event.respond(text, bottons=nav.get_start_admin_buttons(msg.get(lang)))
+            await respond(event, text, buttons=nav.keyboards(lang).start_admin)
         else:
-            await event.respond(text, buttons=nav.get_start_user_buttons(msg.get(lang)))
+            await respond(event, text, buttons=nav.keyboards(lang).start_user)
 
 
-@bot.on(events.CallbackQuery(pattern=b'about'))
+@router.route(b'about')
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
 async def about(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    text = f'{msg.get(lang).get("about_1")}\n\n{msg.get(lang).get("about_2")}'
-    buttons = nav.get_main_menu_button(msg.get(lang))
-    await event.respond(text, buttons=buttons)
+    lang = await user_language(event.sender_id)
+    text = tpl.render(lang, 'about')
+    buttons = nav.keyboards(lang).main_menu
+    await respond(event, text, buttons=buttons)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'settings'))
+@router.route(b'settings')
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
 async def settings(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    text = f'{msg.get(lang).get("change_language_1")}:'
-    buttons = nav.get_language_buttons(msg.get(lang))
-    buttons.append(nav.get_main_menu_button(msg.get(lang)))
-    await event.respond(text, buttons=buttons)
+    lang = await user_language(event.sender_id)
+    text = tpl.render(lang, 'choose_language')
+    buttons = nav.keyboards(lang).settings
+    await respond(event, text, buttons=buttons)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'manage_subscription:.*'))
-async def manage_subscription(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    page = int(event.data.decode().split(':')[1])
-    sub_list = tum.list_subscriptions(event.sender_id)
+@router.route(b'manage_subscription', int)
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
+async def manage_subscription(event, page=1):
+    await event.answer()
+    user_info = await get_user(event.sender_id)
+    lang = user_info.get('language', 'en')
+    sub_list = list(user_info.get('subscriptions', []))
     if sub_list:
         msg_text, buttons = nav.list_domains(msg.get(lang), sub_list,
                                    page=page,
-                                   prefix='info_sub',
+                                   prefix=cc.INFO_SUB,
                                    list_prefix='manage_subscription')
-        text = f'{msg.get(lang).get("manage_subscription_1")}. {msg.get(lang).get("manage_subscription_2")}.'
+        text = tpl.render(lang, 'manage_subscription')
     else:
-        text = f'{msg.get(lang).get("manage_subscription_x1")}. {msg.get(lang).get("manage_subscription_x2")}.'
-        buttons = nav.get_main_menu_button(msg.get(lang))
-    await event.respond(text, buttons=buttons)
+        text = tpl.render(lang, 'no_subscription')
+        buttons = nav.keyboards(lang).main_menu
+    await services.editor.edit(event, text, buttons)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'info_sub:.*'))
-async def info_subscription(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    domain = event.data.decode().split(':')[1]
-    text = f'{msg.get(lang).get("info_subscription_1")} `{domain}`. {msg.get(lang).get("info_subscription_2")}?'
+@router.route(cc.INFO_SUB)
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
+async def info_subscription(event, domain):
+    lang = await user_language(event.sender_id)
+    text = tpl.render(lang, 'info_subscription', domain)
     buttons = [nav.get_remove_subscription_button(msg.get(lang), domain),
-               nav.get_main_menu_button(msg.get(lang))]
-    await event.respond(text, buttons=buttons)
+               nav.keyboards(lang).main_menu]
+    await respond(event, text, buttons=buttons)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'remove_sub:.*'))
-async def remove_subscription(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    domain = event.data.decode().split(':')[1]
-    result = tum.remove_subscription(event.sender_id, domain)
+@router.route(cc.REMOVE_SUB)
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
+async def remove_subscription(event, domain):
+    lang = await user_language(event.sender_id)
+    result = await services.run_mongo(tum.remove_subscription, event.sender_id, domain)
     if result.modified_count > 0:
-        await event.respond(f'{msg.get(lang).get("remove_subscription_1")}.', buttons=nav.get_main_menu_button(msg.get(lang)))
+        await respond(event, tpl.render(lang, 'subscription_removed'), buttons=nav.keyboards(lang).main_menu)
     else:
-        await event.respond(f'{msg.get(lang).get("remove_subscription_2")}.', buttons=nav.get_main_menu_button(msg.get(lang)))
+        await respond(event, tpl.render(lang, 'subscription_not_found'), buttons=nav.keyboards(lang).main_menu)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'change_language'))
+@router.route(b'change_language')
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
 async def change_language(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    text = f'{msg.get(lang).get("change_language_1")}:'
-    buttons = nav.get_language_buttons(msg.get(lang))
-    await event.respond(text, buttons=buttons)
+    lang = await user_language(event.sender_id)
+    text = tpl.render(lang, 'choose_language')
+    buttons = nav.keyboards(lang).language
+    await respond(event, text, buttons=buttons)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'language:.*'))
-async def language(event):
-    language_selected = event.data.decode().split(':')[1]
-    user_info = tum.get_user(event.sender_id)
+@router.route(b'language', str)
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
+async def language(event, language_selected):
+    user_info = await get_user(event.sender_id)
     if not user_info:
-        tum.save_user(event.sender_id, language=language_selected)
+        await services.run_mongo(tum.save_user, event.sender_id, language=language_selected)
     else:
-        tum.update_user(event.sender_id, {'language': language_selected})
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    await event.respond(f'{msg.get(lang).get("change_language_2")}.', buttons=nav.get_main_menu_button(msg.get(lang)))
+        await services.run_mongo(tum.update_user, event.sender_id, {'language': language_selected})
+    lang = await user_language(event.sender_id)
+    await respond(event, tpl.render(lang, 'language_changed'), buttons=nav.keyboards(lang).main_menu)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'ai_consult'))
+async def search_keywords(chat_id, status, lang, keywords):
+    # One capped page per keyword, all at once; whatever is back at the deadline is used
+    cap = getattr(config, 'ai_keyword_cap', 20)
+    searches = {word: services.run_doma(services.names.get_names_page, name_filter=word, page_size=cap)
+                for word in dict.fromkeys(keywords) if word}
+    last_edit = 0.0
+
+    async def progress(finished, total):
+        nonlocal last_edit
+        now = asyncio.get_running_loop().time()
+        if finished < total and now - last_edit < 1.0:
+            return
+        last_edit = now
+        await services.sender.call(chat_id, functools.partial(
+            status.edit, tpl.render(lang, 'ai_searching_progress', finished, total)))
+
+    results, errors, timed_out = await gather_within(
+        searches, getattr(config, 'ai_search_deadline_seconds', 20), on_progress=progress)
+    for word, error in errors.items():
+        print(f"Error searching names for '{word}': {error}")
+    if timed_out:
+        print(f"Name search deadline reached, skipped: {', '.join(timed_out)}")
+    return [results[word]['names'] for word in searches if word in results]
+
+
+async def ask(event, state, text, ttl=None, **data):
+    # The answer arrives later through on_prompt_reply; nothing waits for it in the meantime
+    await services.run_mongo(services.conversations.set, event.sender_id, state, data, ttl)
+    await respond(event, text)
+
+
+@router.route(b'ai_consult')
+@deduplicated(services.taps, services.metrics)
+@limited(services.limiter, 'search', on_reject=reject)
+@traced(services.metrics)
 async def ai_consult(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    gc = GeminiClient(config.gemini_api_key, config.ai_model)
-    dns = DomaNamesService(dgc, api_key=config.doma_api_key)
-    ask_for_filter = f'{msg.get(lang).get('ai_consult_1')}. {msg.get(lang).get('ai_consult_2')}:\n`{msg.get(lang).get('ai_consult_3')}`'
-    async with bot.conversation(event.sender_id, timeout=2400) as conv:
-        await conv.send_message(ask_for_filter)
-        response_filter = await conv.get_response()
-        user_prompt = response_filter.text
-        await conv.send_message(f'{msg.get(lang).get('ai_is_searching_1')}... {msg.get(lang).get('ai_is_searching_2')}.')
-        keywords = gc.gen_augment_keyword(user_prompt)
-        domains = []
-        for word in keywords:
-            try:
-                domains.append(dns.get_names_by_name(name_filter=word))
-            except:
-                pass
-        ai_domains = gc.gen_suggest_domain(user_prompt, domains)
-        text, buttons = nav.list_domains(msg.get(lang), ai_domains)
-        await conv.send_message(text, buttons=buttons)
+    lang = await user_language(event.sender_id)
+    await ask(event, 'ai_consult', tpl.render(lang, 'ai_consult'))
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'search_domain'))
+@prompts.route('ai_consult')
+@limited(services.limiter, 'ai', on_reject=reject, shedder=services.shedder, pool=services.ai_executor)
+@traced(services.metrics)
+async def ai_consult_reply(event, user_prompt):
+    # The keyword searches run on the Doma pool, which is shed here; the AI pool is shed by @limited
+    if services.shedder.overloaded(services.doma_executor):
+        await reject(event, BUSY)
+        return
+    lang = await user_language(event.sender_id)
+    gc = services.ai
+    status = await respond(event, tpl.render(lang, 'ai_searching'))
+    ai_timeout = getattr(config, 'ai_call_timeout_seconds', 30)
+    try:
+        keywords = await asyncio.wait_for(services.run_ai(gc.gen_augment_keyword, user_prompt), ai_timeout)
+    except Exception as e:
+        print(f"Error generating keywords: {e}")
+        keywords = [user_prompt]
+    domains = await search_keywords(event.chat_id, status, lang, keywords)
+    try:
+        ai_domains = await asyncio.wait_for(
+            services.run_ai(gc.gen_suggest_domain, user_prompt, domains), ai_timeout)
+    except Exception as e:
+        # Fall back to the raw matches so the user still gets an answer in bounded time
+        print(f"Error suggesting domains: {e}")
+        ai_domains = list(dict.fromkeys(name for names in domains for name in names))[:10]
+    text, buttons = nav.list_domains(msg.get(lang), ai_domains)
+    await respond(event, text, buttons=buttons)
+
+
+@router.route(b'search_domain')
+@deduplicated(services.taps, services.metrics)
+@limited(services.limiter, 'search', on_reject=reject)
+@traced(services.metrics)
 async def search_domain(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    dns = DomaNamesService(dgc, api_key=config.doma_api_key)
-    ask_for_filter = f'{msg.get(lang).get('enter_a_filter_string_1')}. {msg.get(lang).get('enter_a_filter_string_2')}.'
-    async with bot.conversation(event.sender_id) as conv:
-        await conv.send_message(ask_for_filter)
-        response_filter = await conv.get_response()
-        the_filter = response_filter.text
-        await conv.send_message(f'{msg.get(lang).get('searching')} `{the_filter}`...')
-        domains = dns.get_names_by_name(name_filter=the_filter)
-        text, buttons = nav.list_domains(msg.get(lang), domains, the_filter)
-        await conv.send_message(text, buttons=buttons)
+    lang = await user_language(event.sender_id)
+    await ask(event, 'search_domain', tpl.render(lang, 'enter_filter'),
+              ttl=getattr(config, 'search_prompt_ttl_seconds', 60))
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'find_domains_by_owner'))
+@prompts.route('search_domain')
+@limited(services.limiter, 'search', cost=2, on_reject=reject)
+@traced(services.metrics)
+async def search_domain_reply(event, the_filter):
+    lang = await user_language(event.sender_id)
+    result = await names_page(event, lang, the_filter, name_filter=the_filter)
+    if result is None:
+        return
+    text, buttons = nav.list_domains(msg.get(lang), result['names'], the_filter, total=result['totalCount'])
+    await respond(event, text, buttons=buttons)
+
+
+@router.route(b'find_domains_by_owner')
+@deduplicated(services.taps, services.metrics)
+@limited(services.limiter, 'search', on_reject=reject)
+@traced(services.metrics)
 async def find_domains_by_owner(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    dns = DomaNamesService(dgc, api_key=config.doma_api_key)
-    ask_for_filter = f'{msg.get(lang).get('enter_a_caip10_address_1')}. {msg.get(lang).get('enter_a_caip10_address_2')}.'
-    async with bot.conversation(event.sender_id) as conv:
-        await conv.send_message(ask_for_filter)
-        response_filter = await conv.get_response()
-        the_filter = response_filter.text
-        await conv.send_message(f'{msg.get(lang).get('searching')} `{the_filter}`...')
-        domains = dns.get_names_by_owner(owner_address_caip10=the_filter)
-        if len(domains) > 10:
-            address_exists = db.find('caip10_addresses', {'address' : the_filter})
-            address_list = address_exists.to_list()
-            if len(address_list) == 0:
-                next_id = db.get_next_sequence_value("caip10")
-                db.insert('caip10_addresses',
-                          {'address': the_filter,
-                                '_id': next_id})
-                address_id = next_id
-            else:
-                address_id = str(address_list[0]['_id'])
-        else:
-            address_id = '0'
-        text, buttons = nav.list_domains(msg.get(lang), domains, address_id, list_prefix='page_owner')
-        await conv.send_message(text, buttons=buttons)
+    lang = await user_language(event.sender_id)
+    await ask(event, 'find_domains_by_owner', tpl.render(lang, 'enter_caip10'),
+              ttl=getattr(config, 'search_prompt_ttl_seconds', 60))
+    raise events.StopPropagation
+
+
+@prompts.route('find_domains_by_owner')
+@limited(services.limiter, 'search', cost=2, on_reject=reject)
+@traced(services.metrics)
+async def find_domains_by_owner_reply(event, the_filter):
+    lang = await user_language(event.sender_id)
+    result = await names_page(event, lang, the_filter, owner_address_caip10=the_filter)
+    if result is None:
+        return
+    # The address travels in the page buttons themselves (see callback_codec)
+    text, buttons = nav.list_domains(msg.get(lang), result['names'], the_filter, list_prefix=cc.PAGE_OWNER,
+                                     total=result['totalCount'])
+    await respond(event, text, buttons=buttons)
+
+
+def is_prompt_reply(event):
+    # Plain text in the private chat; commands and messages sent through inline mode are not answers
+    return event.is_private and not event.via_bot_id and not (event.raw_text or '').startswith('/')
+
+
+@bot.on(events.NewMessage(incoming=True, func=is_prompt_reply))
+@traced(services.metrics)
+async def on_prompt_reply(event):
+    store = services.conversations
+    pending = store.cached(event.sender_id)
+    if pending is MISSING:
+        await services.run_mongo(store.get, event.sender_id)
+        # Read again: another message may have taken the prompt while this one waited
+        pending = store.cached(event.sender_id)
+    if pending is None or pending is MISSING:
+        return
+    # Cleared in the cache before any await so a second message is not taken as another answer
+    store.cache.put(event.sender_id, None)
+    await services.run_mongo(store.delete, event.sender_id)
+    await prompts.dispatch(event, pending)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'page_domain:.*'))
-async def page_domain(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    search_word = event.data.decode().split(':')[1]
-    page = int(event.data.decode().split(':')[2])
-    dns = DomaNamesService(dgc, api_key=config.doma_api_key)
+@router.route(cc.PAGE_DOMAIN)
+@deduplicated(services.taps, services.metrics)
+@limited(services.limiter, 'search', on_reject=reject)
+@traced(services.metrics)
+async def page_domain(event, search_word, page):
+    lang = await user_language(event.sender_id)
     the_filter = search_word
-    await event.respond(f'{msg.get(lang).get('searching')} `{the_filter}`...')
-    domains = dns.get_names_by_name(name_filter=the_filter)
-    text, buttons = nav.list_domains(msg.get(lang), domains, the_filter, page=page)
-    await event.respond(text, buttons=buttons)
+    result = await names_page(event, lang, the_filter, in_place=True, name_filter=the_filter, page=page)
+    if result is None:
+        raise events.StopPropagation
+    text, buttons = nav.list_domains(msg.get(lang), result['names'], the_filter, page=page,
+                                     total=result['totalCount'])
+    await services.editor.edit(event, text, buttons)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'page_owner:.*'))
-async def page_owner(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    address_id = event.data.decode().split(':')[1]
-    page = int(event.data.decode().split(':')[2])
-    dns = DomaNamesService(dgc, api_key=config.doma_api_key)
-    the_filter_cursor = db.find('caip10_addresses', {'_id' : int(address_id)})
-    the_filter = the_filter_cursor.to_list()[0]['address']
-    await event.respond(f'{msg.get(lang).get('searching')} `{the_filter}`...')
-    domains = dns.get_names_by_owner(owner_address_caip10=the_filter)
-    text, buttons = nav.list_domains(msg.get(lang), domains, address_id, page=page, list_prefix='page_owner')
-    await event.respond(text, buttons=buttons)
+@router.route(cc.PAGE_OWNER)
+@deduplicated(services.taps, services.metrics)
+@limited(services.limiter, 'search', on_reject=reject)
+@traced(services.metrics)
+async def page_owner(event, the_filter, page):
+    lang = await user_language(event.sender_id)
+    result = await names_page(event, lang, the_filter, in_place=True, owner_address_caip10=the_filter, page=page)
+    if result is None:
+        raise events.StopPropagation
+    text, buttons = nav.list_domains(msg.get(lang), result['names'], the_filter, page=page, list_prefix=cc.PAGE_OWNER,
+                                     total=result['totalCount'])
+    await services.editor.edit(event, text, buttons)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'info_domain:.*'))
-async def page_domain(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    domain = event.data.decode().split(':')[1]
-    dns = DomaNamesService(dgc, api_key=config.doma_api_key)
-    d = dns.get_name(domain)
-    response_text, buttons = nav.info_domain(msg.get(lang), d)
-    await event.respond(response_text, buttons=buttons)
+@router.route(cc.INFO_DOMAIN)
+@deduplicated(services.taps, services.metrics)
+@limited(services.limiter, 'search', on_reject=reject, shedder=services.shedder, pool=services.doma_executor)
+@traced(services.metrics)
+async def info_domain(event, domain):
+    lang = await user_language(event.sender_id)
+    dns = services.names
+    d = await services.run_doma(dns.get_name, domain)
+    token_id = (d.get('tokens') or [{}])[0].get('tokenId')
+    response_text, buttons = nav.info_domain(msg.get(lang), d, stats=services.name_stats.get(token_id))
+    await respond(event, response_text, buttons=buttons)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'get_recent_listing'))
-async def get_recent_listing(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    dls = DomaListingsService(dgc, api_key=config.doma_api_key)
-    response_text = f'{msg.get(lang).get("last_week_domains")}:\n\n'
-    text, buttons = nav.list_listings(msg.get(lang), dls, text=response_text)
-    await event.respond(text, buttons=buttons)
+@router.route(b'get_recent_listing', int)
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
+async def get_recent_listing(event, page=1):
+    lang = await user_language(event.sender_id)
+    response_text = tpl.render(lang, 'last_week_domains')
+    text, buttons = nav.list_listings(msg.get(lang), services.listings_book, text=response_text, page=page)
+    await respond(event, text, buttons=buttons)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'get_recent_offers:.*'))
-async def get_recent_offers(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    name = event.data.decode().split(':')[1]
-    dns = DomaNamesService(dgc, api_key=config.doma_api_key)
-    name_info = dns.get_name(name)
-    tokens = name_info.get('tokens', [])
-    if len(tokens) > 0:
-        token_id = tokens[0].get('tokenId', '')
-        dos = DomaOffersService(dgc, api_key=config.doma_api_key)
-        x = dos.get_offers(token_id=token_id)
-        counter = 0
-        response_text = f'{len(x.get('items', []))} offers so far\n\n'
-        for item in x.get('items', []):
-            price = int(item.get('price', 0))
-            symbol = item.get('currency', {}).get('symbol', '???')
-            decimals = int(item.get('currency', {}).get('decimals', '0'))
-            counter += 1
-            if round(price / (10 ** decimals)) > 10 ** 12:
-                pretty_price = round(price / (10 ** decimals))
-            else:
-                pretty_price = round(price / (10 ** decimals), 4)
-            response_text += f'#{counter}: {pretty_price} {symbol}\n'
-        await event.respond(response_text, buttons=nav.get_main_menu_button(msg.get(lang)))
+@router.route(cc.RECENT_OFFERS)
+@deduplicated(services.taps, services.metrics)
+@limited(services.limiter, 'search', on_reject=reject, shedder=services.shedder, pool=services.doma_executor)
+@traced(services.metrics)
+async def get_recent_offers(event, name):
+    lang = await user_language(event.sender_id)
+    token_id = await token_id_of(name)
+    if token_id:
+        offer_book = services.offer_book
+        if not offer_book.is_seeded(token_id):
+            # Fetched into a private book in the pool, installed here so the book is only changed on the loop;
+            # events arriving meanwhile are buffered and replayed by install()
+            offer_book.begin_seed(token_id)
+            try:
+                fetched = await services.run_doma(offer_book.fetch, token_id, services.offers)
+            except Exception:
+                offer_book.abort_seed(token_id)
+                raise
+            offer_book.install(token_id, fetched)
+        response_text = nav.list_offers(offer_book.depth(token_id, limit=50), offer_book.count(token_id))
+        await respond(event, response_text, buttons=nav.keyboards(lang).main_menu)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'get_recent_activities:.*'))
-async def get_recent_activities(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    name = event.data.decode().split(':')[1]
-    dnas = DomaNameActivitiesService(dgc, api_key=config.doma_api_key)
-    na = dnas.get_name_activities(name)
+@router.route(cc.RECENT_ACTIVITIES)
+@deduplicated(services.taps, services.metrics)
+@limited(services.limiter, 'search', on_reject=reject, shedder=services.shedder, pool=services.doma_executor)
+@traced(services.metrics)
+async def get_recent_activities(event, name):
+    lang = await user_language(event.sender_id)
+    na = await services.run_doma(services.name_activities.get_local_name_activities, name, take=10)
     items_list = na.get('items', [])
-    response_text = f'{msg.get(lang).get("recent_activities")}:\n\n'
-    for item in items_list:
-        response_text += (f'{msg.get(lang).get("event")}: '
-                          f'`{DomaNameActivitiesService.space_before_capitals(item.get("__typename"))}`\n'
-                          f'{msg.get(lang).get("status")}: `{item.get("type")}`\n'
-                          f'{msg.get(lang).get("tx_hash")}: `{item.get("txHash")}`\n'
-                          f'{msg.get(lang).get("event_time")}: `{item.get("createdAt").replace("T", " ")[:-5]}`\n\n')
-    await event.respond(response_text, buttons=nav.get_main_menu_button(msg.get(lang)))
+    rows = [(DomaNameActivitiesService.space_before_capitals(item.get("__typename")),
+             item.get("type"),
+             item.get("txHash"),
+             (item.get("createdAt") or "").replace("T", " ")[:-5]) for item in items_list]
+    response_text = tpl.render(lang, 'recent_activities') + tpl.render_rows(lang, 'activity', rows)
+    await respond(event, response_text, buttons=nav.keyboards(lang).main_menu)
     raise events.StopPropagation
 
 
-@bot.on(events.CallbackQuery(pattern=b'subscribe:.*'))
-async def subscribe(event):
-    lang = tum.get_user(event.sender_id).get('language', 'en')
-    name = event.data.decode().split(':')[1]
-    sub_list = tum.list_subscriptions(event.sender_id)
+@router.route(cc.SUBSCRIBE)
+@deduplicated(services.taps, services.metrics)
+@traced(services.metrics)
+async def subscribe(event, name):
+    user_info = await get_user(event.sender_id)
+    lang = user_info.get('language', 'en')
+    sub_list = user_info.get('subscriptions', [])
     if name not in sub_list:
-        tum.add_subscription(event.sender_id, name)
-        await event.respond(f'{msg.get(lang).get("sub_added")}.', buttons=nav.get_main_menu_button(msg.get(lang)))
+        await services.run_mongo(tum.add_subscription, event.sender_id, name)
+        await respond(event, tpl.render(lang, 'sub_added'), buttons=nav.keyboards(lang).main_menu)
     else:
-        await event.respond(f'{msg.get(lang).get("sub_already_existed")}!', buttons=nav.get_main_menu_button(msg.get(lang)))
+        await respond(event, tpl.render(lang, 'sub_already_existed'), buttons=nav.keyboards(lang).main_menu)
+    raise events.StopPropagation
+
+
+@bot.on(events.InlineQuery())
+@traced(services.metrics)
+async def inline_search(event):
+    # '@bot <filter>': one answer per page instead of a conversation per search
+    try:
+        offset = int(event.offset or 0)
+    except ValueError:
+        offset = 0
+    found = MISSING
+    if services.shedder.overloaded(services.doma_executor):
+        # Only cached result sets are served while the Doma pool is overloaded
+        found = services.inline_search.cached_search(event.text, offset)
+        if found is MISSING:
+            await event.answer([], cache_time=0)
+            return
+    try:
+        if found is MISSING:
+            found = await services.run_doma(services.inline_search.search, event.text, offset)
+        names, next_offset = found
+    except Exception as e:
+        print(f"Error answering inline query '{event.text}': {e}")
+        names, next_offset = [], None
+    await event.answer(nav.inline_domains(event.builder, names),
+                       cache_time=getattr(config, 'inline_cache_time_seconds', 60),
+                       next_offset=str(next_offset) if next_offset is not None else None)
+
+
+@bot.on(events.NewMessage(pattern=r'/command(?:\s+(\S+))?\s*$', incoming=True))
+@limited(services.limiter, 'search', on_reject=reject)
+@traced(services.metrics)
+async def track_command(event):
+    # Follows a command (tokenization, claim, ...) from COMMAND_* events; the subgraph is only a fallback
+    lang = await user_language(event.sender_id)
+    correlation_id = event.pattern_match.group(1)
+    if not correlation_id:
+        await respond(event, tpl.render(lang, 'command_usage'))
+        raise events.StopPropagation
+    tracker = services.commands
+    state = tracker.status(correlation_id)
+    if not tracker.is_terminal(state):
+        await respond(event, tpl.render(lang, 'command_waiting', correlation_id))
+        try:
+            state = await tracker.wait(correlation_id, timeout=getattr(config, 'command_wait_seconds', 300))
+        except asyncio.TimeoutError:
+            state = tracker.status(correlation_id)
+    state = state or {}
+    await respond(event, tpl.render(lang, 'command_status', correlation_id, state.get('status') or '-',
+                                    state.get('failureReason') or '-'))
+    raise events.StopPropagation
+
+
+@bot.on(events.NewMessage(pattern='/metrics', incoming=True))
+async def show_metrics(event):
+    if event.sender_id not in config.admin_list:
+        return
+    dump = services.metrics.render() or '-'
+    # Telegram messages are limited to 4096 characters
+    await respond(event, f'```\n{dump[:4000]}\n```')
     raise events.StopPropagation
 
 
@@ -330,8 +641,18 @@ async def subscribe(event):
 try:
     print('bot starting...')
     bot.start(bot_token=config.tg_bot_token)
-    print('bot started')
+    profile.mark('telegram')
+    # Updates that arrive meanwhile wait in Telethon's queue and are handled once the loop runs
+    services.warm_up(profile)
+    bot.loop.create_task(follow_events())
+    bot.loop.create_task(load_listings())
+    bot.loop.create_task(refresh_name_stats())
+    bot.loop.create_task(refresh_token_history())
+    bot.loop.create_task(sample_loop_lag(services.metrics, getattr(config, 'loop_lag_interval_seconds', 0.5)))
+    bot.loop.create_task(preload_ai())
+    profile.publish(services.metrics)
+    print(f'bot started\n{profile.report()}')
     bot.run_until_disconnected()
 finally:
-    db.close()
+    services.close()
     print('bot stopped')
\ No newline at end of file
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+from typing import List, Optional, Tuple, Union
+
+from lru_cache import LRUCache, MISSING
+
+__all__ = [
+    "CallbackCodec",
+    "CallbackExpired",
+    "encode_callback",
+    "decode_callback",
+    "MAX_CALLBACK_BYTES",
+    "PAGE_DOMAIN",
+    "PAGE_OWNER",
+    "INFO_DOMAIN",
+    "RECENT_ACTIVITIES",
+    "RECENT_OFFERS",
+    "SUBSCRIBE",
+    "INFO_SUB",
+    "REMOVE_SUB",
+]
+
+
+# Telegram rejects inline buttons whose callback data is longer than this
+MAX_CALLBACK_BYTES = 64
+
+# Type tags: three bytes, none a prefix of another or of the plain-text callbacks ('about', 'settings', ...)
+TAG_LEN = 3
+PAGE_DOMAIN = b"~pd"
+PAGE_OWNER = b"~po"
+INFO_DOMAIN = b"~id"
+RECENT_ACTIVITIES = b"~ra"
+RECENT_OFFERS = b"~ro"
+SUBSCRIBE = b"~sb"
+INFO_SUB = b"~is"
+REMOVE_SUB = b"~rs"
+
+_INT = 0x69      # 'i': varint
+_STR = 0x73      # 's': varint length + UTF-8
+_HASHED = 0x68   # 'h': 8-byte digest of a string kept in the codec cache
+_DIGEST_SIZE = 8
+
+Field = Union[int, str]
+
+
+class CallbackExpired(KeyError):
+    """A hashed field is no longer in the cache (evicted or the bot restarted)."""
+
+
+def _varint(n: int) -> bytes:
+    if n < 0:
+        raise ValueError("only non-negative integers can be encoded")
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _read_varint(data: bytes, i: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[i]
+        i += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, i
+        shift += 7
+
+
+class CallbackCodec:
+    """
+    Packs a type tag and a few int/str fields into Telegram callback data.
+
+    Fields are encoded directly when the result fits in 64 bytes; otherwise the longest strings are
+    replaced by an 8-byte digest and kept in an in-process LRU cache, so buttons never need a database
+    lookup. A digest that fell out of the cache raises CallbackExpired on decode.
+    """
+
+    def __init__(self, cache: Optional[LRUCache] = None, limit: int = MAX_CALLBACK_BYTES):
+        self.cache = cache if cache is not None else LRUCache(maxsize=50000)
+        self.limit = limit
+
+    @staticmethod
+    def _field(value: Field) -> bytes:
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise TypeError(f"callback fields must be int or str, not {type(value).__name__}")
+        if isinstance(value, int):
+            return bytes([_INT]) + _varint(value)
+        raw = value.encode("utf-8")
+        return bytes([_STR]) + _varint(len(raw)) + raw
+
+    def _hashed(self, value: str) -> bytes:
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=_DIGEST_SIZE).digest()
+        self.cache.put(digest, value)
+        return bytes([_HASHED]) + digest
+
+    def encode(self, tag: bytes, *fields: Field) -> bytes:
+        """
+        Encode callback data.
+
+        Parameters:
+        - tag: One of the TAG_LEN-byte tags defined in this module.
+        - fields: int (non-negative) or str values.
+
+        Returns:
+        - Callback data of at most 'limit' bytes.
+        """
+        if len(tag) != TAG_LEN:
+            raise ValueError(f"tag must be {TAG_LEN} bytes")
+        parts = [self._field(f) for f in fields]
+        size = TAG_LEN + sum(len(p) for p in parts)
+        # Hash the longest strings first until the payload fits
+        by_length = sorted((i for i, f in enumerate(fields) if isinstance(f, str)),
+                           key=lambda i: len(parts[i]), reverse=True)
+        for i in by_length:
+            if size <= self.limit:
+                break
+            hashed = self._hashed(fields[i])
+            size += len(hashed) - len(parts[i])
+            parts[i] = hashed
+        if size > self.limit:
+            raise ValueError(f"callback data needs {size} bytes, more than {self.limit}")
+        return tag + b"".join(parts)
+
+    def decode(self, data: bytes) -> Tuple[bytes, List[Field]]:
+        """
+        Decode callback data produced by encode().
+
+        Returns:
+        - (tag, fields)
+
+        Raises:
+        - CallbackExpired when a hashed field is no longer cached.
+        - ValueError on malformed data.
+        """
+        tag, i = data[:TAG_LEN], TAG_LEN
+        fields: List[Field] = []
+        try:
+            while i < len(data):
+                kind = data[i]
+                i += 1
+                if kind == _INT:
+                    value, i = _read_varint(data, i)
+                    fields.append(value)
+                elif kind == _STR:
+                    length, i = _read_varint(data, i)
+                    fields.append(data[i:i + length].decode("utf-8"))
+                    i += length
+                elif kind == _HASHED:
+                    value = self.cache.get(data[i:i + _DIGEST_SIZE])
+                    if value is MISSING:
+                        raise CallbackExpired(data[i:i + _DIGEST_SIZE].hex())
+                    fields.append(value)
+                    i += _DIGEST_SIZE
+                else:
+                    raise ValueError(f"unknown field type {kind!r}")
+        except (IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"malformed callback data: {e}") from e
+        return tag, fields
+
+
+# Shared by nav (encoding buttons) and bot (decoding taps)
+_default_codec = CallbackCodec()
+
+
+def encode_callback(tag: bytes, *fields: Field) -> bytes:
+    """Encode with the process-wide codec."""
+    return _default_codec.encode(tag, *fields)
+
+
+def decode_callback(data: bytes) -> Tuple[bytes, List[Field]]:
+    """Decode with the process-wide codec; returns (tag, fields)."""
+    return _default_codec.decode(data)
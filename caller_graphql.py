@@ -27,6 +27,125 @@ def _filter_none(d: t.Mapping[str, t.Any]) -> dict:
     return {k: v for k, v in d.items() if v is not None}
 
 
+# Selection shared by the Name and NameBatch queries
+_NAME_FIELDS = """
+fragment NameFields on NameModel {
+  name
+  expiresAt
+  tokenizedAt
+  eoi
+  registrar {
+    name
+    ianaId
+    publicKeys
+    websiteUrl
+    supportEmail
+  }
+  nameservers {
+    ldhName
+  }
+  dsKeys {
+    keyTag
+    algorithm
+    digest
+    digestType
+  }
+  transferLock
+  claimedBy
+  tokens {
+    tokenId
+    networkId
+    ownerAddress
+    type
+    startsAt
+    expiresAt
+    explorerUrl
+    tokenAddress
+    createdAt
+    chain {
+      name
+      networkId
+    }
+    listings {
+      id
+      externalId
+      price
+      offererAddress
+      orderbook
+      currency {
+        name
+        symbol
+        decimals
+      }
+      expiresAt
+      createdAt
+      updatedAt
+    }
+    openseaCollectionSlug
+  }
+  activities {
+    __typename
+    ... on NameClaimedActivity {
+      type
+      txHash
+      sld
+      tld
+      createdAt
+      claimedBy
+    }
+    ... on NameRenewedActivity {
+      type
+      txHash
+      sld
+      tld
+      createdAt
+      expiresAt
+    }
+    ... on NameDetokenizedActivity {
+      type
+      txHash
+      sld
+      tld
+      createdAt
+      networkId
+    }
+    ... on NameTokenizedActivity {
+      type
+      txHash
+      sld
+      tld
+      createdAt
+      networkId
+    }
+  }
+}
+"""
+
+
+# Selection shared by the NameStatistics and NameStatisticsBatch queries
+_NAME_STATISTICS_FIELDS = """
+fragment NameStatisticsFields on NameStatisticsModel {
+  name
+  highestOffer {
+    id
+    externalId
+    price
+    offererAddress
+    orderbook
+    currency {
+      name
+      symbol
+      decimals
+    }
+    expiresAt
+    createdAt
+  }
+  activeOffers
+  offersLast3Days
+}
+"""
+
+
 class DomaGraphQLClient:
     """
     Minimal GraphQL client for Doma Multi-Chain Subgraph.
@@ -51,6 +170,15 @@ class DomaGraphQLClient:
         self.timeout = timeout
 
     def _execute(self, query: str, variables: t.Optional[dict] = None, operation_name: t.Optional[str] = None) -> dict:
+        data, errors = self._execute_partial(query, variables, operation_name)
+        if errors:
+            raise GraphQLClientError("GraphQL responded with errors.", errors=errors)
+        return data
+
+    def _execute_partial(
+        self, query: str, variables: t.Optional[dict] = None, operation_name: t.Optional[str] = None
+    ) -> t.Tuple[dict, t.List[dict]]:
+        """Like _execute, but return (data, errors) when the API responds with partial data."""
         payload: dict = {"query": query, "variables": variables or {}}
         if operation_name:
             payload["operationName"] = operation_name
@@ -85,13 +213,62 @@ class DomaGraphQLClient:
         if not isinstance(data, dict):
             raise GraphQLClientError("Unexpected GraphQL response format (not a JSON object).")
 
-        if "errors" in data and data["errors"]:
-            raise GraphQLClientError("GraphQL responded with errors.", errors=data["errors"])
-
-        if "data" not in data:
+        errors = data.get("errors") or []
+        if data.get("data") is None:
+            if errors:
+                raise GraphQLClientError("GraphQL responded with errors.", errors=errors)
             raise GraphQLClientError("GraphQL response missing 'data' field.")
 
-        return data["data"]
+        return data["data"], errors
+
+    def _execute_aliased_batch(
+        self,
+        operation_name: str,
+        field: str,
+        argument: str,
+        fragment: str,
+        fragment_name: str,
+        values: t.Sequence[str],
+        not_found: str,
+        alias: str = "a",
+    ) -> t.Tuple[t.List[t.Optional[dict]], t.List[t.Optional[str]]]:
+        """
+        Query one root field for several argument values in a single request, one alias per value.
+
+        Parameters:
+        - operation_name: GraphQL operation name.
+        - field / argument: Root field and its String! argument (e.g. name(name: ...)).
+        - fragment / fragment_name: Fragment definition and the name it is spread by.
+        - values: Argument values.
+        - not_found: Error message for values that came back null without a GraphQL error.
+        - alias: Alias prefix; aliases are prefix + index.
+
+        Returns:
+        - (docs, errors): two lists aligned with 'values'. A value that could not be resolved has a None
+          doc and an error message; the rest of the batch is unaffected.
+        """
+        if not values:
+            return [], []
+        params = " ".join(f"${alias}{i}: String!" for i in range(len(values)))
+        fields = "\n".join(f"  {alias}{i}: {field}({argument}: ${alias}{i}) {{ ...{fragment_name} }}"
+                           for i in range(len(values)))
+        query = f"query {operation_name}({params}) {{\n{fields}\n}}\n" + fragment
+        variables = {f"{alias}{i}": value for i, value in enumerate(values)}
+        data, errors = self._execute_partial(query, variables, operation_name=operation_name)
+
+        messages: t.List[t.Optional[str]] = [None] * len(values)
+        for err in errors:
+            path = err.get("path") or []
+            name = path[0] if path else None
+            if isinstance(name, str) and name.startswith(alias) and name[len(alias):].isdigit():
+                index = int(name[len(alias):])
+                if index < len(values):
+                    messages[index] = err.get("message") or "GraphQL error"
+        docs = [data.get(f"{alias}{i}") for i in range(len(values))]
+        for i, doc in enumerate(docs):
+            if doc is None and messages[i] is None:
+                messages[i] = not_found
+        return docs, messages
 
     # 1) names
     def query_names(
@@ -244,105 +421,91 @@ class DomaGraphQLClient:
         data = self._execute(query, variables, operation_name="Names")
         return data["names"]
 
+    # 1b) names, returning only the name strings and pagination metadata
+    def query_name_list(
+        self,
+        skip: t.Optional[int] = None,
+        take: t.Optional[int] = None,
+        ownedBy: t.Optional[t.List[str]] = None,
+        claimStatus: t.Optional[str] = None,
+        name: t.Optional[str] = None,
+        sortOrder: t.Optional[str] = None,
+    ) -> dict:
+        query = """
+        query NameList(
+          $skip: Int
+          $take: Int
+          $ownedBy: [AddressCAIP10!]
+          $claimStatus: NamesQueryClaimStatus
+          $name: String
+          $sortOrder: SortOrderType
+        ) {
+          names(
+            skip: $skip
+            take: $take
+            ownedBy: $ownedBy
+            claimStatus: $claimStatus
+            name: $name
+            sortOrder: $sortOrder
+          ) {
+            items {
+              name
+            }
+            totalCount
+            pageSize
+            currentPage
+            totalPages
+            hasPreviousPage
+            hasNextPage
+          }
+        }
+        """
+        variables = _filter_none(
+            dict(skip=skip, take=take, ownedBy=ownedBy, claimStatus=claimStatus, name=name, sortOrder=sortOrder)
+        )
+        data = self._execute(query, variables, operation_name="NameList")
+        return data["names"]
+
     # 2) name
     def query_name(self, name: str) -> dict:
         query = """
         query Name($name: String!) {
+          name(name: $name) {
+            ...NameFields
+          }
+        }
+        """ + _NAME_FIELDS
+        data = self._execute(query, {"name": name}, operation_name="Name")
+        return data["name"]
+
+    # 2b) name -> token ids only (cheap lookup for resolving a domain to its tokens)
+    def query_name_tokens(self, name: str) -> dict:
+        query = """
+        query NameTokens($name: String!) {
           name(name: $name) {
             name
-            expiresAt
-            tokenizedAt
-            eoi
-            registrar {
-              name
-              ianaId
-              publicKeys
-              websiteUrl
-              supportEmail
-            }
-            nameservers {
-              ldhName
-            }
-            dsKeys {
-              keyTag
-              algorithm
-              digest
-              digestType
-            }
-            transferLock
-            claimedBy
             tokens {
               tokenId
               networkId
-              ownerAddress
-              type
-              startsAt
-              expiresAt
-              explorerUrl
-              tokenAddress
-              createdAt
-              chain {
-                name
-                networkId
-              }
-              listings {
-                id
-                externalId
-                price
-                offererAddress
-                orderbook
-                currency {
-                  name
-                  symbol
-                  decimals
-                }
-                expiresAt
-                createdAt
-                updatedAt
-              }
-              openseaCollectionSlug
-            }
-            activities {
-              __typename
-              ... on NameClaimedActivity {
-                type
-                txHash
-                sld
-                tld
-                createdAt
-                claimedBy
-              }
-              ... on NameRenewedActivity {
-                type
-                txHash
-                sld
-                tld
-                createdAt
-                expiresAt
-              }
-              ... on NameDetokenizedActivity {
-                type
-                txHash
-                sld
-                tld
-                createdAt
-                networkId
-              }
-              ... on NameTokenizedActivity {
-                type
-                txHash
-                sld
-                tld
-                createdAt
-                networkId
-              }
             }
           }
         }
         """
-        data = self._execute(query, {"name": name}, operation_name="Name")
+        data = self._execute(query, {"name": name}, operation_name="NameTokens")
         return data["name"]
 
+    # 2c) several names in one request, using one aliased name() field per name
+    def query_name_batch(self, names: t.Sequence[str]) -> t.Tuple[t.List[t.Optional[dict]], t.List[t.Optional[str]]]:
+        """
+        Fetch several names in a single request.
+
+        Returns:
+        - (docs, errors): two lists aligned with 'names'. A name that could not be resolved has a None
+          doc and an error message; the rest of the batch is unaffected.
+        """
+        return self._execute_aliased_batch("NameBatch", "name", "name", _NAME_FIELDS, "NameFields",
+                                           names, "name not found", alias="n")
+
     # 3) tokens
     def query_tokens(self, name: str, skip: t.Optional[int] = None, take: t.Optional[int] = None) -> dict:
         query = """
@@ -1027,29 +1190,26 @@ class DomaGraphQLClient:
         query = """
         query NameStatistics($tokenId: String!) {
           nameStatistics(tokenId: $tokenId) {
-            name
-            highestOffer {
-              id
-              externalId
-              price
-              offererAddress
-              orderbook
-              currency {
-                name
-                symbol
-                decimals
-              }
-              expiresAt
-              createdAt
-            }
-            activeOffers
-            offersLast3Days
+            ...NameStatisticsFields
           }
         }
-        """
+        """ + _NAME_STATISTICS_FIELDS
         data = self._execute(query, {"tokenId": tokenId}, operation_name="NameStatistics")
         return data["nameStatistics"]
 
+    def query_name_statistics_batch(
+        self, tokenIds: t.Sequence[str]
+    ) -> t.Tuple[t.List[t.Optional[dict]], t.List[t.Optional[str]]]:
+        """
+        Fetch statistics of several tokens in a single request.
+
+        Returns:
+        - (docs, errors): two lists aligned with 'tokenIds', as in query_name_batch.
+        """
+        return self._execute_aliased_batch("NameStatisticsBatch", "nameStatistics", "tokenId",
+                                           _NAME_STATISTICS_FIELDS, "NameStatisticsFields",
+                                           tokenIds, "statistics not found", alias="t")
+
 
 __all__ = [
     "DomaGraphQLClient",
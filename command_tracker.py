@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+import poll_event_models as pem
+from caller_graphql import DomaGraphQLClient
+from executors import BoundedExecutor
+from lru_cache import LRUCache
+
+__all__ = ["CommandTracker", "COMMAND_EVENT_TYPES", "TERMINAL_STATUSES"]
+
+
+COMMAND_EVENT_TYPES = (
+    "COMMAND_CREATED",
+    "COMMAND_UPDATED",
+    "COMMAND_SUCCEEDED",
+    "COMMAND_FAILED",
+)
+
+# Poll event type -> CommandStatus value reported by the subgraph
+_STATUS_BY_EVENT_TYPE = {
+    "COMMAND_CREATED": "PENDING",
+    "COMMAND_UPDATED": "FINALIZING",
+    "COMMAND_SUCCEEDED": "SUCCEEDED",
+    "COMMAND_FAILED": "FAILED",
+}
+
+TERMINAL_STATUSES = frozenset({"SUCCEEDED", "FAILED", "PARTIALLY_SUCCEEDED"})
+
+
+class CommandTracker:
+    """
+    Tracks command state (tokenization, claim, ...) by correlationId from COMMAND_* poll events.
+
+    Events arrive through DomaEventFeed, where relayId is the command's correlationId. Callers await
+    wait(); the subgraph is only queried with query_command when no event arrived for a while.
+    """
+
+    def __init__(self, client: Optional[DomaGraphQLClient] = None, *, maxsize: int = 10000,
+                 fallback_after: float = 30.0, executor: Optional[BoundedExecutor] = None):
+        """
+        Parameters:
+        - client: GraphQL client used for the query_command fallback; None disables the fallback.
+        - maxsize: Maximum number of command states kept in memory.
+        - fallback_after: Seconds without a terminal event before the subgraph is asked directly.
+        - executor: Pool running the fallback query (the Doma pool); the loop's default executor if None.
+        """
+        self.client = client
+        self.fallback_after = fallback_after
+        self.executor = executor
+        self._states = LRUCache(maxsize=maxsize)
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+
+    @staticmethod
+    def is_terminal(state: Optional[Dict[str, Any]]) -> bool:
+        return bool(state) and state.get("status") in TERMINAL_STATUSES
+
+    def status(self, correlation_id: str) -> Optional[Dict[str, Any]]:
+        """Last known state of a command, or None if nothing was seen yet."""
+        return self._states.get(correlation_id, None)
+
+    def update(self, correlation_id: str, state: Dict[str, Any]) -> None:
+        """Record a command state and wake waiters when it is terminal."""
+        self._states.put(correlation_id, state)
+        if not self.is_terminal(state):
+            return
+        for fut in self._waiters.pop(correlation_id, []):
+            # Events may be applied from another thread than the one awaiting
+            fut.get_loop().call_soon_threadsafe(self._resolve, fut, state)
+
+    @staticmethod
+    def _resolve(fut: asyncio.Future, state: Dict[str, Any]) -> None:
+        if not fut.done():
+            fut.set_result(state)
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Update command state from a stored poll event (see DomaEventFeed)."""
+        event_type = event.get("type")
+        data = pem.parse_event_data(event_type, event.get("eventData"))
+        if data is None:
+            return
+        correlation_id = event.get("relayId") or data.relayId
+        if not correlation_id:
+            return
+        failure = data.failureData
+        self.update(correlation_id, {
+            "correlationId": correlation_id,
+            "status": _STATUS_BY_EVENT_TYPE[event_type],
+            "transactions": [tx.hash for tx in data.transactions or []],
+            "failureReason": failure.rawError if failure else None,
+            "updatedAt": event.get("createdAt"),
+            "source": "event",
+        })
+
+    def _query(self, correlation_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            command = self.client.query_command(correlation_id)
+        except Exception as e:
+            print(f"Error querying command {correlation_id}: {e}")
+            return None
+        if not command:
+            return None
+        return {
+            "correlationId": correlation_id,
+            "status": command.get("status"),
+            "type": command.get("type"),
+            "failureReason": command.get("failureReason"),
+            "updatedAt": command.get("updatedAt"),
+            "source": "query",
+        }
+
+    async def wait(self, correlation_id: str, timeout: float = 300.0) -> Dict[str, Any]:
+        """
+        Wait until a command succeeds or fails.
+
+        Parameters:
+        - correlation_id: Command correlationId (relayId in poll events).
+        - timeout: Seconds to wait in total.
+
+        Returns:
+        - Terminal command state dictionary with 'status' and 'failureReason'.
+
+        Raises:
+        - asyncio.TimeoutError when no terminal state was seen in time.
+        """
+        state = self.status(correlation_id)
+        if self.is_terminal(state):
+            return state
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._waiters.setdefault(correlation_id, []).append(fut)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"command {correlation_id} did not finish in {timeout}s")
+                try:
+                    return await asyncio.wait_for(asyncio.shield(fut), min(self.fallback_after, remaining))
+                except asyncio.TimeoutError:
+                    if self.client is None or fut.done():
+                        continue
+                # No event for a while: ask the subgraph once, then keep waiting for events
+                if self.executor is not None:
+                    state = await self.executor.run(self._query, correlation_id)
+                else:
+                    state = await loop.run_in_executor(None, self._query, correlation_id)
+                if state is not None:
+                    self.update(correlation_id, state)
+        finally:
+            waiters = self._waiters.get(correlation_id)
+            if waiters and fut in waiters:
+                waiters.remove(fut)
+                if not waiters:
+                    del self._waiters[correlation_id]
@@ -18,5 +18,49 @@ gemini_api_key=''
 
 ai_model='gemini-2.0-flash'
 bg_poll_interval_seconds = 30
+event_feed_interval_seconds = 5
+
+name_cache_size = 5000
+name_cache_ttl_seconds = 60
+user_cache_size = 10000
+user_cache_ttl_seconds = 300
+command_fallback_seconds = 30
+command_wait_seconds = 300
+name_stats_max_age_seconds = 300
+token_history_refresh_seconds = 30
+token_history_refresh_batch = 20
+name_stats_refresh_seconds = 10
+
+mongo_workers = 8
+doma_workers = 8
+ai_workers = 2
+executor_max_queue = 100
+loop_lag_interval_seconds = 0.5
+tap_debounce_seconds = 1.0
+# Telegram's ~30 messages/s is per bot token, shared by bot.py and bg_poll.py
+send_rate_per_second = 20
+bg_send_rate_per_second = 5
+send_chat_rate_per_second = 1
+send_chat_burst = 3
+send_max_in_flight = 8
+ai_call_timeout_seconds = 30
+ai_search_deadline_seconds = 20
+ai_keyword_cap = 20
+inline_page_size = 20
+inline_cache_size = 2000
+inline_cache_ttl_seconds = 60
+inline_cache_time_seconds = 60
+warm_names = 50
+conversation_cache_size = 10000
+conversation_ttl_seconds = 2400
+search_prompt_ttl_seconds = 60
+search_rate_per_second = 0.5
+search_burst = 10
+ai_rate_per_second = 0.02
+ai_burst = 3
+shed_max_queued = 50
+shed_max_latency_seconds = 5.0
+edit_digest_cache_size = 10000
+translations_cache_file = '.msg_cache.json'
 
 admin_list=[]
\ No newline at end of file
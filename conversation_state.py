@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from lru_cache import LRUCache, MISSING
+from mongo import Mongo
+
+__all__ = ["ConversationStore", "PromptRouter"]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ConversationStore:
+    """
+    Per-user "awaiting input" state: which prompt the user is answering and the data it needs.
+
+    A pending prompt is one small document in MongoDB (expired by a TTL index) with an LRU cache of
+    the same documents in front, so waiting users hold no coroutine or connection and survive restarts.
+    Blocking: call from the Mongo pool, except cached() which only reads the cache.
+    """
+
+    def __init__(self, mongo: Mongo, collection: str = "conversation_state",
+                 cache: Optional[LRUCache] = None, ttl: float = 2400):
+        """
+        Parameters:
+        - mongo: Mongo wrapper holding the collection.
+        - collection: Collection name.
+        - cache: Write-through cache of state documents (None for users known to have no prompt).
+        - ttl: Default seconds a prompt waits for its answer.
+        """
+        self.mongo = mongo
+        self.collection = collection
+        self.cache = cache if cache is not None else LRUCache(maxsize=10000)
+        self.ttl = ttl
+
+    def ensure_indexes(self) -> None:
+        self.mongo.create_index(self.collection, "user_id", unique=True)
+        self.mongo.create_index(self.collection, "expiresAt", expireAfterSeconds=0)
+
+    @staticmethod
+    def _live(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # The TTL monitor runs about once a minute, so expiry is also checked on read
+        if doc is None or doc.get("expiresAt") is None or doc["expiresAt"] <= _utcnow():
+            return None
+        return doc
+
+    def cached(self, user_id: int):
+        """Cached state (None when the user has no prompt), or MISSING when a read is needed."""
+        doc = self.cache.get(user_id)
+        return doc if doc is MISSING else self._live(doc)
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """The user's pending prompt as {'user_id', 'state', 'data', 'expiresAt'}, or None."""
+        doc = self.cache.get(user_id)
+        if doc is MISSING:
+            doc = self.mongo.find_one(self.collection, {"user_id": user_id})
+            if doc is not None:
+                doc.pop("_id", None)
+            self.cache.put(user_id, doc)
+        return self._live(doc)
+
+    def set(self, user_id: int, state: str, data: Optional[Dict[str, Any]] = None,
+            ttl: Optional[float] = None) -> Dict[str, Any]:
+        """Start waiting for the user's answer to a prompt, replacing any earlier one."""
+        doc = {
+            "user_id": user_id,
+            "state": state,
+            "data": dict(data or {}),
+            "expiresAt": _utcnow() + timedelta(seconds=self.ttl if ttl is None else ttl),
+        }
+        self.mongo.upsert(self.collection, {"user_id": user_id}, {"$set": doc})
+        self.cache.put(user_id, doc)
+        return doc
+
+    def clear(self, user_id: int) -> None:
+        """Forget the user's prompt; free when the cache already knows there is none."""
+        if self.cache.get(user_id) is None:
+            return
+        self.delete(user_id)
+        self.cache.put(user_id, None)
+
+    def delete(self, user_id: int) -> None:
+        """Delete the stored prompt whatever the cache says (for callers that already cleared the cache)."""
+        self.mongo.delete(self.collection, {"user_id": user_id})
+
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class PromptRouter:
+    """
+    Maps prompt states to the handlers of their answers.
+
+    The bot registers one NewMessage handler that looks up the sender's state and calls dispatch();
+    the handler gets the message event, its text and the data stored with the prompt as keywords.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Handler] = {}
+
+    def route(self, state: str):
+        """Decorator registering the handler of a prompt state."""
+        def decorator(handler: Handler) -> Handler:
+            if state in self._handlers:
+                raise ValueError(f"prompt state '{state}' is already registered")
+            self._handlers[state] = handler
+            return handler
+        return decorator
+
+    def __contains__(self, state: str) -> bool:
+        return state in self._handlers
+
+    async def dispatch(self, event, doc: Dict[str, Any]) -> Any:
+        handler = self._handlers.get(doc.get("state"))
+        if handler is None:
+            return None
+        return await handler(event, event.raw_text, **(doc.get("data") or {}))
@@ -1,9 +1,21 @@
 from __future__ import annotations
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from caller_graphql import DomaGraphQLClient, DEFAULT_ENDPOINT
+from mongo import Mongo
 import re
+import functools
+import time
 
-__all__ = ["DomaNameActivitiesService"]
+__all__ = ["DomaNameActivitiesService", "NAME_ACTIVITY_BY_EVENT_TYPE"]
+
+
+# Poll API event type -> (GraphQL __typename, NameActivityType) of the matching name activity
+NAME_ACTIVITY_BY_EVENT_TYPE = {
+    "NAME_CLAIMED": ("NameClaimedActivity", "CLAIMED"),
+    "NAME_RENEWED": ("NameRenewedActivity", "RENEWED"),
+    "NAME_DETOKENIZED": ("NameDetokenizedActivity", "DETOKENIZED"),
+    "NAME_TOKENIZED": ("NameTokenizedActivity", "TOKENIZED"),
+}
 
 
 class DomaNameActivitiesService:
@@ -11,6 +23,9 @@ class DomaNameActivitiesService:
     High-level convenience wrapper for DomaGraphQLClient focused on Name Activities.
 
     Provides a helper to retrieve a paginated list of activities related to a specific name (domain).
+
+    When constructed with a Mongo handle, activities can also be served from the events bg_poll.py stores
+    in 'doma_events'; the subgraph is only used once per name, for history older than the first stored event.
     """
 
     def __init__(
@@ -21,17 +36,31 @@ class DomaNameActivitiesService:
         api_key: Optional[str] = None,
         headers: Optional[dict] = None,
         timeout: float = 30.0,
+        mongo: Optional[Mongo] = None,
+        events_collection: str = "doma_events",
+        backfill_collection: str = "name_activity_backfill",
+        snapshot_ttl: float = 300.0,
     ):
         """
         Initialize the service.
 
         You can provide an existing DomaGraphQLClient via 'client', or allow the service
         to construct one by passing endpoint/api_key/headers/timeout.
+        Pass 'mongo' to enable get_local_name_activities. While no event is stored yet, a name's subgraph
+        history is reused for 'snapshot_ttl' seconds; the first stored event is looked up again as often.
         """
         if client is not None:
             self.client = client
         else:
             self.client = DomaGraphQLClient(endpoint=endpoint, headers=headers, timeout=timeout, api_key=api_key)
+        self.mongo = mongo
+        self.events_collection = events_collection
+        self.backfill_collection = backfill_collection
+        self.snapshot_ttl = snapshot_ttl
+        self._first_event_at: Optional[str] = None
+        self._first_event_read = 0.0
+        if self.mongo is not None:
+            self.mongo.create_index(self.events_collection, [("name", 1), ("id", -1)])
 
     def get_name_activities(
         self,
@@ -66,6 +95,117 @@ class DomaNameActivitiesService:
         )
 
     @staticmethod
+    def _event_time(event: Dict[str, Any]) -> Optional[str]:
+        """When the event happened: its own timestamp, else the time bg_poll.py received it (may be None)."""
+        return (event.get("eventData") or {}).get("createdAt") or event.get("createdAt")
+
+    @staticmethod
+    def _event_to_activity(event: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a stored poll event into the NameActivity shape returned by the GraphQL API."""
+        typename, activity_type = NAME_ACTIVITY_BY_EVENT_TYPE[event["type"]]
+        data = event.get("eventData") or {}
+        sld, _, tld = (event.get("name") or data.get("name") or "").rpartition(".")
+        activity = {
+            "__typename": typename,
+            "type": activity_type,
+            "txHash": data.get("txHash"),
+            "sld": sld,
+            "tld": tld,
+            "createdAt": DomaNameActivitiesService._event_time(event),
+        }
+        for field in ("claimedBy", "expiresAt", "networkId"):
+            if field in data:
+                activity[field] = data[field]
+        return activity
+
+    def _first_stored_event_at(self) -> Optional[str]:
+        """
+        Time of the oldest stored event that has one; everything before it is only known to the subgraph.
+
+        Re-read when unknown (the store may fill up later) and every snapshot_ttl seconds.
+        """
+        now = time.time()
+        if self._first_event_at is None or now - self._first_event_read >= self.snapshot_ttl:
+            timed = {"$or": [{"createdAt": {"$exists": True}}, {"eventData.createdAt": {"$exists": True}}]}
+            first = self.mongo.find_many(self.events_collection, timed, sort_by="id", sort_order="asc",
+                                         limit=1).to_list()
+            self._first_event_at = self._event_time(first[0]) if first else None
+            self._first_event_read = now
+        return self._first_event_at
+
+    @staticmethod
+    def _activity_key(activity: Dict[str, Any]):
+        """Identity of an activity across stored events and the subgraph (their createdAt values differ)."""
+        tx_hash = activity.get("txHash")
+        return (activity.get("type"), tx_hash) if tx_hash else None
+
+    def _backfill(self, name: str, before: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Subgraph activities older than 'before', newest first, fetched once per name and stored.
+
+        With no stored events (before is None) the whole history is fetched and kept for snapshot_ttl
+        seconds, since nothing else brings it up to date.
+        """
+        doc = self.mongo.find_one(self.backfill_collection, {"_id": name})
+        if doc and doc.get("before") == before:
+            if before is not None or time.time() - (doc.get("fetchedAt") or 0) < self.snapshot_ttl:
+                return doc.get("items", [])
+        items: List[Dict[str, Any]] = []
+        skip = 0
+        take = 100
+        while True:
+            # Oldest first, so paging stops at the first activity the stored events already cover
+            resp = self.client.query_name_activities(name=name, skip=skip, take=take, sortOrder="ASC")
+            page = resp.get("items", []) or []
+            reached = False
+            for it in page:
+                if before is not None and (it.get("createdAt") or "") >= before:
+                    reached = True
+                    break
+                items.append(it)
+            if reached or not resp.get("hasNextPage") or not page:
+                break
+            skip += take
+        items.reverse()
+        self.mongo.upsert(self.backfill_collection, {"_id": name},
+                          {"$set": {"before": before, "fetchedAt": time.time(), "items": items}})
+        return items
+
+    def get_local_name_activities(self, name: str, *, take: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get activities of a name, newest first, from stored poll events.
+
+        History older than the first stored event is filled from the subgraph once per name and kept
+        in MongoDB, so repeated calls do not leave the database.
+
+        Parameters:
+        - name: Name (domain) to query activities for. Required.
+        - take: Optional maximum number of activities to return.
+
+        Returns:
+        - Dictionary with 'items' (NameActivity dictionaries, as in PaginatedNameActivitiesResponse)
+          and 'totalCount'.
+        """
+        if not name or not isinstance(name, str):
+            raise ValueError("name must be a non-empty string")
+        if self.mongo is None:
+            raise RuntimeError("local name activities require a Mongo handle (pass mongo=...)")
+        # Event ids follow the order events happened in; events stored without a createdAt are included too
+        query = {"name": name, "type": {"$in": list(NAME_ACTIVITY_BY_EVENT_TYPE)}}
+        events = self.mongo.find_many(self.events_collection, query, sort_by="id", sort_order="desc",
+                                      limit=take or 0).to_list()
+        items = [self._event_to_activity(e) for e in events]
+        if take is None or len(items) < take:
+            # 'before' is when bg_poll.py received the first event, not chain time, so the subgraph may
+            # also return activities near it that are already stored
+            seen = {self._activity_key(it) for it in items} - {None}
+            older = [it for it in self._backfill(name, self._first_stored_event_at())
+                     if self._activity_key(it) not in seen]
+            items.extend(older if take is None else older[:take - len(items)])
+        return {"items": items, "totalCount": len(items)}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
     def space_before_capitals(text):
         """
         Adds a space before any capital letter in a string, except for the first letter.
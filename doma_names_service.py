@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from typing import Iterable, List, Optional, Set, Dict, Any
 
-from caller_graphql import DomaGraphQLClient, DEFAULT_ENDPOINT
+from caller_graphql import DomaGraphQLClient, GraphQLClientError, DEFAULT_ENDPOINT
+from lru_cache import LRUCache, MISSING
 
 
 __all__ = ["DomaNamesService"]
@@ -14,6 +15,7 @@ class DomaNamesService:
 
     Provides helper methods to retrieve domain names by owner address or by name filter,
     with optional claimStatus filtering. Internally handles pagination to return all results.
+    Name documents can be cached in an optional LRUCache shared between get_name and get_names.
     """
 
     def __init__(
@@ -24,17 +26,20 @@ class DomaNamesService:
         api_key: Optional[str] = None,
         headers: Optional[dict] = None,
         timeout: float = 30.0,
+        cache: Optional[LRUCache] = None,
     ):
         """
         Initialize the service.
 
         You can provide an existing DomaGraphQLClient via 'client', or allow the service
         to construct one by passing endpoint/api_key/headers/timeout.
+        Pass 'cache' (e.g. LRUCache(maxsize=5000, ttl=60)) to cache name documents.
         """
         if client is not None:
             self.client = client
         else:
             self.client = DomaGraphQLClient(endpoint=endpoint, headers=headers, timeout=timeout, api_key=api_key)
+        self.cache = cache
 
     def _iterate_all_names(self, *, take: int = 100, **filters: Any) -> Iterable[Dict[str, Any]]:
         """
@@ -124,6 +129,84 @@ class DomaNamesService:
         items_iter = self._iterate_all_names(take=take, **filters)
         return self._names_list(items_iter)
 
+    def get_names_page(
+        self,
+        *,
+        name_filter: Optional[str] = None,
+        owner_address_caip10: Optional[str] = None,
+        claim_status: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        Get one page of domain names together with the total number of matches, in a single request.
+
+        Use this instead of get_names_by_name/get_names_by_owner when only a count and one page are shown;
+        later pages are fetched on demand with the same call.
+
+        Parameters:
+        - name_filter: Name (domain) filter string.
+        - owner_address_caip10: Wallet address in CAIP-10 format to filter by.
+        - claim_status: Optional claim status filter (CLAIMED, UNCLAIMED, or ALL).
+        - page: 1-based page number.
+        - page_size: Names per page (max 100).
+
+        Returns:
+        - Dictionary with 'names' (list of domain name strings), 'totalCount', 'totalPages' and 'page'.
+        """
+        if not name_filter and not owner_address_caip10:
+            raise ValueError("name_filter or owner_address_caip10 must be a non-empty string")
+        page = max(1, int(page))
+        if page_size <= 0 or page_size > 100:
+            page_size = 10
+        key = self._page_key(name_filter, owner_address_caip10, claim_status, page, page_size)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not MISSING:
+                return cached
+        resp = self.client.query_name_list(
+            skip=(page - 1) * page_size,
+            take=page_size,
+            name=name_filter,
+            ownedBy=[owner_address_caip10] if owner_address_caip10 else None,
+            claimStatus=claim_status,
+        )
+        result = {
+            "names": self._names_list(resp.get("items", []) or []),
+            "totalCount": int(resp.get("totalCount") or 0),
+            "totalPages": int(resp.get("totalPages") or 0),
+            "page": page,
+        }
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
+
+    @staticmethod
+    def _page_key(name_filter, owner_address_caip10, claim_status, page, page_size):
+        return ("page", name_filter, owner_address_caip10, claim_status, page, page_size)
+
+    def cached_names_page(
+        self,
+        *,
+        name_filter: Optional[str] = None,
+        owner_address_caip10: Optional[str] = None,
+        claim_status: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 10,
+    ) -> Any:
+        """
+        Same as get_names_page, but only from the cache (no request); used when upstream is overloaded.
+
+        Returns:
+        - The cached page dictionary, or MISSING when it is not cached.
+        """
+        if self.cache is None:
+            return MISSING
+        if page_size <= 0 or page_size > 100:
+            page_size = 10
+        return self.cache.get(self._page_key(name_filter, owner_address_caip10, claim_status,
+                                             max(1, int(page)), page_size))
+
     def get_name(self, name: str) -> Dict[str, Any]:
         """
         Get information about a specific tokenized (domain) name.
@@ -136,4 +219,80 @@ class DomaNamesService:
         """
         if not name:
             raise ValueError("name must be a non-empty string")
-        return self.client.query_name(name)
+        if self.cache is not None:
+            cached = self.cache.get(name)
+            if cached is not MISSING:
+                return cached
+        doc = self.client.query_name(name)
+        if self.cache is not None and doc:
+            self.cache.put(name, doc)
+        return doc
+
+    def get_names(self, names: Iterable[str], *, batch_size: int = 25) -> List[Dict[str, Any]]:
+        """
+        Get information about many names with as few upstream requests as possible.
+
+        Cached names are answered from the cache; the rest are fetched in aliased batches
+        (one request per 'batch_size' distinct names).
+
+        Parameters:
+        - names: Names (domains) to fetch; duplicates are fetched once.
+        - batch_size: Maximum number of names per request.
+
+        Returns:
+        - List aligned with 'names' of {'name', 'data', 'error'} dictionaries, where 'data' is the NameModel
+          dictionary (None on failure) and 'error' a message (None on success).
+        """
+        names = list(names)
+        if batch_size <= 0:
+            batch_size = 25
+        found: Dict[str, Dict[str, Any]] = {}
+        failed: Dict[str, str] = {}
+        pending: List[str] = []
+        queued: Set[str] = set()
+        for nm in names:
+            if nm in found or nm in failed or nm in queued:
+                continue
+            if not nm or not isinstance(nm, str):
+                failed[nm] = "name must be a non-empty string"
+                continue
+            cached = self.cache.get(nm) if self.cache is not None else MISSING
+            if cached is not MISSING:
+                found[nm] = cached
+            else:
+                pending.append(nm)
+                queued.add(nm)
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                docs, errors = self.client.query_name_batch(batch)
+            except GraphQLClientError as e:
+                failed.update((nm, str(e)) for nm in batch)
+                continue
+            for nm, doc, err in zip(batch, docs, errors):
+                if doc is None:
+                    failed[nm] = err or "name not found"
+                    continue
+                found[nm] = doc
+                if self.cache is not None:
+                    self.cache.put(nm, doc)
+
+        return [{"name": nm, "data": found.get(nm), "error": failed.get(nm)} for nm in names]
+
+    def get_name_tokens(self, name: str) -> List[Dict[str, Any]]:
+        """
+        Get only the token ids and network ids of a specific name.
+
+        Much cheaper than get_name when only the tokenId is needed.
+
+        Parameters:
+        - name: Name (domain) to fetch tokens for.
+
+        Returns:
+        - List of {'tokenId', 'networkId'} dictionaries (empty if the name is not tokenized).
+        """
+        if not name:
+            raise ValueError("name must be a non-empty string")
+        resp = self.client.query_name_tokens(name) or {}
+        return resp.get("tokens") or []
@@ -11,7 +11,8 @@ class DomaOffersService:
     """
     High-level convenience wrapper for DomaGraphQLClient focused on Name Offers.
 
-    Provides a helper to retrieve a paginated list of offers for tokenized names, with optional filters.
+    Provides helpers to retrieve a paginated list of offers for tokenized names, with optional filters,
+    and the offer statistics of a single name.
     """
 
     def __init__(
@@ -66,3 +67,37 @@ class DomaOffersService:
             status=status,
             sortOrder=sort_order,
         )
+
+    def get_name_statistics(self, token_id: str) -> Dict[str, Any]:
+        """
+        Get offer statistics for a tokenized name.
+
+        Parameters:
+        - token_id: Token ID to query statistics for. Required.
+
+        Returns:
+        - NameStatisticsModel dictionary (name, highestOffer, activeOffers, offersLast3Days).
+        """
+        if not token_id or not isinstance(token_id, str):
+            raise ValueError("token_id must be a non-empty string")
+        return self.client.query_name_statistics(token_id)
+
+    def get_name_statistics_batch(self, token_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get offer statistics for several tokenized names in a single request.
+
+        Parameters:
+        - token_ids: Token IDs to query statistics for.
+
+        Returns:
+        - Dictionary mapping tokenId to its NameStatisticsModel dictionary; tokens that failed are left out.
+        """
+        token_ids = [tid for tid in token_ids if tid and isinstance(tid, str)]
+        docs, errors = self.client.query_name_statistics_batch(token_ids)
+        found: Dict[str, Dict[str, Any]] = {}
+        for token_id, doc, err in zip(token_ids, docs, errors):
+            if doc is None:
+                print(f"No statistics for token {token_id}: {err}")
+                continue
+            found[token_id] = doc
+        return found
@@ -1,10 +1,25 @@
 from __future__ import annotations
 
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, List, Tuple
 
+import poll_event_models as pem
 from caller_graphql import DomaGraphQLClient, DEFAULT_ENDPOINT
+from mongo import Mongo
 
-__all__ = ["DomaTokenActivitiesService"]
+__all__ = ["DomaTokenActivitiesService", "TOKEN_ACTIVITY_EVENT_TYPES"]
+
+
+# Poll events that add a token activity in the subgraph
+TOKEN_ACTIVITY_EVENT_TYPES = (
+    "NAME_TOKEN_MINTED",
+    "NAME_TOKEN_TRANSFERRED",
+    "NAME_TOKEN_LISTED",
+    "NAME_TOKEN_LISTING_CANCELLED",
+    "NAME_TOKEN_OFFER_RECEIVED",
+    "NAME_TOKEN_OFFER_CANCELLED",
+    "NAME_TOKEN_PURCHASED",
+)
 
 
 class DomaTokenActivitiesService:
@@ -12,6 +27,12 @@ class DomaTokenActivitiesService:
     High-level convenience wrapper for DomaGraphQLClient focused on Token Activities.
 
     Provides a helper to retrieve a paginated list of activities related to a specific token.
+
+    When constructed with a Mongo handle, it also keeps an append-only local history per token.
+    Token history only grows at the head, so refreshes fetch newest-first and stop at the
+    high-water mark, and full history is served from the store with cursor pagination. Tokens named
+    by poll events (apply_event) are refreshed in the background by refresh_stale(), so readers of
+    get_token_history(refresh=False) never wait for the subgraph.
     """
 
     def __init__(
@@ -22,17 +43,29 @@ class DomaTokenActivitiesService:
         api_key: Optional[str] = None,
         headers: Optional[dict] = None,
         timeout: float = 30.0,
+        mongo: Optional[Mongo] = None,
+        store_collection: str = "token_activities",
+        marks_collection: str = "token_activity_marks",
     ):
         """
         Initialize the service.
 
         You can provide an existing DomaGraphQLClient via 'client', or allow the service
         to construct one by passing endpoint/api_key/headers/timeout.
+        Pass 'mongo' to enable the local activity history (refresh_token_activities/get_token_history).
         """
         if client is not None:
             self.client = client
         else:
             self.client = DomaGraphQLClient(endpoint=endpoint, headers=headers, timeout=timeout, api_key=api_key)
+        self.mongo = mongo
+        self.store_collection = store_collection
+        self.marks_collection = marks_collection
+        # Token ids with activities newer than the store, in arrival order
+        self._stale: Dict[str, None] = {}
+        self._lock = threading.Lock()
+        if self.mongo is not None:
+            self.mongo.create_index(self.store_collection, [("tokenId", 1), ("createdAt", -1), ("key", -1)])
 
     def get_token_activities(
         self,
@@ -65,3 +98,136 @@ class DomaTokenActivitiesService:
             type=type,
             sortOrder=sort_order,
         )
+
+    @staticmethod
+    def _activity_key(item: Dict[str, Any]) -> str:
+        """Identity of an activity; several activities can share a transaction."""
+        return ":".join(str(item.get(f) or "") for f in ("createdAt", "txHash", "__typename", "orderId"))
+
+    def _require_store(self) -> Mongo:
+        if self.mongo is None:
+            raise RuntimeError("local activity history requires a Mongo handle (pass mongo=...)")
+        return self.mongo
+
+    def refresh_token_activities(self, token_id: str, *, take: int = 100) -> int:
+        """
+        Fetch activities newer than the token's high-water mark into the local store.
+
+        Pages are requested newest first and fetching stops at the first activity older than the
+        stored head, so a refresh of an unchanged token usually costs a single small request.
+
+        Parameters:
+        - token_id: Token ID to refresh. Required.
+        - take: Page size (max 100).
+
+        Returns:
+        - Number of new activities stored.
+        """
+        if not token_id or not isinstance(token_id, str):
+            raise ValueError("token_id must be a non-empty string")
+        mongo = self._require_store()
+        mark = mongo.find_one(self.marks_collection, {"_id": token_id}) or {}
+        mark_at = mark.get("createdAt") or ""
+        mark_keys = set(mark.get("keys") or [])
+
+        fresh: List[Tuple[str, Dict[str, Any]]] = []
+        skip = 0
+        while True:
+            resp = self.client.query_token_activities(tokenId=token_id, skip=skip, take=take, sortOrder="DESC")
+            items = resp.get("items", []) or []
+            reached_mark = False
+            for item in items:
+                created_at = item.get("createdAt") or ""
+                key = self._activity_key(item)
+                if created_at < mark_at:
+                    reached_mark = True
+                    break
+                if created_at == mark_at and key in mark_keys:
+                    # The subgraph orders ties arbitrarily, so a new activity may still follow at this timestamp
+                    continue
+                fresh.append((key, item))
+            if reached_mark or not resp.get("hasNextPage") or not items:
+                break
+            skip += take
+
+        for key, item in fresh:
+            mongo.upsert(self.store_collection, {"_id": f"{token_id}:{key}"},
+                         {"$setOnInsert": {"tokenId": token_id, "key": key,
+                                           "createdAt": item.get("createdAt") or "", "item": item}})
+        if fresh:
+            head_at = max(item.get("createdAt") or "" for _, item in fresh)
+            head_keys = {key for key, item in fresh if (item.get("createdAt") or "") == head_at}
+            if head_at == mark_at:
+                head_keys |= mark_keys
+            mongo.upsert(self.marks_collection, {"_id": token_id},
+                         {"$set": {"createdAt": head_at, "keys": sorted(head_keys)}})
+        return len(fresh)
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Queue the token of a stored poll event for refresh_stale() (see DomaEventFeed); memory only."""
+        data = pem.parse_event_data(event.get("type"), event.get("eventData"))
+        token_id = getattr(data, "tokenId", None)
+        if token_id:
+            with self._lock:
+                self._stale[token_id] = None
+
+    def refresh_stale(self, limit: int = 20) -> int:
+        """
+        Refresh up to 'limit' tokens queued by apply_event(), oldest first. Blocking: call from the Doma pool.
+
+        Returns:
+        - Number of new activities stored.
+        """
+        with self._lock:
+            token_ids = list(self._stale)[:limit]
+            for token_id in token_ids:
+                del self._stale[token_id]
+        stored = 0
+        for token_id in token_ids:
+            try:
+                stored += self.refresh_token_activities(token_id)
+            except Exception as e:
+                print(f"Error refreshing activities of token {token_id}: {e}")
+                with self._lock:
+                    self._stale.setdefault(token_id, None)
+        return stored
+
+    def get_token_history(
+        self,
+        token_id: str,
+        *,
+        cursor: Optional[str] = None,
+        take: int = 20,
+        refresh: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Get a token's activity history, newest first, from the local store.
+
+        Parameters:
+        - token_id: Token ID to read history for. Required.
+        - cursor: Opaque cursor from a previous call's 'nextCursor'; None for the newest page.
+        - take: Number of activities per page.
+        - refresh: Refresh from the subgraph before reading (only when reading the newest page).
+
+        Returns:
+        - Dictionary with 'items' (activity dictionaries as returned by the GraphQL API) and
+          'nextCursor' (None when there are no older activities).
+        """
+        if not token_id or not isinstance(token_id, str):
+            raise ValueError("token_id must be a non-empty string")
+        mongo = self._require_store()
+        if refresh and cursor is None:
+            self.refresh_token_activities(token_id)
+
+        query: Dict[str, Any] = {"tokenId": token_id}
+        if cursor:
+            created_at, _, key = cursor.partition("|")
+            query["$or"] = [{"createdAt": {"$lt": created_at}},
+                            {"createdAt": created_at, "key": {"$lt": key}}]
+        docs = mongo.find_many(self.store_collection, query,
+                               sort_by=[("createdAt", -1), ("key", -1)], limit=take + 1).to_list()
+        page = docs[:take]
+        next_cursor = None
+        if len(docs) > take:
+            next_cursor = f"{page[-1]['createdAt']}|{page[-1]['key']}"
+        return {"items": [d["item"] for d in page], "nextCursor": next_cursor}
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from mongo import Mongo
+
+__all__ = ["DomaEventFeed"]
+
+
+EventHandler = Callable[[Dict[str, Any]], None]
+
+
+class DomaEventFeed:
+    """
+    Tails the Poll API events that bg_poll.py persists into MongoDB and fans them out to subscribers.
+
+    bg_poll.py owns the Poll -> Acknowledge cycle; the bot process only reads what was already stored,
+    in ascending event id order, so in-memory state can follow the protocol without calling the Poll API.
+    """
+
+    def __init__(self, mongo: Mongo, collection: str = "doma_events", batch_size: int = 500):
+        self.mongo = mongo
+        self.collection = collection
+        self.batch_size = batch_size
+        self.last_id: Optional[int] = None
+        self._handlers: Dict[str, List[EventHandler]] = {}
+
+    def subscribe(self, event_types: Iterable[str], handler: EventHandler) -> None:
+        """
+        Register a handler for one or more Poll API event types.
+
+        Parameters:
+        - event_types: Event type strings (e.g. 'NAME_TOKEN_LISTED').
+        - handler: Callable receiving the full poll event dictionary (including 'eventData').
+        """
+        for et in event_types:
+            self._handlers.setdefault(et, []).append(handler)
+
+    def start_from_latest(self) -> Optional[int]:
+        """
+        Skip everything already stored, so only events newer than the current snapshot are dispatched.
+        Call this before bootstrapping in-memory state from the subgraph.
+        """
+        latest = self.mongo.find_many(self.collection, {"id": {"$ne": None}},
+                                      sort_by="id", sort_order="desc", limit=1).to_list()
+        self.last_id = int(latest[0]["id"]) if latest else 0
+        return self.last_id
+
+    def fetch(self) -> List[Dict[str, Any]]:
+        """Read the next batch of stored events without dispatching them (safe to run off the event loop)."""
+        if self.last_id is None:
+            self.start_from_latest()
+        query = {"id": {"$gt": self.last_id}}
+        return self.mongo.find_many(self.collection, query, sort_by="id", sort_order="asc",
+                                    limit=self.batch_size).to_list()
+
+    def apply(self, events: List[Dict[str, Any]]) -> int:
+        """Dispatch events returned by fetch(), in order, and advance the last dispatched id."""
+        dispatched = 0
+        for event in events:
+            if self.last_id is not None and int(event["id"]) <= self.last_id:
+                continue
+            self.dispatch(event)
+            self.last_id = int(event["id"])
+            dispatched += 1
+        return dispatched
+
+    def poll(self) -> int:
+        """
+        Dispatch stored events newer than the last dispatched id.
+
+        Returns:
+        - Number of events dispatched in this call.
+        """
+        return self.apply(self.fetch())
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        """Call every handler subscribed to the event's type; one failing handler does not stop the rest."""
+        for handler in self._handlers.get(event.get("type"), []):
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"Error handling {event.get('type')} event {event.get('id')}: {e}")
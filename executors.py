@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from metrics import MetricsRegistry
+from tracing import record_subsystem
+
+__all__ = ["BoundedExecutor"]
+
+
+class BoundedExecutor:
+    """
+    Thread pool for one blocking subsystem (MongoDB, Doma API, AI), awaited from the event loop.
+
+    At most 'max_workers' calls run at once and at most 'max_queue' more wait for a worker; further
+    callers wait on the loop (without blocking it) until there is room. Queue wait, run time and
+    saturation are recorded in the metrics registry under the pool name.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int = 100,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Parameters:
+        - name: Pool name, used for thread names and the 'pool' metric label.
+        - max_workers: Number of worker threads.
+        - max_queue: Calls allowed to wait for a worker before callers are held back.
+        - metrics: Registry receiving executor_* metrics; a private one is created when omitted.
+        """
+        if max_workers <= 0:
+            raise ValueError("max_workers must be a positive integer")
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max(0, max_queue)
+        self.metrics = metrics or MetricsRegistry()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        # Moving average of run time, read by load shedding
+        self.latency = 0.0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it belongs to the running loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        return self._slots
+
+    @property
+    def queued(self) -> int:
+        """Calls waiting for a worker."""
+        return max(0, self._pending - self._running)
+
+    def _report(self) -> None:
+        self.metrics.set_gauge("executor_running", self._running, pool=self.name)
+        self.metrics.set_gauge("executor_queued", self.queued, pool=self.name)
+        self.metrics.set_gauge("executor_saturation", self._running / self.max_workers, pool=self.name)
+
+    def _call(self, submitted: float, state: dict, fn: Callable[..., Any]) -> Any:
+        started = time.monotonic()
+        with self._lock:
+            if state["started"]:
+                # The caller gave up but the call could not be withdrawn; count it again while it runs
+                self._pending += 1
+            state["started"] = True
+            self._running += 1
+            self._report()
+        self.metrics.observe("executor_queue_wait_seconds", started - submitted, pool=self.name)
+        try:
+            return fn()
+        finally:
+            elapsed = time.monotonic() - started
+            self.metrics.observe("executor_run_seconds", elapsed, pool=self.name)
+            with self._lock:
+                self.latency += 0.2 * (elapsed - self.latency)
+                self._running -= 1
+                self._pending -= 1
+                self._report()
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool and return its result (exceptions propagate)."""
+        submitted = time.monotonic()
+        slots = self._semaphore()
+        if slots.locked():
+            self.metrics.inc("executor_backpressure_total", pool=self.name)
+        async with slots:
+            with self._lock:
+                self._pending += 1
+                self._report()
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            state = {"started": False}
+            try:
+                return await loop.run_in_executor(self._pool, self._call, submitted, state, call)
+            finally:
+                # Includes queue wait: that is what the awaiting handler experiences
+                record_subsystem(self.name, time.monotonic() - submitted)
+                with self._lock:
+                    # Cancelled before a worker picked it up
+                    if not state["started"]:
+                        state["started"] = True
+                        self._pending -= 1
+                        self._report()
+
+    def prestart(self, timeout: float = 5.0) -> None:
+        """Start every worker thread now, so the first calls do not pay for thread creation."""
+        # Workers are only created while none is idle, so keep each one busy until all exist
+        barrier = threading.Barrier(self.max_workers)
+        futures = [self._pool.submit(barrier.wait, timeout) for _ in range(self.max_workers)]
+        for future in futures:
+            future.exception()
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+__all__ = ["gather_within"]
+
+
+ProgressCallback = Callable[[int, int], Awaitable[Any]]
+
+
+async def gather_within(
+    calls: Mapping[Hashable, Awaitable[Any]],
+    timeout: float,
+    on_progress: Optional[ProgressCallback] = None,
+) -> Tuple[Dict[Hashable, Any], Dict[Hashable, BaseException], List[Hashable]]:
+    """
+    Run awaitables concurrently and collect whatever finished before the deadline.
+
+    Parameters:
+    - calls: Awaitables by key (e.g. one search per keyword).
+    - timeout: Seconds until the remaining calls are cancelled.
+    - on_progress: Optional coroutine function called with (finished, total) after each completion;
+      its errors are ignored so progress reporting cannot break the fan-out.
+
+    Returns:
+    - (results, errors, timed_out): results and exceptions by key, and the keys that did not finish.
+    """
+    tasks = {asyncio.ensure_future(aw): key for key, aw in calls.items()}
+    results: Dict[Hashable, Any] = {}
+    errors: Dict[Hashable, BaseException] = {}
+    pending = set(tasks)
+    deadline = time.monotonic() + timeout
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                key = tasks[task]
+                if task.cancelled():
+                    errors[key] = asyncio.CancelledError()
+                elif task.exception() is not None:
+                    errors[key] = task.exception()
+                else:
+                    results[key] = task.result()
+            if done and on_progress is not None:
+                try:
+                    await on_progress(len(results) + len(errors), len(tasks))
+                except Exception as e:
+                    print(f"Error reporting progress: {e}")
+    finally:
+        for task in pending:
+            task.cancel()
+    return results, errors, [tasks[task] for task in pending]
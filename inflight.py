@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from telethon import events
+
+from metrics import MetricsRegistry
+
+__all__ = ["InflightRegistry", "deduplicated"]
+
+
+class InflightRegistry:
+    """
+    Tracks which (user, callback data) requests are running or have just finished.
+
+    A tap is a duplicate while the same user's request for the same data is still running, or when
+    it comes within 'debounce' seconds after that request finished.
+    """
+
+    def __init__(self, debounce: float = 1.0):
+        """
+        Parameters:
+        - debounce: Seconds after a request finishes during which the same tap is still dropped.
+        """
+        self.debounce = debounce
+        self._running: Dict[Tuple[Hashable, bytes], float] = {}
+        self._finished: Dict[Tuple[Hashable, bytes], float] = {}
+
+    def _prune(self, now: float) -> None:
+        if len(self._finished) > 1024:
+            self._finished = {k: t for k, t in self._finished.items() if now - t < self.debounce}
+
+    def begin(self, user_id: Hashable, data: bytes) -> bool:
+        """Register a request; returns False if it duplicates one in flight or just finished."""
+        key = (user_id, data)
+        now = time.monotonic()
+        if key in self._running:
+            return False
+        finished = self._finished.get(key)
+        if finished is not None and now - finished < self.debounce:
+            return False
+        self._running[key] = now
+        self._prune(now)
+        return True
+
+    def end(self, user_id: Hashable, data: bytes) -> None:
+        key = (user_id, data)
+        self._running.pop(key, None)
+        self._finished[key] = time.monotonic()
+
+    def is_running(self, user_id: Hashable, data: bytes) -> bool:
+        return (user_id, data) in self._running
+
+
+def deduplicated(registry: InflightRegistry, metrics: Optional[MetricsRegistry] = None):
+    """
+    Decorator for callback query handlers that drops duplicate taps.
+
+    A duplicate is answered right away (so the client stops its spinner) and not processed again.
+    Events without callback data (e.g. /start messages) pass through.
+    """
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        @functools.wraps(fn)
+        async def wrapper(event, *args, **kwargs):
+            data = getattr(event, "data", None)
+            if not isinstance(data, bytes):
+                return await fn(event, *args, **kwargs)
+            if not registry.begin(event.sender_id, data):
+                if metrics is not None:
+                    metrics.inc("taps_dropped_total", handler=fn.__name__)
+                await event.answer()
+                raise events.StopPropagation
+            try:
+                return await fn(event, *args, **kwargs)
+            finally:
+                registry.end(event.sender_id, data)
+        return wrapper
+    return decorator
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from doma_names_service import DomaNamesService
+from lru_cache import LRUCache, MISSING
+
+__all__ = ["InlineSearch", "contains"]
+
+
+def contains(query: str, name: str) -> bool:
+    """Default local match: the names filter matches names containing the query, ignoring case."""
+    return query in name.lower()
+
+
+class InlineSearch:
+    """
+    Answers inline queries ('@bot <filter>') a page at a time from DomaNamesService.
+
+    Results are fetched in chunks of 'fetch_size' names with get_names_page (which caches each chunk).
+    When a query's whole result set fits in one chunk it is kept per query, and longer queries that
+    extend it (typing 'abc' after 'ab') are answered by filtering that set locally, without a request.
+    """
+
+    def __init__(self, names: DomaNamesService, *, page_size: int = 20, fetch_size: int = 100,
+                 min_length: int = 2, cache: Optional[LRUCache] = None,
+                 matches: Callable[[str, str], bool] = contains):
+        """
+        Parameters:
+        - names: Service used for the searches.
+        - page_size: Results per inline answer (Telegram shows at most 50).
+        - fetch_size: Names per request (max 100); must be a multiple of page_size.
+        - min_length: Shorter queries get no results.
+        - cache: Complete result sets by normalized query.
+        - matches: Local filter used to narrow a cached prefix result set.
+        """
+        if not 0 < page_size <= 50 or not 0 < fetch_size <= 100 or fetch_size % page_size:
+            raise ValueError("page_size must be 1..50 and divide fetch_size (1..100)")
+        self.names = names
+        self.page_size = page_size
+        self.fetch_size = fetch_size
+        self.min_length = max(1, min_length)
+        self.cache = cache if cache is not None else LRUCache(maxsize=2000, ttl=60)
+        self.matches = matches
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return (query or "").strip().lower()
+
+    def complete_results(self, query: str) -> Optional[Tuple[str, ...]]:
+        """Cached complete result set of the query, derived from its longest cached prefix if needed."""
+        for end in range(len(query), self.min_length - 1, -1):
+            found = self.cache.get(query[:end])
+            if found is MISSING:
+                continue
+            if end < len(query):
+                found = tuple(name for name in found if self.matches(query, name))
+                self.cache.put(query, found)
+            return found
+        return None
+
+    def cached_search(self, query: str, offset: int = 0):
+        """search() answered from cached result sets only, without blocking; MISSING when a request is needed."""
+        query = self.normalize(query)
+        offset = max(0, int(offset))
+        if len(query) < self.min_length:
+            return [], None
+        complete = self.complete_results(query)
+        if complete is None:
+            return MISSING
+        return self._page(complete[offset:offset + self.page_size], offset, len(complete))
+
+    @staticmethod
+    def _page(names: Sequence[str], offset: int, total: int) -> Tuple[List[str], Optional[int]]:
+        end = offset + len(names)
+        return list(names), (end if names and end < total else None)
+
+    def search(self, query: str, offset: int = 0) -> Tuple[List[str], Optional[int]]:
+        """
+        Get one page of names for an inline query.
+
+        Parameters:
+        - query: Text typed after the bot username.
+        - offset: Index of the first result (the previous answer's next offset).
+
+        Returns:
+        - (names, next_offset), next_offset being None on the last page.
+        """
+        query = self.normalize(query)
+        offset = max(0, int(offset))
+        if len(query) < self.min_length:
+            return [], None
+        complete = self.complete_results(query)
+        if complete is not None:
+            return self._page(complete[offset:offset + self.page_size], offset, len(complete))
+        chunk = offset // self.fetch_size
+        result = self.names.get_names_page(name_filter=query, page=chunk + 1, page_size=self.fetch_size)
+        total = result.get("totalCount") or 0
+        if chunk == 0 and total <= self.fetch_size:
+            self.cache.put(query, tuple(result["names"]))
+        start = offset - chunk * self.fetch_size
+        return self._page(result["names"][start:start + self.page_size], offset, total)
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import poll_event_models as pem
+from doma_listings_service import DomaListingsService
+
+__all__ = ["ListingsBook", "LISTING_EVENT_TYPES"]
+
+
+LISTING_EVENT_TYPES = (
+    "NAME_TOKEN_LISTED",
+    "NAME_TOKEN_LISTING_CANCELLED",
+    "NAME_TOKEN_PURCHASED",
+)
+
+# Poll events only carry the currency symbol; decimals learned from the subgraph take precedence.
+DEFAULT_DECIMALS = {"USDC": 6, "USDT": 6}
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _tld(name: Optional[str]) -> Optional[str]:
+    if not name or "." not in name:
+        return None
+    return name.rsplit(".", 1)[1].lower()
+
+
+class ListingsBook:
+    """
+    In-memory book of active "Buy Now" listings, kept current from marketplace poll events.
+
+    Items have the same shape as PaginatedNameListingsResponse items, so views render them unchanged.
+    Indexed by creation time, TLD and normalized price; reads never call the subgraph. Expired listings
+    and listings older than the window are dropped from every index on each event and read.
+    """
+
+    def __init__(self, *, window_days: int = 7, name_resolver: Optional[Callable[[str], Optional[str]]] = None):
+        """
+        Parameters:
+        - window_days: How far back listings are kept and served.
+        - name_resolver: Optional tokenId -> name lookup for listing events that carry no name. It is
+          called on the event loop, so it must not block; names it cannot give are listed by unnamed().
+        """
+        self.window = timedelta(days=window_days)
+        self.name_resolver = name_resolver
+        self._listings: Dict[str, Dict[str, Any]] = {}
+        self._by_created: List[Tuple[str, str]] = []
+        self._by_price: List[Tuple[float, str]] = []
+        self._by_expiry: List[Tuple[str, str]] = []
+        self._by_tld: Dict[str, Set[str]] = {}
+        self._order_by_token: Dict[str, Set[str]] = {}
+        self._name_by_token: Dict[str, str] = {}
+        self._unnamed: Set[str] = set()
+        # Events received while a fetch() is in flight (None when not loading)
+        self._loading: Optional[List[Dict[str, Any]]] = None
+        self._decimals_by_symbol: Dict[str, int] = dict(DEFAULT_DECIMALS)
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    @staticmethod
+    def _key(item: Dict[str, Any]) -> Optional[str]:
+        return item.get("externalId") or item.get("id")
+
+    @staticmethod
+    def _price_value(item: Dict[str, Any]) -> float:
+        decimals = int(item.get("currency", {}).get("decimals", 0) or 0)
+        return int(item.get("price", 0) or 0) / (10 ** decimals)
+
+    def add(self, item: Dict[str, Any]) -> None:
+        """Insert or replace a listing item."""
+        key = self._key(item)
+        if not key:
+            return
+        if key in self._listings:
+            self.remove(key)
+        self._listings[key] = item
+        insort(self._by_created, (item.get("createdAt") or "", key))
+        insort(self._by_price, (self._price_value(item), key))
+        if item.get("expiresAt"):
+            insort(self._by_expiry, (item["expiresAt"], key))
+        tld = _tld(item.get("name"))
+        if tld:
+            self._by_tld.setdefault(tld, set()).add(key)
+        token_id = item.get("tokenId")
+        if token_id:
+            self._order_by_token.setdefault(token_id, set()).add(key)
+            if item.get("name"):
+                self._name_by_token[token_id] = item["name"]
+            else:
+                self._unnamed.add(token_id)
+        currency = item.get("currency") or {}
+        if currency.get("symbol") and currency.get("decimals") is not None:
+            self._decimals_by_symbol[currency["symbol"]] = int(currency["decimals"])
+
+    def remove(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a listing by order id; returns the removed item, if any."""
+        item = self._listings.pop(order_id, None)
+        if item is None:
+            return None
+        for index, entry in ((self._by_created, (item.get("createdAt") or "", order_id)),
+                             (self._by_price, (self._price_value(item), order_id)),
+                             (self._by_expiry, (item.get("expiresAt"), order_id))):
+            i = bisect_left(index, entry) if entry[0] is not None else len(index)
+            if i < len(index) and index[i] == entry:
+                del index[i]
+        tld = _tld(item.get("name"))
+        in_tld = self._by_tld.get(tld)
+        if in_tld is not None:
+            in_tld.discard(order_id)
+            if not in_tld:
+                del self._by_tld[tld]
+        token_id = item.get("tokenId")
+        token_orders = self._order_by_token.get(token_id)
+        if token_orders is not None:
+            token_orders.discard(order_id)
+            if not token_orders:
+                del self._order_by_token[token_id]
+                self._name_by_token.pop(token_id, None)
+            if not any(not self._listings[k].get("name") for k in token_orders):
+                self._unnamed.discard(token_id)
+        return item
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """
+        Drop expired listings and listings created before the window.
+
+        Both indexes are sorted, so only the dropped entries are visited.
+
+        Returns:
+        - Number of listings dropped.
+        """
+        now_dt = now or datetime.now(timezone.utc)
+        now_iso, since = _iso(now_dt), _iso(now_dt - self.window)
+        stale = []
+        for index, limit in ((self._by_created, since), (self._by_expiry, now_iso)):
+            for value, key in index:
+                if value >= limit:
+                    break
+                stale.append(key)
+        dropped = 0
+        for key in stale:
+            if self.remove(key) is not None:
+                dropped += 1
+        return dropped
+
+    def bootstrap(self, service: DomaListingsService, *, take: int = 100) -> int:
+        """
+        Load every listing created within the window from the subgraph (begin_load, fetch and load in one call).
+
+        Returns:
+        - Number of listings loaded.
+        """
+        self.begin_load()
+        try:
+            items = self.fetch(service, take=take)
+        except Exception:
+            self.abort_load()
+            raise
+        return self.load(items)
+
+    def fetch(self, service: DomaListingsService, *, take: int = 100) -> List[Dict[str, Any]]:
+        """
+        Fetch every listing created within the window, without touching the book.
+
+        Blocking and side-effect free, so it can run in a worker pool; pass the result to load() on the thread
+        that owns the book. Exceptions propagate and nothing is loaded.
+        """
+        created_since = _iso(datetime.now(timezone.utc) - self.window)
+        skip = 0
+        fetched: List[Dict[str, Any]] = []
+        while True:
+            resp = service.get_listings(skip=skip, take=take, created_since=created_since)
+            items = resp.get("items", []) or []
+            fetched.extend(items)
+            if not resp.get("hasNextPage") or not items:
+                break
+            skip += take
+        return fetched
+
+    def begin_load(self) -> None:
+        """Start buffering events; call before fetch() and follow with load() or abort_load()."""
+        if self._loading is None:
+            self._loading = []
+
+    def abort_load(self) -> None:
+        """Apply the events buffered for a fetch that failed, so the book keeps following the feed."""
+        buffered, self._loading = self._loading or [], None
+        for event in buffered:
+            self.apply_event(event)
+
+    def load(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Add listings returned by fetch(), then replay the events buffered since begin_load(), so a listing
+        cancelled or sold during the fetch does not come back.
+
+        Returns:
+        - Number of listings loaded.
+        """
+        for item in items:
+            self.add(item)
+        self.abort_load()
+        return len(items)
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Update the book from a stored poll event (see DomaEventFeed)."""
+        if self._loading is not None:
+            # The snapshot being fetched may predate this event; load() replays it
+            self._loading.append(event)
+            return
+        self.prune()
+        data = pem.parse_event_data(event.get("type"), event.get("eventData"))
+        if isinstance(data, pem.NameTokenListedData):
+            name = event.get("name") or self._name_by_token.get(data.tokenId)
+            if not name and self.name_resolver:
+                name = self.name_resolver(data.tokenId)
+            symbol = data.payment.currencySymbol if data.payment else None
+            self.add({
+                "id": data.orderId,
+                "externalId": data.orderId,
+                "price": data.payment.price if data.payment else "0",
+                "offererAddress": data.seller,
+                "orderbook": data.orderbook,
+                "currency": {"name": symbol, "symbol": symbol,
+                             "decimals": self._decimals_by_symbol.get(symbol, 18)},
+                "expiresAt": data.expiresAt,
+                "createdAt": data.createdAt,
+                "updatedAt": data.createdAt,
+                "name": name,
+                "tokenId": data.tokenId,
+                "tokenAddress": data.tokenAddress,
+            })
+        elif isinstance(data, pem.NameTokenListingCancelledData):
+            self.remove(data.orderId)
+        elif isinstance(data, pem.NameTokenPurchasedData):
+            # A sale ends every open listing of the token, not only the filled order
+            self.remove(data.orderId)
+            for order_id in list(self._order_by_token.get(data.tokenId, ())):
+                self.remove(order_id)
+
+    def unnamed(self) -> List[str]:
+        """Token ids of listings still waiting for their name (not served until named)."""
+        return list(self._unnamed)
+
+    def apply_names(self, names: Dict[str, str]) -> int:
+        """
+        Name the listings of tokens resolved off the loop (see unnamed()).
+
+        Returns:
+        - Number of listings named.
+        """
+        named = 0
+        for token_id, name in names.items():
+            if not name:
+                continue
+            self._name_by_token[token_id] = name
+            self._unnamed.discard(token_id)
+            for key in list(self._order_by_token.get(token_id, ())):
+                item = self._listings.get(key)
+                if item is not None and not item.get("name"):
+                    # Re-add so the TLD index sees the name
+                    self.add(dict(item, name=name))
+                    named += 1
+        return named
+
+    def _is_live(self, item: Dict[str, Any], now: str, since: str) -> bool:
+        expires_at = item.get("expiresAt")
+        if expires_at and expires_at < now:
+            return False
+        return (item.get("createdAt") or "") >= since and bool(item.get("name"))
+
+    def _page(self, keys: List[str], page: int, page_size: int) -> Tuple[List[Dict[str, Any]], int, int]:
+        now_dt = datetime.now(timezone.utc)
+        now, since = _iso(now_dt), _iso(now_dt - self.window)
+        live = [self._listings[k] for k in keys if self._is_live(self._listings[k], now, since)]
+        total = len(live)
+        page_count = max(1, ((total - 1) // page_size) + 1)
+        page = min(max(1, int(page)), page_count)
+        return live[(page - 1) * page_size:page * page_size], total, page_count
+
+    def recent(self, page: int = 1, page_size: int = 10,
+               tld: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int, int]:
+        """
+        Get a page of listings, newest first.
+
+        Parameters:
+        - page: 1-based page number; clamped to the available range.
+        - page_size: Items per page.
+        - tld: Optional TLD filter (e.g. 'com').
+
+        Returns:
+        - (items, total_count, page_count)
+        """
+        self.prune()
+        keys = [k for _, k in reversed(self._by_created)]
+        if tld:
+            in_tld = self._by_tld.get(tld.lower().lstrip("."), set())
+            keys = [k for k in keys if k in in_tld]
+        return self._page(keys, page, page_size)
+
+    def by_price(self, page: int = 1, page_size: int = 10, tld: Optional[str] = None,
+                 descending: bool = False) -> Tuple[List[Dict[str, Any]], int, int]:
+        """Get a page of listings ordered by price (cheapest first unless descending)."""
+        self.prune()
+        ordered = reversed(self._by_price) if descending else iter(self._by_price)
+        keys = [k for _, k in ordered]
+        if tld:
+            in_tld = self._by_tld.get(tld.lower().lstrip("."), set())
+            keys = [k for k in keys if k in in_tld]
+        return self._page(keys, page, page_size)
+
+    def tlds(self) -> List[str]:
+        """TLDs that currently have at least one listing."""
+        self.prune()
+        return sorted(self._by_tld)
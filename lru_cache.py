@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+__all__ = ["LRUCache", "MISSING"]
+
+
+# Distinguishes "not cached" from a cached None (e.g. a name known to have no token)
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Small in-process least-recently-used cache, with optional expiry.
+
+    Thread-safe: caches are shared between the event loop and the executor pools, so every operation
+    holds a lock (get reorders and may evict, which is not atomic under the GIL).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Parameters:
+        - maxsize: Maximum number of entries kept.
+        - ttl: Optional time-to-live in seconds; expired entries behave as missing.
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._expires: dict = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not MISSING
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return the cached value and mark it as most recently used, or default."""
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            expires = self._expires.get(key)
+            if expires is not None and expires < time.monotonic():
+                self.pop(key)
+                return default
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Insert or replace a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl is not None or ttl is not None:
+                self._expires[key] = time.monotonic() + (ttl if ttl is not None else self.ttl)
+            if len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                self._expires.pop(evicted, None)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            self._expires.pop(key, None)
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
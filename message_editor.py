@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+from typing import Any, Optional
+
+from telethon.errors import (MessageAuthorRequiredError, MessageEditTimeExpiredError, MessageIdInvalidError,
+                             MessageNotModifiedError)
+
+from lru_cache import LRUCache
+from metrics import MetricsRegistry
+from send_queue import SendQueue
+
+__all__ = ["MessageEditor", "content_digest"]
+
+
+# Edit failures meaning this message can no longer be edited (deleted, too old, not ours)
+_NOT_EDITABLE = (MessageIdInvalidError, MessageEditTimeExpiredError, MessageAuthorRequiredError)
+
+
+def _button_fields(button) -> tuple:
+    return (type(button).__name__, getattr(button, "text", None), getattr(button, "data", None),
+            getattr(button, "url", None))
+
+
+def content_digest(text: str, buttons: Any = None) -> bytes:
+    """Digest of a message's text and inline keyboard (rows of buttons, a single row or one button)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update((text or "").encode("utf-8"))
+    rows = buttons if isinstance(buttons, (list, tuple)) else [buttons] if buttons is not None else []
+    for row in rows:
+        h.update(b"\x1e")
+        for button in row if isinstance(row, (list, tuple)) else [row]:
+            h.update(repr(_button_fields(button)).encode("utf-8"))
+    return h.digest()
+
+
+class MessageEditor:
+    """
+    Edits the message a callback button belongs to instead of sending a new one.
+
+    The digest of the last content sent to each message is kept in an LRU cache, so re-tapping the
+    current page costs no API call; Telegram's MessageNotModifiedError is treated the same way. When
+    the message can no longer be edited (too old, deleted, not the bot's), the content is sent as a new
+    message; any other error is raised to the caller.
+    """
+
+    def __init__(self, sender: SendQueue, cache: Optional[LRUCache] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Parameters:
+        - sender: Queue through which edits and fallback messages are sent.
+        - cache: Content digest by (chat_id, message_id).
+        - metrics: Registry receiving message_edits_total.
+        """
+        self.sender = sender
+        self.cache = cache if cache is not None else LRUCache(maxsize=10000)
+        self.metrics = metrics or MetricsRegistry()
+
+    async def edit(self, event, text: str, buttons: Any = None) -> bool:
+        """
+        Show text and buttons in the event's message.
+
+        Returns:
+        - False when the message already showed this content, True otherwise.
+        """
+        key = (event.chat_id, event.message_id)
+        digest = content_digest(text, buttons)
+        if self.cache.get(key) == digest:
+            self.metrics.inc("message_edits_total", result="unchanged")
+            return False
+        try:
+            await self.sender.call(event.chat_id, functools.partial(event.edit, text, buttons=buttons))
+            result = "edited"
+        except MessageNotModifiedError:
+            result = "unchanged"
+        except _NOT_EDITABLE as e:
+            print(f"Message {key} can no longer be edited, sending a new one: {e}")
+            message = await self.sender.call(event.chat_id,
+                                             functools.partial(event.respond, text, buttons=buttons))
+            self.metrics.inc("message_edits_total", result="resent")
+            key = (event.chat_id, getattr(message, "id", None))
+            self.cache.put(key, digest)
+            return True
+        self.cache.put(key, digest)
+        self.metrics.inc("message_edits_total", result=result)
+        return result == "edited"
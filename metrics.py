@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Tuple
+
+__all__ = ["MetricsRegistry"]
+
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, str]) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class MetricsRegistry:
+    """
+    Process-local counters, gauges and summaries (count/sum/max), safe to update from any thread.
+
+    render() returns a Prometheus-style text dump, so the numbers can be read by an admin or scraped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[_Key, float] = {}
+        self._gauges: Dict[_Key, float] = {}
+        self._summaries: Dict[_Key, list] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Add to a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to its current value."""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record one observation (e.g. a duration in seconds) in a summary."""
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                self._summaries[key] = [1, value, value]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = max(summary[2], value)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Current values as plain dictionaries.
+
+        Returns:
+        - Dictionary mapping 'name{labels}' to a value for counters and gauges, and to
+          {'count', 'sum', 'max'} for summaries.
+        """
+        with self._lock:
+            out: Dict[str, Dict[str, float]] = {}
+            for key, value in list(self._counters.items()) + list(self._gauges.items()):
+                out[key[0] + _label_text(key[1])] = value
+            for key, (count, total, peak) in self._summaries.items():
+                out[key[0] + _label_text(key[1])] = {"count": count, "sum": total, "max": peak}
+            return out
+
+    def render(self) -> str:
+        """Prometheus-style text dump of every metric."""
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f"{name}{_label_text(labels)} {value:g}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                lines.append(f"{name}{_label_text(labels)} {value:g}")
+            for (name, labels), (count, total, peak) in sorted(self._summaries.items()):
+                lines.append(f"{name}_count{_label_text(labels)} {count}")
+                lines.append(f"{name}_sum{_label_text(labels)} {total:.6f}")
+                lines.append(f"{name}_max{_label_text(labels)} {peak:.6f}")
+        return "\n".join(lines)
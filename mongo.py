@@ -17,6 +17,14 @@ class Mongo:
         else:
             return None
 
+    def insert_new(self, collection, docs, key):
+        """Insert the documents whose 'key' value is not stored yet (needs a unique index on 'key')."""
+        if not docs:
+            return None
+        return self.db[collection].bulk_write(
+            [pymongo.UpdateOne({key: doc[key]}, {'$setOnInsert': doc}, upsert=True) for doc in docs],
+            ordered=False)
+
     def find(self, collection, query=None, page=1, sort_by='_id', sort_order='desc'):
         page = int(page)
         return self.db[collection]\
@@ -25,6 +33,18 @@ class Mongo:
                    .skip((page-1)*self.per_page)\
                    .limit(self.per_page)
 
+    def find_many(self, collection, query=None, sort_by='_id', sort_order='asc', limit=0):
+        cursor = self.db[collection].find(query if query else {})
+        if isinstance(sort_by, list):
+            # Compound sort given as [(field, pymongo.ASCENDING|DESCENDING), ...]
+            cursor = cursor.sort(sort_by)
+        else:
+            cursor = cursor.sort(sort_by, -1 if sort_order == 'desc' else 1)
+        return cursor.limit(limit)
+
+    def find_one(self, collection, query=None):
+        return self.db[collection].find_one(query if query else {})
+
     def count(self, collection, query=None):
         return self.db[collection].count_documents(query if query else {})
 
@@ -34,6 +54,12 @@ class Mongo:
     def update(self, collection, query, update):
         return self.db[collection].update_many(query, update)
 
+    def upsert(self, collection, query, update):
+        return self.db[collection].update_one(query, update, upsert=True)
+
+    def create_index(self, collection, keys, **kwargs):
+        return self.db[collection].create_index(keys, **kwargs)
+
     def delete(self, collection, query):
         self.db[collection].delete_many(query)
 
@@ -53,5 +79,9 @@ class Mongo:
             print(f"An error occurred: {e}")
             return None
 
+    def ping(self):
+        # Opens the connection pool; pymongo connects lazily otherwise
+        return self.db.command('ping')
+
     def close(self):
         self.db.client.close()
\ No newline at end of file
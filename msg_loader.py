@@ -1,16 +1,46 @@
-import polib
 import glob
+import json
 import os
-from typing import Dict
+from typing import Dict, List, Optional
 
 
-def load_translations(folder_path: str = 'translations') -> Dict[str, Dict[str, str]]:
+def _fingerprint(po_files: List[str]) -> List[List]:
+    # Any edit, addition or removal of a .po file changes the fingerprint
+    return [[os.path.basename(f), os.stat(f).st_mtime_ns, os.stat(f).st_size] for f in sorted(po_files)]
+
+
+def _read_cache(cache_file: str, fingerprint: List[List]) -> Optional[Dict[str, Dict[str, str]]]:
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('fingerprint') != fingerprint:
+        return None
+    return cached.get('translations')
+
+
+def _write_cache(cache_file: str, fingerprint: List[List], translations: Dict[str, Dict[str, str]]) -> None:
+    try:
+        tmp = f'{cache_file}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint, 'translations': translations}, f, ensure_ascii=False)
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        print(f"Warning: could not write translation cache {cache_file}: {e}")
+
+
+def load_translations(folder_path: str = 'translations',
+                      cache_file: Optional[str] = None) -> Dict[str, Dict[str, str]]:
     """
     Scans a folder for .po files matching the pattern 'msg_XX.po', where XX is
     the language code, and creates a dictionary mapping msgid to msgstr for each language.
 
     Args:
         folder_path: The directory containing the .po files. Defaults to 'translations'.
+        cache_file: Optional JSON file holding the parsed catalogs. It is used while no .po file
+            changed (same names, sizes and modification times) and rewritten otherwise, so restarts
+            skip parsing with polib.
 
     Returns:
         A dictionary where keys are language codes (e.g., 'en', 'ru') and values
@@ -25,6 +55,16 @@ def load_translations(folder_path: str = 'translations') -> Dict[str, Dict[str,
         print(f"Warning: No .po files found matching '{pattern}'.")
         return {}
 
+    fingerprint = _fingerprint(po_files)
+    if cache_file:
+        cached = _read_cache(cache_file, fingerprint)
+        if cached is not None:
+            print(f"Loaded {len(cached)} translation(s) from {cache_file}.")
+            return cached
+
+    # polib is only needed when the catalogs have to be parsed
+    import polib
+
     # Initialize the main results dictionary
     all_translations: Dict[str, Dict[str, str]] = {}
 
@@ -62,4 +102,6 @@ def load_translations(folder_path: str = 'translations') -> Dict[str, Dict[str,
             # Handle potential file reading or parsing errors
             print(f"Error processing file {file_path}: {e}")
 
+    if cache_file and len(all_translations) == len(po_files):
+        _write_cache(cache_file, fingerprint, all_translations)
     return all_translations
\ No newline at end of file
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import poll_event_models as pem
+from doma_offers_service import DomaOffersService
+from listings_book import DEFAULT_DECIMALS
+from lru_cache import LRUCache
+
+__all__ = ["NameStatsCache", "NAME_STATS_EVENT_TYPES"]
+
+
+NAME_STATS_EVENT_TYPES = (
+    "NAME_TOKEN_OFFER_RECEIVED",
+    "NAME_TOKEN_OFFER_CANCELLED",
+    "NAME_TOKEN_PURCHASED",
+)
+
+
+def _higher(offer: Dict[str, Any], current: Optional[Dict[str, Any]]) -> Optional[bool]:
+    """
+    Whether offer beats current, or None when they cannot be compared.
+
+    Amounts in different currencies are not comparable without exchange rates, which the subgraph
+    does not provide.
+    """
+    if not current:
+        return True
+    if (offer.get("currency") or {}).get("symbol") != (current.get("currency") or {}).get("symbol"):
+        return None
+    return int(offer.get("price", 0) or 0) > int(current.get("price", 0) or 0)
+
+
+class NameStatsCache:
+    """
+    Offer statistics (highest offer, active offers, offers in the last 3 days) per tokenId.
+
+    Reads never call the subgraph: a miss returns None and queues the token for the next refresh().
+    Cached entries follow offer poll events; entries that are viewed often are recomputed in batches
+    once they are older than max_age, which also lets 'offersLast3Days' age out.
+    """
+
+    def __init__(self, *, maxsize: int = 10000, ttl: float = 3600.0, max_age: float = 300.0):
+        """
+        Parameters:
+        - maxsize: Maximum number of tokens kept.
+        - ttl: Seconds after which an entry is dropped, so names nobody views stop being tracked.
+        - max_age: Seconds after which a viewed entry is recomputed from the subgraph.
+        """
+        self.max_age = max_age
+        self._stats = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._wanted: Dict[str, None] = {}
+        self._hits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def get(self, token_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Cached NameStatisticsModel dictionary of a token, or None.
+
+        A miss queues the token, so the next card for the same name has its statistics.
+        """
+        if not token_id:
+            return None
+        with self._lock:
+            entry = self._stats.get(token_id, None)
+            self._hits[token_id] = self._hits.get(token_id, 0) + 1
+            if entry is None:
+                self._wanted[token_id] = None
+                return None
+            return entry["stats"]
+
+    def put(self, token_id: str, stats: Dict[str, Any]) -> None:
+        with self._lock:
+            self._stats.put(token_id, {"stats": dict(stats), "fetchedAt": time.monotonic()})
+            self._wanted.pop(token_id, None)
+
+    def invalidate(self, token_id: str) -> None:
+        """Keep serving the entry, but recompute it on the next refresh."""
+        with self._lock:
+            self._invalidate(token_id)
+
+    def _invalidate(self, token_id: str) -> None:
+        # Caller holds the lock
+        if self._stats.get(token_id, None) is not None:
+            self._wanted[token_id] = None
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Update cached statistics from a stored poll event (see DomaEventFeed)."""
+        data = pem.parse_event_data(event.get("type"), event.get("eventData"))
+        if data is None:
+            return
+        with self._lock:
+            entry = self._stats.get(data.tokenId, None)
+            if entry is None:
+                return
+            # Readers get the same dict, so it is only changed under the lock
+            stats = entry["stats"]
+            if isinstance(data, pem.NameTokenOfferReceivedData):
+                symbol = data.payment.currencySymbol if data.payment else None
+                offer = {
+                    "id": data.orderId,
+                    "externalId": data.orderId,
+                    "price": data.payment.price if data.payment else "0",
+                    "offererAddress": data.buyer,
+                    "orderbook": data.orderbook,
+                    "currency": {"name": symbol, "symbol": symbol, "decimals": DEFAULT_DECIMALS.get(symbol, 18)},
+                    "expiresAt": data.expiresAt,
+                    "createdAt": data.createdAt,
+                }
+                stats["activeOffers"] = (stats.get("activeOffers") or 0) + 1
+                stats["offersLast3Days"] = (stats.get("offersLast3Days") or 0) + 1
+                higher = _higher(offer, stats.get("highestOffer"))
+                if higher:
+                    stats["highestOffer"] = offer
+                elif higher is None:
+                    # Another currency: let the subgraph decide which offer it reports as highest
+                    self._invalidate(data.tokenId)
+            elif isinstance(data, pem.NameTokenOfferCancelledData):
+                stats["activeOffers"] = max(0, (stats.get("activeOffers") or 0) - 1)
+                highest = stats.get("highestOffer") or {}
+                if data.orderId in (highest.get("externalId"), highest.get("id")):
+                    # The runner-up is not known here
+                    self._invalidate(data.tokenId)
+            elif isinstance(data, pem.NameTokenPurchasedData):
+                # A purchase may fill an offer or a listing; let the subgraph settle the counts
+                self._invalidate(data.tokenId)
+
+    def due(self, limit: int = 100) -> List[str]:
+        """Token ids to recompute: queued misses first, then the most viewed stale entries."""
+        now = time.monotonic()
+        with self._lock:
+            due = list(self._wanted)[:limit]
+            hot = sorted(self._hits.items(), key=lambda kv: kv[1], reverse=True)
+            for token_id, _ in hot:
+                if len(due) >= limit:
+                    break
+                entry = self._stats.get(token_id, None)
+                if entry is not None and token_id not in self._wanted and now - entry["fetchedAt"] > self.max_age:
+                    due.append(token_id)
+        return due
+
+    def refresh(self, service: DomaOffersService, *, limit: int = 100, batch_size: int = 25) -> int:
+        """
+        Recompute due entries with batched nameStatistics requests.
+
+        Returns:
+        - Number of tokens refreshed.
+        """
+        token_ids = self.due(limit)
+        refreshed = 0
+        for start in range(0, len(token_ids), batch_size):
+            batch = token_ids[start:start + batch_size]
+            try:
+                found = service.get_name_statistics_batch(batch)
+            except Exception as e:
+                print(f"Error refreshing name statistics: {e}")
+                continue
+            for token_id in batch:
+                stats = found.get(token_id)
+                if stats is None:
+                    # Unknown to the subgraph; do not ask again for every view
+                    with self._lock:
+                        self._wanted.pop(token_id, None)
+                    continue
+                self.put(token_id, stats)
+                refreshed += 1
+        with self._lock:
+            # Views since the previous refresh decide which names are hot
+            self._hits.clear()
+        return refreshed
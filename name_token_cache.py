@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import poll_event_models as pem
+from doma_names_service import DomaNamesService
+from lru_cache import LRUCache, MISSING
+from mongo import Mongo
+
+__all__ = ["NameTokenCache", "NAME_TOKEN_EVENT_TYPES"]
+
+
+NAME_TOKEN_EVENT_TYPES = (
+    "NAME_TOKEN_MINTED",
+    "NAME_TOKEN_BURNED",
+    "NAME_TOKENIZED",
+    "NAME_DETOKENIZED",
+)
+
+
+class NameTokenCache:
+    """
+    Resolves domain names to token ids (and back), with their network ids.
+
+    Mappings are persisted in MongoDB (one document per token) with an in-process LRU in front, and kept
+    current from token mint/burn and (de)tokenization poll events. The subgraph is only asked for names
+    that were never seen before, using the slim NameTokens query.
+
+    apply_event(), cached() and cached_name() only touch memory, so they can run on the event loop; the
+    writes events cause are queued for flush(). stored() and flush() block on MongoDB, fetch() on the
+    subgraph, and lookup() on both.
+    """
+
+    def __init__(self, mongo: Mongo, names: Optional[DomaNamesService] = None, *,
+                 collection: str = "name_tokens", maxsize: int = 10000, negative_ttl: float = 600.0):
+        """
+        Parameters:
+        - mongo: Mongo wrapper holding the collection.
+        - names: Names service for the subgraph fallback; None disables it.
+        - collection: Collection name.
+        - maxsize: Maximum number of names (and of token ids) kept in memory.
+        - negative_ttl: Seconds a name or token known to have no mapping is remembered as such.
+        """
+        self.mongo = mongo
+        self.names = names
+        self.collection = collection
+        self.negative_ttl = negative_ttl
+        # name -> (tokenId, networkId) or None for names known to have no token
+        self._by_name = LRUCache(maxsize)
+        # tokenId -> name, or None for burned tokens
+        self._by_token = LRUCache(maxsize)
+        # (op, key, value) Mongo writes queued by apply_event, oldest first
+        self._pending: deque = deque()
+
+    def ensure_indexes(self) -> None:
+        self.mongo.create_index(self.collection, "name")
+
+    def _remember(self, name: str, token_id: str, network_id: Optional[str]) -> None:
+        self._by_name.put(name, (token_id, network_id))
+        self._by_token.put(token_id, name)
+
+    def put(self, name: str, token_id: str, network_id: Optional[str] = None) -> None:
+        """Record (or refresh) a name -> token mapping."""
+        if not name or not token_id:
+            return
+        self._write("put", token_id, (name, network_id))
+        self._remember(name, token_id, network_id)
+
+    def forget_token(self, token_id: str) -> None:
+        """Drop a burned token."""
+        self._drop_token(token_id)
+        self._write("forget_token", token_id)
+
+    def forget_name(self, name: str) -> None:
+        """Drop every mapping of a name; it is then known to have no token."""
+        self._drop_name(name)
+        self._write("forget_name", name)
+
+    def _drop_token(self, token_id: str) -> None:
+        name = self._by_token.get(token_id)
+        # The negative entry keeps stored() from serving the document before its delete is flushed
+        self._by_token.put(token_id, None, ttl=self.negative_ttl)
+        cached = self._by_name.get(name) if isinstance(name, str) else None
+        if isinstance(cached, tuple) and cached[0] == token_id:
+            # The name may still have tokens on other chains; the next lookup finds them
+            self._by_name.pop(name)
+
+    def _drop_name(self, name: str) -> None:
+        cached = self._by_name.get(name)
+        if isinstance(cached, tuple):
+            self._by_token.put(cached[0], None, ttl=self.negative_ttl)
+        self._by_name.put(name, None, ttl=self.negative_ttl)
+
+    def _write(self, op: str, key: str, value: Any = None) -> None:
+        if op == "put":
+            name, network_id = value
+            self.mongo.upsert(self.collection, {"_id": key}, {"$set": {"name": name, "networkId": network_id}})
+        elif op == "forget_token":
+            self.mongo.delete(self.collection, {"_id": key})
+        elif op == "forget_name":
+            self.mongo.delete(self.collection, {"name": key})
+
+    def flush(self) -> int:
+        """
+        Persist the mappings changed by apply_event(). Blocking: call from the Mongo pool.
+
+        Returns:
+        - Number of writes made.
+        """
+        written = 0
+        while self._pending:
+            op, key, value = self._pending.popleft()
+            try:
+                self._write(op, key, value)
+            except Exception:
+                # Keep the write (and the ones after it, in order) for the next flush
+                self._pending.appendleft((op, key, value))
+                raise
+            written += 1
+        return written
+
+    def cached(self, name: str):
+        """(tokenId, networkId) or None from memory, or MISSING when stored() is needed."""
+        return self._by_name.get(name)
+
+    def stored(self, name: str):
+        """
+        (tokenId, networkId) of a name from memory or MongoDB, or MISSING when only the subgraph can tell.
+        Blocking: call from the Mongo pool.
+        """
+        cached = self._by_name.get(name)
+        if cached is not MISSING:
+            return cached
+        for doc in self.mongo.find_many(self.collection, {"name": name}):
+            # Skip tokens burned since, whose delete is not flushed yet
+            if self._by_token.get(doc["_id"]) is None:
+                continue
+            self._remember(name, doc["_id"], doc.get("networkId"))
+            return doc["_id"], doc.get("networkId")
+        return MISSING
+
+    def fetch(self, name: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Ask the subgraph for a name's tokens and remember them; the Mongo writes are queued for flush().
+        Blocking: call from the Doma pool.
+
+        Returns:
+        - (tokenId, networkId) of the first token, or None if the name has no token.
+        """
+        tokens = self.names.get_name_tokens(name) if self.names is not None else []
+        tokens = [t for t in tokens or [] if t.get("tokenId")]
+        if not tokens:
+            self._by_name.put(name, None, ttl=self.negative_ttl)
+            return None
+        for token in reversed(tokens):
+            self._remember(name, token["tokenId"], token.get("networkId"))
+            self._pending.append(("put", token["tokenId"], (name, token.get("networkId"))))
+        return tokens[0]["tokenId"], tokens[0].get("networkId")
+
+    def lookup(self, name: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Get (tokenId, networkId) of a name.
+
+        Reads the LRU, then MongoDB, then (once per unknown name) the subgraph. Blocks on both; async
+        callers should use cached(), stored() and fetch() on the matching pools instead.
+
+        Returns:
+        - (tokenId, networkId) tuple, or None if the name has no token.
+        """
+        found = self.stored(name)
+        if found is MISSING:
+            found = self.fetch(name)
+            self.flush()
+        return found
+
+    def token_id(self, name: str) -> Optional[str]:
+        """Token id of a name, or None if the name has no token."""
+        found = self.lookup(name)
+        return found[0] if found else None
+
+    def network_id(self, name: str) -> Optional[str]:
+        """Network id (CAIP-2) of a name's token, or None if the name has no token."""
+        found = self.lookup(name)
+        return found[1] if found else None
+
+    def cached_name(self, token_id: str) -> Optional[str]:
+        """Name of a token id if it is in memory, without blocking."""
+        name = self._by_token.get(token_id)
+        return None if name is MISSING else name
+
+    def name_for(self, token_id: str) -> Optional[str]:
+        """Name of a token id, from the cache or MongoDB only (never the subgraph)."""
+        name = self._by_token.get(token_id)
+        if name is not MISSING:
+            return name
+        doc = self.mongo.find_one(self.collection, {"_id": token_id})
+        if not doc:
+            return None
+        self._remember(doc["name"], token_id, doc.get("networkId"))
+        return doc["name"]
+
+    def names_for(self, token_ids: Iterable[str]) -> Dict[str, str]:
+        """Names of the token ids that have one, cache first, then one MongoDB query for the rest."""
+        found: Dict[str, str] = {}
+        missing = []
+        for token_id in token_ids:
+            name = self._by_token.get(token_id)
+            if name is MISSING:
+                missing.append(token_id)
+            elif name:
+                found[token_id] = name
+        if missing:
+            for doc in self.mongo.find_many(self.collection, {"_id": {"$in": missing}}):
+                self._remember(doc["name"], doc["_id"], doc.get("networkId"))
+                found[doc["_id"]] = doc["name"]
+        return found
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Update mappings from a stored poll event (see DomaEventFeed); memory only, writes wait for flush()."""
+        data = pem.parse_event_data(event.get("type"), event.get("eventData"))
+        if isinstance(data, pem.NameTokenMintedData):
+            name = data.name or event.get("name")
+            if name and data.tokenId:
+                self._remember(name, data.tokenId, data.networkId)
+                self._pending.append(("put", data.tokenId, (name, data.networkId)))
+        elif isinstance(data, pem.NameTokenBurnedData):
+            self._drop_token(data.tokenId)
+            self._pending.append(("forget_token", data.tokenId, None))
+        elif isinstance(data, pem.NameTokenizedData):
+            # The token id arrives with the mint; just drop a stale "no token" entry
+            if self._by_name.get(data.name) is None:
+                self._by_name.pop(data.name)
+        elif isinstance(data, pem.NameDetokenizedData):
+            self._drop_name(data.name)
+            self._pending.append(("forget_name", data.name, None))
@@ -1,5 +1,15 @@
+from typing import NamedTuple
+
 from telethon import Button
-from datetime import datetime, timedelta
+
+import callback_codec as cc
+
+
+def callback_data(prefix, *fields, delimiter=':'):
+    # Codec tags (bytes) are packed compactly; plain-text prefixes keep the 'prefix:field:...' form
+    if isinstance(prefix, bytes):
+        return cc.encode_callback(prefix, *fields)
+    return str.encode(delimiter.join([prefix, *(str(f) for f in fields)]))
 
 def get_start_user_buttons(msg):
     return [[Button.inline(msg.get('get_recent_listing'),
@@ -34,35 +44,77 @@ def get_language_buttons(msg):
             [Button.inline(f'🇸🇦 {msg.get("arabic")}',
                            b'language:ar')]]
 
+class Keyboards(NamedTuple):
+    """Static keyboards of one language. Rows are tuples, so the shared instances cannot be modified."""
+    start_user: tuple
+    start_admin: tuple
+    language: tuple
+    settings: tuple
+    main_menu: tuple
+
+_keyboards = {}
+# Main menu row by its label, for renderers that only receive the translations of a language
+_main_menu_by_label = {}
+
+def _freeze(rows):
+    return tuple(tuple(row) for row in rows)
+
+def load_keyboards(translations):
+    """Build the static keyboards of every language once; call after msg_loader.load_translations()."""
+    _keyboards.clear()
+    _main_menu_by_label.clear()
+    for lang, msg in translations.items():
+        main_menu = tuple(get_main_menu_button(msg))
+        language = _freeze(get_language_buttons(msg))
+        _keyboards[lang] = Keyboards(start_user=_freeze(get_start_user_buttons(msg)),
+                                     start_admin=_freeze(get_start_admin_buttons(msg)),
+                                     language=language,
+                                     settings=language + (main_menu,),
+                                     main_menu=main_menu)
+        _main_menu_by_label[msg.get('main_menu')] = main_menu
+    return _keyboards
+
+def keyboards(lang):
+    """Shared static keyboards of a language (English when the language is unknown)."""
+    return _keyboards.get(lang) or _keyboards['en']
+
+def _main_menu(msg):
+    return _main_menu_by_label.get(msg.get('main_menu')) or get_main_menu_button(msg)
+
+def inline_domains(builder, names):
+    # Language-neutral so Telegram can share its cached answer between users
+    return [builder.article(name, text=f'`{name}`') for name in names]
+
 def get_remove_subscription_button(msg, domain_name):
-    return [Button.inline(msg.get('remove_subscription'), str.encode(f'remove_sub:{domain_name}'))]
+    return [Button.inline(msg.get('remove_subscription'), callback_data(cc.REMOVE_SUB, domain_name))]
 
 def navigate(msg, current_page=1, total_pages=1, data_prefix=None, delimiter=':',
-             mode='a'):
+             mode='a', data_fields=()):
     current_page = int(current_page)
     total_pages = int(total_pages)
     if data_prefix:
-        data_prefix += delimiter
+        def page_data(page):
+            return callback_data(data_prefix, *data_fields, page, delimiter=delimiter)
         keyboard = []
         if mode == 'a':
             if current_page > 2:
-                keyboard.append(Button.inline(msg.get('first'), str.encode(data_prefix + '1')))
+                keyboard.append(Button.inline(msg.get('first'), page_data(1)))
             if current_page > 1:
-                keyboard.append(Button.inline(msg.get('previous'), str.encode(data_prefix + str(current_page - 1))))
+                keyboard.append(Button.inline(msg.get('previous'), page_data(current_page - 1)))
             if total_pages > 1:
                 keyboard.append(Button.inline(str(current_page) + ' ' + msg.get('from') + ' ' + str(total_pages)))
             if total_pages > current_page:
-                keyboard.append(Button.inline(msg.get('next'), str.encode(data_prefix + str(current_page + 1))))
+                keyboard.append(Button.inline(msg.get('next'), page_data(current_page + 1)))
             if total_pages > current_page + 1:
-                keyboard.append(Button.inline(msg.get('last'), str.encode(data_prefix + str(total_pages))))
+                keyboard.append(Button.inline(msg.get('last'), page_data(total_pages)))
         return keyboard
     else:
         return None
 
 def paginate(msg, current_page=1, total_pages=1, data_prefix=None, delimiter=':',
-             before=None, after=None):
+             before=None, after=None, data_fields=()):
     if data_prefix:
-        paginator = navigate(msg, current_page, total_pages, data_prefix, delimiter)
+        paginator = navigate(msg, current_page, total_pages, data_prefix, delimiter, data_fields=data_fields)
         if before or after:
             paginator = [paginator]
         if before:
@@ -79,7 +131,7 @@ def get_main_menu_button(msg):
 def get_clear_button():
     return Button.clear()
 
-def info_domain(msg, d):
+def info_domain(msg, d, stats=None):
     response_text = f'''{msg.get("domain")}: `{d.get("name")}`
 {msg.get("chain")}: `{d.get("tokens", [{}])[0].get("chain", {}).get("name")}`
 {msg.get("chain")} {msg.get("id")}: `{d.get("tokens", [{}])[0].get("networkId")}`
@@ -87,89 +139,111 @@ def info_domain(msg, d):
 {msg.get("tokenized_at")}: `{d.get("tokenizedAt").replace("T", " ")[:-5]}`
 {msg.get("expires_at")}: `{d.get("expiresAt").replace("T", " ")[:-5]}`
 {msg.get("claimed_by")}: `{d.get("claimedBy")}`'''
+    # Only cached statistics are shown (see NameStatsCache); a card is never delayed for them
+    if stats:
+        highest = stats.get("highestOffer")
+        if highest:
+            currency = highest.get("currency", {})
+            highest_text = f'{format_price(highest.get("price", 0), currency.get("decimals", 0))} {currency.get("symbol", "???")}'
+        else:
+            highest_text = '-'
+        response_text += f'''
+{msg.get("highest_offer")}: `{highest_text}`
+{msg.get("active_offers")}: `{stats.get("activeOffers", 0)}`
+{msg.get("offers_last_3_days")}: `{stats.get("offersLast3Days", 0)}`'''
     explorer_button = Button.url(msg.get('view_on_explorer'),
                                  d.get("tokens", [{}])[0].get('explorerUrl'))
     buy_button = Button.url(msg.get('buy_domain'),
                             f'https://dashboard-testnet.doma.xyz/domain/{d.get("name")}')
     recent_activities_button = Button.inline(msg.get('view_recent_activities'),
-                                             str.encode(f'get_recent_activities:{d.get("name")}'))
+                                             callback_data(cc.RECENT_ACTIVITIES, d.get("name")))
     subscribe_button = Button.inline(msg.get('subscribe'),
-                                     str.encode(f'subscribe:{d.get("name")}'))
+                                     callback_data(cc.SUBSCRIBE, d.get("name")))
     recent_offers_button = Button.inline(msg.get('get_recent_offers'),
-                                     str.encode(f'get_recent_offers:{d.get("name")}'))
-    main_menu_button = get_main_menu_button(msg)[0]
+                                     callback_data(cc.RECENT_OFFERS, d.get("name")))
+    main_menu_button = _main_menu(msg)[0]
     return response_text, [[explorer_button, buy_button],
                            [recent_activities_button, recent_offers_button],
                            [subscribe_button, main_menu_button]]
 
 def list_domains(msg, domain_list, text='', page=1, nav=None,
-               prefix='info_domain', list_prefix='page_domain',
-               delimiter=':'):
+               prefix=cc.INFO_DOMAIN, list_prefix=cc.PAGE_DOMAIN,
+               delimiter=':', total=None):
+    # With 'total', domain_list is already the requested page (see DomaNamesService.get_names_page) and is
+    # shown in the subgraph's order, since sorting one page would not sort the result; a whole list is sorted
     keyboard = []
-    domain_list.sort()
-    if len(domain_list) >= page*10:
+    if total is None:
+        domain_list.sort()
+    if total is not None:
+        for domain in domain_list:
+            keyboard.append([Button.inline(domain, callback_data(prefix, domain, delimiter=delimiter))])
+    elif len(domain_list) >= page*10:
         for domain in domain_list[(page-1)*10:page*10]:
-            keyboard.append([Button.inline(domain, str.encode(prefix + delimiter + domain))])
+            keyboard.append([Button.inline(domain, callback_data(prefix, domain, delimiter=delimiter))])
     elif len(domain_list) >= 10:
         for domain in domain_list[len(domain_list)-10:len(domain_list)]:
-            keyboard.append([Button.inline(domain, str.encode(prefix + delimiter + domain))])
+            keyboard.append([Button.inline(domain, callback_data(prefix, domain, delimiter=delimiter))])
     else:
         for domain in domain_list:
-            keyboard.append([Button.inline(domain, str.encode(prefix + delimiter + domain))])
+            keyboard.append([Button.inline(domain, callback_data(prefix, domain, delimiter=delimiter))])
 
     if not nav:
-        nav = get_main_menu_button(msg)
+        nav = _main_menu(msg)
 
-    page_count = ((len(domain_list) - 1) // 10) + 1
-
-    if text:
-        data_prefix = f'{list_prefix}{delimiter}{text}'
-    else:
-        data_prefix = list_prefix
+    if total is None:
+        total = len(domain_list)
+    page_count = ((total - 1) // 10) + 1
 
     buttons = paginate(msg,
                        current_page=page,
                        total_pages=page_count,
-                       data_prefix=data_prefix,
+                       data_prefix=list_prefix,
+                       data_fields=(text,) if text else (),
                        before=keyboard,
                        after=nav,
                        delimiter=delimiter)
 
-    msg_text = f'{len(domain_list)} {msg.get("list_domains_text")}:'
+    msg_text = f'{total} {msg.get("list_domains_text")}:'
 
     return msg_text, buttons
 
 
 
-def list_listings(msg, dls, text=None, page=1, nav=None,
-               prefix='info_domain', list_prefix='get_recent_listing',
+def format_price(price, decimals):
+    value = int(price) / (10 ** int(decimals))
+    if round(value) > 10 ** 12:
+        return round(value)
+    return round(value, 4)
+
+def list_offers(offers, count):
+    lines = [f'{count} offers so far\n']
+    for i, item in enumerate(offers, start=1):
+        currency = item.get('currency', {})
+        pretty_price = format_price(item.get('price', 0), currency.get('decimals', '0'))
+        lines.append(f'#{i}: {pretty_price} {currency.get("symbol", "???")}')
+    return '\n'.join(lines)
+
+def list_listings(msg, book, text=None, page=1, nav=None,
+               prefix=cc.INFO_DOMAIN, list_prefix='get_recent_listing',
                delimiter=':'):
     keyboard = []
-    listings = dls.get_listings(created_since=(datetime.now() - timedelta(days=7)).isoformat())
-    c = 0
-    for item in listings.get('items', []):
-        c += 1
-        price = int(item.get('price', 0))
+    listings, total, page_count = book.recent(page=page)
+    for item in listings:
         symbol = item.get('currency', {}).get('symbol', '???')
-        decimals = int(item.get('currency', {}).get('decimals', '0'))
+        decimals = item.get('currency', {}).get('decimals', '0')
         name = item.get('name', '???.???')
-        if round(price/(10 ** decimals)) > 10 ** 12:
-            pretty_price = round(price/(10 ** decimals))
-        else:
-            pretty_price = round(price / (10 ** decimals), 4)
+        pretty_price = format_price(item.get('price', 0), decimals)
         keyboard.append([Button.inline(f'{name} ({pretty_price} {symbol})',
-                                          str.encode(prefix + delimiter + str(name)))])
+                                          callback_data(prefix, str(name), delimiter=delimiter))])
 
     if not nav:
-        nav = get_main_menu_button(msg)
-
-    page_count = 1
+        nav = _main_menu(msg)
 
     buttons = paginate(msg,
-                       current_page=page,
+                       current_page=min(page, page_count),
                        total_pages=page_count,
                        data_prefix=list_prefix,
                        before=keyboard,
                        after=nav,
                        delimiter=delimiter)
-    return text, buttons
\ No newline at end of file
+    return text, buttons
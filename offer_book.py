@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import poll_event_models as pem
+from doma_offers_service import DomaOffersService
+from listings_book import DEFAULT_DECIMALS
+
+__all__ = ["OfferBook", "OFFER_EVENT_TYPES"]
+
+
+OFFER_EVENT_TYPES = (
+    "NAME_TOKEN_OFFER_RECEIVED",
+    "NAME_TOKEN_OFFER_CANCELLED",
+    "NAME_TOKEN_PURCHASED",
+)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _currency(item: Dict[str, Any]) -> str:
+    return (item.get("currency") or {}).get("symbol") or "???"
+
+
+class _TokenOffers:
+    """Active offers of a single token, ranked by price within each currency (highest first)."""
+
+    __slots__ = ("offers", "ladders", "next_expiry")
+
+    def __init__(self):
+        self.offers: Dict[str, Dict[str, Any]] = {}
+        # Currency symbol -> [(-price, createdAt, orderId)]; ladders[symbol][0] is the best offer in it.
+        # Prices in different currencies are not comparable without exchange rates, so they are never mixed.
+        self.ladders: Dict[str, List[Tuple[int, str, str]]] = {}
+        # Earliest expiresAt in the book, so reads only scan when something may have expired
+        self.next_expiry: Optional[str] = None
+
+    @staticmethod
+    def _entry(order_id: str, item: Dict[str, Any]) -> Tuple[int, str, str]:
+        # Same currency, same decimals: raw amounts compare exactly
+        return -int(item.get("price", 0) or 0), item.get("createdAt") or "", order_id
+
+    def add(self, order_id: str, item: Dict[str, Any]) -> None:
+        if order_id in self.offers:
+            self.remove(order_id)
+        self.offers[order_id] = item
+        insort(self.ladders.setdefault(_currency(item), []), self._entry(order_id, item))
+        expires_at = item.get("expiresAt")
+        if expires_at and (self.next_expiry is None or expires_at < self.next_expiry):
+            self.next_expiry = expires_at
+
+    def remove(self, order_id: str) -> Optional[Dict[str, Any]]:
+        item = self.offers.pop(order_id, None)
+        if item is not None:
+            currency = _currency(item)
+            ladder = self.ladders.get(currency, [])
+            entry = self._entry(order_id, item)
+            i = bisect_left(ladder, entry)
+            if i < len(ladder) and ladder[i] == entry:
+                del ladder[i]
+            if not ladder:
+                self.ladders.pop(currency, None)
+        return item
+
+    def drop_expired(self, now: str) -> None:
+        if self.next_expiry is None or self.next_expiry >= now:
+            return
+        expired = [k for k, it in self.offers.items() if it.get("expiresAt") and it["expiresAt"] < now]
+        for order_id in expired:
+            self.remove(order_id)
+        self.next_expiry = min((it["expiresAt"] for it in self.offers.values() if it.get("expiresAt")),
+                               default=None)
+
+
+class OfferBook:
+    """
+    In-memory per-token book of active offers, kept current from offer poll events.
+
+    Items have the same shape as PaginatedNameOffersResponse items. Tokens are seeded lazily from the
+    subgraph the first time they are viewed; after that, best offer, active count and depth come from memory.
+    Events of a token arriving while it is being fetched are buffered and replayed over the fetched book.
+    """
+
+    def __init__(self):
+        self._books: Dict[str, _TokenOffers] = {}
+        # token_id -> events received since begin_seed(), replayed by install()
+        self._seeding: Dict[str, List[Dict[str, Any]]] = {}
+        self._token_by_name: Dict[str, str] = {}
+        self._decimals_by_symbol: Dict[str, int] = dict(DEFAULT_DECIMALS)
+
+    def is_seeded(self, token_id: str) -> bool:
+        return token_id in self._books
+
+    def begin_seed(self, token_id: str) -> None:
+        """Start buffering the token's events; call before fetch() and follow with install() or abort_seed()."""
+        self._seeding.setdefault(token_id, [])
+
+    def abort_seed(self, token_id: str) -> None:
+        """Forget the events buffered for a fetch that failed; the token stays unseeded."""
+        self._seeding.pop(token_id, None)
+
+    def token_id_for(self, name: str) -> Optional[str]:
+        """Token id of a name, if the book has seen it."""
+        return self._token_by_name.get(name)
+
+    def add(self, item: Dict[str, Any]) -> None:
+        """Insert or replace an offer item."""
+        token_id = item.get("tokenId")
+        order_id = item.get("externalId") or item.get("id")
+        if not token_id or not order_id:
+            return
+        self._books.setdefault(token_id, _TokenOffers()).add(order_id, item)
+        if item.get("name"):
+            self._token_by_name[item["name"]] = token_id
+        currency = item.get("currency") or {}
+        if currency.get("symbol") and currency.get("decimals") is not None:
+            self._decimals_by_symbol[currency["symbol"]] = int(currency["decimals"])
+
+    def remove(self, token_id: str, order_id: str) -> Optional[Dict[str, Any]]:
+        book = self._books.get(token_id)
+        return book.remove(order_id) if book else None
+
+    @staticmethod
+    def fetch(token_id: str, service: DomaOffersService, *, take: int = 100) -> Tuple[Optional[str], _TokenOffers]:
+        """
+        Load the active offers of a token from the subgraph into a new, private book.
+
+        Blocking and side-effect free, so it can run in a worker pool; pass the result to install() on the
+        thread that owns the OfferBook. Exceptions propagate and nothing is installed.
+        nameStatistics is asked first, so tokens without active offers cost one small request.
+
+        Returns:
+        - (name, book) where name is the token's name if the subgraph knows it.
+        """
+        book = _TokenOffers()
+        stats = service.get_name_statistics(token_id) or {}
+        if not stats.get("activeOffers"):
+            return stats.get("name"), book
+        skip = 0
+        while True:
+            resp = service.get_offers(token_id=token_id, status="ACTIVE", skip=skip, take=take)
+            items = resp.get("items", []) or []
+            for item in items:
+                order_id = item.get("externalId") or item.get("id")
+                if order_id and item.get("tokenId", token_id) == token_id:
+                    book.add(order_id, item)
+            if not resp.get("hasNextPage") or not items:
+                break
+            skip += take
+        return stats.get("name"), book
+
+    def install(self, token_id: str, fetched: Tuple[Optional[str], _TokenOffers]) -> int:
+        """
+        Make a book built by fetch() the token's book, in one assignment, then replay the events buffered
+        since begin_seed() so nothing that happened during the fetch is lost. A book fetched while another
+        install already seeded the token is discarded.
+
+        Returns:
+        - Number of offers in the token's book.
+        """
+        if token_id in self._books and token_id not in self._seeding:
+            return len(self._books[token_id].offers)
+        name, book = fetched
+        for item in book.offers.values():
+            if item.get("name"):
+                self._token_by_name[item["name"]] = token_id
+            currency = item.get("currency") or {}
+            if currency.get("symbol") and currency.get("decimals") is not None:
+                self._decimals_by_symbol[currency["symbol"]] = int(currency["decimals"])
+        if name:
+            self._token_by_name[name] = token_id
+        self._books[token_id] = book
+        for event in self._seeding.pop(token_id, []):
+            self.apply_event(event)
+        return len(book.offers)
+
+    def seed(self, token_id: str, service: DomaOffersService, *, take: int = 100) -> int:
+        """fetch() and install() in one call, for callers that own the book on the current thread."""
+        self.begin_seed(token_id)
+        try:
+            fetched = self.fetch(token_id, service, take=take)
+        except Exception:
+            self.abort_seed(token_id)
+            raise
+        return self.install(token_id, fetched)
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Update the book from a stored poll event (see DomaEventFeed)."""
+        data = pem.parse_event_data(event.get("type"), event.get("eventData"))
+        if data is not None and getattr(data, "tokenId", None) in self._seeding:
+            # The book being fetched may predate this event; install() replays it
+            self._seeding[data.tokenId].append(event)
+            return
+        if isinstance(data, pem.NameTokenOfferReceivedData):
+            # Unseeded tokens are loaded in full on first view; partial books would understate depth
+            if data.tokenId not in self._books:
+                return
+            symbol = data.payment.currencySymbol if data.payment else None
+            self.add({
+                "id": data.orderId,
+                "externalId": data.orderId,
+                "price": data.payment.price if data.payment else "0",
+                "offererAddress": data.buyer,
+                "orderbook": data.orderbook,
+                "currency": {"name": symbol, "symbol": symbol,
+                             "decimals": self._decimals_by_symbol.get(symbol, 18)},
+                "expiresAt": data.expiresAt,
+                "createdAt": data.createdAt,
+                "name": event.get("name"),
+                "tokenId": data.tokenId,
+                "tokenAddress": data.tokenAddress,
+            })
+        elif isinstance(data, (pem.NameTokenOfferCancelledData, pem.NameTokenPurchasedData)):
+            # An accepted offer is filled through a purchase of the same order
+            self.remove(data.tokenId, data.orderId)
+
+    def _live(self, token_id: str) -> Optional[_TokenOffers]:
+        book = self._books.get(token_id)
+        if book is not None:
+            book.drop_expired(_now())
+        return book
+
+    def currencies(self, token_id: str) -> List[str]:
+        """Currencies the token has active offers in, the one with most offers first."""
+        book = self._live(token_id)
+        if not book:
+            return []
+        return sorted(book.ladders, key=lambda symbol: (-len(book.ladders[symbol]), symbol))
+
+    def best(self, token_id: str, currency: str) -> Optional[Dict[str, Any]]:
+        """Highest active offer of a token in a currency (offers in other currencies are not comparable)."""
+        book = self._live(token_id)
+        ladder = book.ladders.get(currency) if book else None
+        if not ladder:
+            return None
+        return book.offers[ladder[0][2]]
+
+    def best_by_currency(self, token_id: str) -> Dict[str, Dict[str, Any]]:
+        """Highest active offer of a token in each currency."""
+        return {symbol: self.best(token_id, symbol) for symbol in self.currencies(token_id)}
+
+    def count(self, token_id: str) -> int:
+        """Number of active offers of a token."""
+        book = self._live(token_id)
+        return len(book.offers) if book else 0
+
+    def depth(self, token_id: str, limit: Optional[int] = None,
+              currency: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Active offers of a token, highest price first within each currency.
+
+        Without a currency, the ladders follow each other in currencies() order.
+        """
+        book = self._live(token_id)
+        if not book:
+            return []
+        symbols = [currency] if currency is not None else self.currencies(token_id)
+        entries = [entry for symbol in symbols for entry in book.ladders.get(symbol, [])]
+        if limit is not None:
+            entries = entries[:limit]
+        return [book.offers[order_id] for _, _, order_id in entries]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+from telethon import events
+
+from executors import BoundedExecutor
+from metrics import MetricsRegistry
+from send_queue import TokenBucket
+
+__all__ = ["RateLimiter", "LoadShedder", "limited", "RATE_LIMITED", "BUSY"]
+
+
+# Reasons passed to the reject callback
+RATE_LIMITED = "rate_limited"
+BUSY = "busy"
+
+
+class RateLimiter:
+    """
+    Per-user token buckets, one per handler class (e.g. 'search', 'ai').
+
+    Each class has its own refill rate and burst; a handler spends 'cost' tokens per request. Costs are
+    fixed per handler and charged before any cache is checked, so a handler that usually starts a new
+    search (a search reply) can weigh more than one that usually turns a cached page, whatever the
+    answer is served from.
+    """
+
+    def __init__(self, limits: Mapping[str, Tuple[float, float]], metrics: Optional[MetricsRegistry] = None):
+        """
+        Parameters:
+        - limits: Class name -> (tokens per second, burst).
+        - metrics: Registry receiving rate_limited_total.
+        """
+        self.limits = dict(limits)
+        self.metrics = metrics or MetricsRegistry()
+        self._buckets: Dict[Tuple[str, Hashable], TokenBucket] = {}
+
+    def _prune(self, now: float) -> None:
+        if len(self._buckets) > 10000:
+            self._buckets = {k: b for k, b in self._buckets.items() if not b.is_full(now)}
+
+    def allow(self, user_id: Hashable, klass: str, cost: float = 1.0) -> bool:
+        """Spend 'cost' tokens of the user's bucket for the class; False (nothing spent) when empty."""
+        rate, burst = self.limits[klass]
+        now = time.monotonic()
+        bucket = self._buckets.get((klass, user_id))
+        if bucket is None:
+            self._prune(now)
+            bucket = self._buckets[(klass, user_id)] = TokenBucket(rate, burst)
+        if bucket.delay(now, cost) > 0:
+            self.metrics.inc("rate_limited_total", handler_class=klass)
+            return False
+        bucket.take(now, cost)
+        return True
+
+
+class LoadShedder:
+    """
+    Decides when a pool is too busy to start new upstream work.
+
+    A pool is overloaded while more than 'max_queued' calls wait for a worker or its moving average
+    run time is above 'max_latency' seconds. Callers then answer from caches or say they are busy.
+    """
+
+    def __init__(self, max_queued: int = 50, max_latency: float = 5.0, metrics: Optional[MetricsRegistry] = None):
+        self.max_queued = max_queued
+        self.max_latency = max_latency
+        self.metrics = metrics or MetricsRegistry()
+
+    def overloaded(self, pool: BoundedExecutor) -> bool:
+        shed = pool.queued > self.max_queued or pool.latency > self.max_latency
+        if shed:
+            self.metrics.inc("load_shed_total", pool=pool.name)
+        return shed
+
+
+def limited(limiter: RateLimiter, klass: str, cost: float = 1.0, *,
+            on_reject: Callable[[Any, str], Awaitable[Any]],
+            shedder: Optional[LoadShedder] = None, pool: Optional[BoundedExecutor] = None):
+    """
+    Decorator for handlers that start expensive work.
+
+    The sender must have 'cost' tokens left in the class, and, when a shedder and pool are given, the
+    pool must not be overloaded. Otherwise on_reject(event, RATE_LIMITED or BUSY) is awaited and the
+    event is not processed further. Handlers that can serve cached results should check the shedder
+    themselves instead of passing it here.
+    """
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        @functools.wraps(fn)
+        async def wrapper(event, *args, **kwargs):
+            if shedder is not None and pool is not None and shedder.overloaded(pool):
+                await on_reject(event, BUSY)
+                raise events.StopPropagation
+            if not limiter.allow(event.sender_id, klass, cost):
+                await on_reject(event, RATE_LIMITED)
+                raise events.StopPropagation
+            return await fn(event, *args, **kwargs)
+        return wrapper
+    return decorator
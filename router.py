@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import callback_codec as cc
+
+__all__ = ["CallbackRouter", "InvalidCallback"]
+
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class InvalidCallback(ValueError):
+    """Callback data matched a route but its arguments could not be parsed."""
+
+
+class _Route:
+    __slots__ = ("handler", "types", "packed")
+
+    def __init__(self, handler: Handler, types: Sequence[Callable[[str], Any]], packed: bool):
+        self.handler = handler
+        self.types = tuple(types)
+        self.packed = packed
+
+
+class CallbackRouter:
+    """
+    Routes callback query data to handlers through a byte-prefix trie.
+
+    Register one Telethon CallbackQuery handler that calls dispatch(); the data is walked once and the
+    handler of the longest matching prefix is called with pre-parsed arguments:
+    - codec tags (callback_codec) get the decoded fields;
+    - plain-text prefixes get the ':'-separated remainder, converted with the registered types.
+    A plain-text prefix only matches whole words ('about' does not match 'about_x').
+    """
+
+    def __init__(self, delimiter: bytes = b":",
+                 on_invalid: Optional[Callable[[Any, Exception], Awaitable[Any]]] = None,
+                 on_unknown: Optional[Callable[[Any], Awaitable[Any]]] = None):
+        """
+        Parameters:
+        - delimiter: Separator between a plain-text prefix and its arguments.
+        - on_invalid: Called with (event, error) when a matched payload cannot be parsed
+          (e.g. callback_codec.CallbackExpired).
+        - on_unknown: Called with the event when no route matches.
+        """
+        self.delimiter = delimiter
+        self.on_invalid = on_invalid
+        self.on_unknown = on_unknown
+        self._root: Dict[Any, Any] = {}
+
+    def add(self, prefix: bytes, handler: Handler, *types: Callable[[str], Any]) -> None:
+        """Register a handler; codec tags (callback_codec) are recognized by their '~' marker."""
+        node = self._root
+        for byte in prefix:
+            node = node.setdefault(byte, {})
+        if None in node:
+            raise ValueError(f"route {prefix!r} is already registered")
+        packed = len(prefix) == cc.TAG_LEN and prefix.startswith(b"~")
+        node[None] = _Route(handler, types, packed)
+
+    def route(self, prefix: bytes, *types: Callable[[str], Any]):
+        """Decorator form of add(); returns the handler unchanged so it can be registered elsewhere too."""
+        def decorator(handler: Handler) -> Handler:
+            self.add(prefix, handler, *types)
+            return handler
+        return decorator
+
+    def match(self, data: bytes) -> Optional[Tuple[_Route, int]]:
+        """Longest registered prefix of data that ends on a word boundary, with its length."""
+        node = self._root
+        best = None
+        for i, byte in enumerate(data):
+            node = node.get(byte)
+            if node is None:
+                break
+            route = node.get(None)
+            if route is not None:
+                end = i + 1
+                if route.packed or end == len(data) or data[end:end + len(self.delimiter)] == self.delimiter:
+                    best = (route, end)
+        return best
+
+    def parse(self, route: _Route, data: bytes, end: int) -> List[Any]:
+        if route.packed:
+            return cc.decode_callback(data)[1]
+        rest = data[end + len(self.delimiter):]
+        if not rest:
+            return []
+        parts = rest.decode("utf-8").split(self.delimiter.decode())
+        if len(parts) > len(route.types):
+            raise InvalidCallback(f"too many arguments in {data!r}")
+        try:
+            return [convert(part) for convert, part in zip(route.types, parts)]
+        except ValueError as e:
+            raise InvalidCallback(str(e)) from e
+
+    def resolve(self, data: bytes) -> Optional[Tuple[Handler, List[Any]]]:
+        """
+        Find the handler and its arguments for callback data.
+
+        Returns:
+        - (handler, args), or None when no route matches.
+
+        Raises:
+        - InvalidCallback, callback_codec.CallbackExpired or ValueError when the arguments cannot be parsed.
+        """
+        found = self.match(data)
+        if found is None:
+            return None
+        route, end = found
+        return route.handler, self.parse(route, data, end)
+
+    async def dispatch(self, event) -> Any:
+        """Route a CallbackQuery event; the handler's own exceptions (e.g. StopPropagation) propagate."""
+        try:
+            resolved = self.resolve(event.data)
+        except (ValueError, KeyError) as e:
+            if self.on_invalid is not None:
+                return await self.on_invalid(event, e)
+            raise
+        if resolved is None:
+            if self.on_unknown is not None:
+                return await self.on_unknown(event)
+            return None
+        handler, args = resolved
+        return await handler(event, *args)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from telethon.errors import FloodWaitError
+
+from metrics import MetricsRegistry
+
+__all__ = ["SendQueue", "TokenBucket", "INTERACTIVE", "NOTIFICATION"]
+
+
+# Lower values are sent first
+INTERACTIVE = 0
+NOTIFICATION = 10
+
+
+class TokenBucket:
+    """Allows 'rate' operations per second on average, with bursts of up to 'burst'."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        # 'now' may have been read just before the bucket was created
+        if now <= self.updated:
+            return
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: Optional[float] = None, cost: float = 1.0) -> float:
+        """Seconds until 'cost' tokens are available (0 when they are available now)."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+    def take(self, now: Optional[float] = None, cost: float = 1.0) -> None:
+        self._refill(time.monotonic() if now is None else now)
+        self.tokens -= cost
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class _Item:
+    __slots__ = ("chat_id", "send", "priority", "future", "enqueued", "retries")
+
+    def __init__(self, chat_id, send, priority, future):
+        self.chat_id = chat_id
+        self.send = send
+        self.priority = priority
+        self.future = future
+        self.enqueued = time.monotonic()
+        self.retries = 0
+
+
+class SendQueue:
+    """
+    Single outbound path for Telegram messages, paced globally and per chat.
+
+    Every send is a zero-argument callable returning a coroutine (e.g. a bound event.respond), so replies,
+    conversation messages and notifications share the same limits. Interactive replies are sent before
+    notifications. Each send runs as its own task once its buckets allow it, up to max_in_flight at a
+    time, so a slow chat does not hold back the others; sends to one chat still go out one after another,
+    in order. A FloodWaitError only holds back the chat it was raised for; the item is retried after the
+    requested wait while other chats keep being served.
+
+    The limits apply to one process: processes sending with the same bot token must split the budget.
+    """
+
+    def __init__(self, *, global_rate: float = 25.0, chat_rate: float = 1.0, chat_burst: float = 3.0,
+                 max_retries: int = 3, max_in_flight: int = 8, metrics: Optional[MetricsRegistry] = None):
+        """
+        Parameters:
+        - global_rate: Messages per second across all chats.
+        - chat_rate: Messages per second within one chat, on average.
+        - chat_burst: Messages a chat may receive back to back before chat_rate applies.
+        - max_retries: FloodWait retries per message before it fails.
+        - max_in_flight: Sends awaiting Telegram at the same time, across all chats.
+        - metrics: Registry receiving send_queue_* metrics.
+        """
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_in_flight = max(1, max_in_flight)
+        self.metrics = metrics or MetricsRegistry()
+        self._global = TokenBucket(global_rate, burst=global_rate)
+        self._chats: Dict[Hashable, TokenBucket] = {}
+        self._blocked_until: Dict[Hashable, float] = {}
+        self._ready: List[Tuple[int, int, _Item]] = []
+        self._delayed: List[Tuple[float, int, _Item]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        # chat_id -> the send task running for it
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._ready) + len(self._delayed)
+
+    def _event(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def _report(self) -> None:
+        self.metrics.set_gauge("send_queue_ready", len(self._ready))
+        self.metrics.set_gauge("send_queue_delayed", len(self._delayed))
+        self.metrics.set_gauge("send_queue_in_flight", len(self._in_flight))
+
+    def submit(self, chat_id: Hashable, send: Callable[[], Awaitable[Any]],
+               priority: int = INTERACTIVE) -> asyncio.Future:
+        """Queue a send and return a future resolving to its result (the sent message)."""
+        future = asyncio.get_running_loop().create_future()
+        item = _Item(chat_id, send, priority, future)
+        heapq.heappush(self._ready, (priority, next(self._seq), item))
+        self._report()
+        self._event().set()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._run())
+        return future
+
+    async def call(self, chat_id: Hashable, send: Callable[[], Awaitable[Any]], priority: int = INTERACTIVE) -> Any:
+        """Queue a send and wait until it was delivered (exceptions other than FloodWait propagate)."""
+        return await self.submit(chat_id, send, priority)
+
+    def notify(self, client, chat_id: Hashable, *args, **kwargs) -> asyncio.Future:
+        """Queue a low-priority client.send_message; failures are logged instead of raised."""
+        future = self.submit(chat_id, functools.partial(client.send_message, chat_id, *args, **kwargs),
+                             NOTIFICATION)
+        future.add_done_callback(functools.partial(self._log_failure, chat_id))
+        return future
+
+    @staticmethod
+    def _log_failure(chat_id, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error sending message to {chat_id}: {future.exception()}")
+
+    def _chat_delay(self, chat_id: Hashable, now: float) -> float:
+        blocked = self._blocked_until.get(chat_id, 0.0) - now
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return max(blocked, bucket.delay(now))
+
+    def _prune(self, now: float) -> None:
+        if len(self._chats) > 4096:
+            self._chats = {c: b for c, b in self._chats.items() if not b.is_full(now)}
+            self._blocked_until = {c: t for c, t in self._blocked_until.items() if t > now}
+
+    def _next(self, now: float) -> Tuple[Optional[_Item], float]:
+        """
+        Pop the best item that may be sent now, deferring items whose chat is not ready.
+
+        Items of a chat with a send in flight stay queued; the worker is woken when that send ends.
+        """
+        while self._delayed and self._delayed[0][0] <= now:
+            _, seq, item = heapq.heappop(self._delayed)
+            heapq.heappush(self._ready, (item.priority, seq, item))
+        busy = []
+        found = None
+        while self._ready:
+            entry = heapq.heappop(self._ready)
+            item = entry[2]
+            if item.chat_id in self._in_flight:
+                busy.append(entry)
+                continue
+            wait = self._chat_delay(item.chat_id, now)
+            if wait <= 0:
+                found = item
+                break
+            heapq.heappush(self._delayed, (now + wait, entry[1], item))
+        for entry in busy:
+            heapq.heappush(self._ready, entry)
+        if found is not None:
+            return found, 0.0
+        idle = self._delayed[0][0] - now if self._delayed else None
+        return None, idle
+
+    async def _wait(self, wakeup: asyncio.Event, timeout: Optional[float]) -> None:
+        wakeup.clear()
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        wakeup = self._event()
+        # Sends in flight may still be put back by a FloodWait, so the worker outlives them
+        while self._ready or self._delayed or self._in_flight:
+            if len(self._in_flight) >= self.max_in_flight:
+                await self._wait(wakeup, None)
+                continue
+            now = time.monotonic()
+            item, idle = self._next(now)
+            self._report()
+            if item is None:
+                await self._wait(wakeup, idle)
+                continue
+            global_wait = self._global.delay(now)
+            if global_wait > 0:
+                # The item is held, so no other send can take its turn
+                await asyncio.sleep(global_wait)
+            if item.future.cancelled():
+                continue
+            self._global.take()
+            self._chats[item.chat_id].take()
+            task = asyncio.ensure_future(self._send(item))
+            self._in_flight[item.chat_id] = task
+            task.add_done_callback(functools.partial(self._sent, item.chat_id))
+            self._prune(time.monotonic())
+        self._report()
+
+    def _sent(self, chat_id: Hashable, task: asyncio.Task) -> None:
+        self._in_flight.pop(chat_id, None)
+        self._event().set()
+
+    async def _send(self, item: _Item) -> None:
+        try:
+            result = await item.send()
+        except FloodWaitError as e:
+            item.retries += 1
+            self.metrics.inc("send_queue_flood_waits_total")
+            if item.retries > self.max_retries:
+                if not item.future.done():
+                    item.future.set_exception(e)
+                return
+            until = time.monotonic() + e.seconds
+            self._blocked_until[item.chat_id] = until
+            heapq.heappush(self._delayed, (until, next(self._seq), item))
+            return
+        except Exception as e:
+            self.metrics.inc("send_queue_errors_total", error=type(e).__name__)
+            if not item.future.done():
+                item.future.set_exception(e)
+            return
+        label = "interactive" if item.priority <= INTERACTIVE else "notification"
+        self.metrics.inc("send_queue_sent_total", priority=label)
+        self.metrics.observe("send_queue_wait_seconds", time.monotonic() - item.enqueued, priority=label)
+        if not item.future.done():
+            item.future.set_result(result)
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Wait until everything queued so far was sent and answered (or the timeout passed)."""
+        if self._worker is not None and not self._worker.done():
+            await asyncio.wait([self._worker], timeout=timeout)
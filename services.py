@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from functools import cached_property
+
+from caller_graphql import DomaGraphQLClient
+from command_tracker import CommandTracker, COMMAND_EVENT_TYPES
+from conversation_state import ConversationStore
+from doma_listings_service import DomaListingsService
+from doma_name_activities_service import DomaNameActivitiesService
+from doma_names_service import DomaNamesService
+from doma_offers_service import DomaOffersService
+from doma_token_activities_service import DomaTokenActivitiesService, TOKEN_ACTIVITY_EVENT_TYPES
+from doma_tokens_service import DomaTokensService
+from event_feed import DomaEventFeed
+from executors import BoundedExecutor
+from inflight import InflightRegistry
+from inline_search import InlineSearch
+from listings_book import ListingsBook, LISTING_EVENT_TYPES
+from lru_cache import LRUCache
+from message_editor import MessageEditor
+from metrics import MetricsRegistry
+from mongo import Mongo
+from name_stats_cache import NameStatsCache, NAME_STATS_EVENT_TYPES
+from name_token_cache import NameTokenCache, NAME_TOKEN_EVENT_TYPES
+from offer_book import OfferBook, OFFER_EVENT_TYPES
+from rate_limit import LoadShedder, RateLimiter
+from send_queue import SendQueue
+from tg_users_service import TelegramUserManager
+
+__all__ = ["ServiceContainer"]
+
+
+class ServiceContainer:
+    """
+    Owns the long-lived clients, caches and services shared by every handler.
+
+    Create one per process at startup. Each member is built on first use and the same instance is
+    handed out afterwards, so connection handles and caches are shared instead of rebuilt per request.
+    Optional settings are read from the config module with defaults, so older config files keep working.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    def _setting(self, name, default):
+        return getattr(self.config, name, default)
+
+    # ---------- Connections ----------
+
+    @cached_property
+    def db(self) -> Mongo:
+        return Mongo(self.config.db_host, self.config.db_port, self.config.db_name)
+
+    @cached_property
+    def doma(self) -> DomaGraphQLClient:
+        return DomaGraphQLClient(api_key=self.config.doma_api_key)
+
+    @cached_property
+    def ai(self):
+        # Imported here so processes that never consult the AI do not load its SDK
+        from gemini_client import GeminiClient
+        return GeminiClient(self.config.gemini_api_key, self.config.ai_model)
+
+    # ---------- Executors ----------
+
+    @cached_property
+    def metrics(self) -> MetricsRegistry:
+        return MetricsRegistry()
+
+    def _executor(self, name, workers):
+        return BoundedExecutor(name, self._setting(f'{name}_workers', workers),
+                               max_queue=self._setting('executor_max_queue', 100), metrics=self.metrics)
+
+    @cached_property
+    def mongo_executor(self) -> BoundedExecutor:
+        return self._executor('mongo', 8)
+
+    @cached_property
+    def doma_executor(self) -> BoundedExecutor:
+        return self._executor('doma', 8)
+
+    @cached_property
+    def ai_executor(self) -> BoundedExecutor:
+        return self._executor('ai', 2)
+
+    async def run_mongo(self, fn, *args, **kwargs):
+        """Run a blocking MongoDB call on the Mongo pool."""
+        return await self.mongo_executor.run(fn, *args, **kwargs)
+
+    async def run_doma(self, fn, *args, **kwargs):
+        """Run a blocking Doma API call (GraphQL/REST, possibly with Mongo reads) on the Doma pool."""
+        return await self.doma_executor.run(fn, *args, **kwargs)
+
+    async def run_ai(self, fn, *args, **kwargs):
+        """Run a blocking AI model call on the AI pool."""
+        return await self.ai_executor.run(fn, *args, **kwargs)
+
+    @cached_property
+    def sender(self) -> SendQueue:
+        # bg_poll.py sends with the same bot token from its own queue (bg_send_rate_per_second)
+        return SendQueue(global_rate=self._setting('send_rate_per_second', 20),
+                         chat_rate=self._setting('send_chat_rate_per_second', 1),
+                         chat_burst=self._setting('send_chat_burst', 3),
+                         max_in_flight=self._setting('send_max_in_flight', 8),
+                         metrics=self.metrics)
+
+    @cached_property
+    def editor(self) -> MessageEditor:
+        return MessageEditor(self.sender, cache=LRUCache(maxsize=self._setting('edit_digest_cache_size', 10000)),
+                             metrics=self.metrics)
+
+    @cached_property
+    def limiter(self) -> RateLimiter:
+        return RateLimiter({
+            'search': (self._setting('search_rate_per_second', 0.5), self._setting('search_burst', 10)),
+            'ai': (self._setting('ai_rate_per_second', 0.02), self._setting('ai_burst', 3)),
+        }, metrics=self.metrics)
+
+    @cached_property
+    def shedder(self) -> LoadShedder:
+        return LoadShedder(max_queued=self._setting('shed_max_queued', 50),
+                           max_latency=self._setting('shed_max_latency_seconds', 5.0),
+                           metrics=self.metrics)
+
+    @cached_property
+    def taps(self) -> InflightRegistry:
+        return InflightRegistry(debounce=self._setting('tap_debounce_seconds', 1.0))
+
+    # ---------- Caches ----------
+
+    @cached_property
+    def name_cache(self) -> LRUCache:
+        return LRUCache(maxsize=self._setting('name_cache_size', 5000),
+                        ttl=self._setting('name_cache_ttl_seconds', 60))
+
+    @cached_property
+    def user_cache(self) -> LRUCache:
+        return LRUCache(maxsize=self._setting('user_cache_size', 10000),
+                        ttl=self._setting('user_cache_ttl_seconds', 300))
+
+    # ---------- Services ----------
+
+    @cached_property
+    def users(self) -> TelegramUserManager:
+        return TelegramUserManager(self.db, 'telegram_users', cache=self.user_cache)
+
+    @cached_property
+    def conversations(self) -> ConversationStore:
+        return ConversationStore(self.db, 'conversation_state',
+                                 cache=LRUCache(maxsize=self._setting('conversation_cache_size', 10000)),
+                                 ttl=self._setting('conversation_ttl_seconds', 2400))
+
+    @cached_property
+    def names(self) -> DomaNamesService:
+        return DomaNamesService(self.doma, cache=self.name_cache)
+
+    @cached_property
+    def offers(self) -> DomaOffersService:
+        return DomaOffersService(self.doma)
+
+    @cached_property
+    def listings(self) -> DomaListingsService:
+        return DomaListingsService(self.doma)
+
+    @cached_property
+    def tokens(self) -> DomaTokensService:
+        return DomaTokensService(self.doma)
+
+    @cached_property
+    def token_activities(self) -> DomaTokenActivitiesService:
+        service = DomaTokenActivitiesService(self.doma, mongo=self.db)
+        self.feed.subscribe(TOKEN_ACTIVITY_EVENT_TYPES, service.apply_event)
+        return service
+
+    @cached_property
+    def name_activities(self) -> DomaNameActivitiesService:
+        return DomaNameActivitiesService(self.doma, mongo=self.db)
+
+    # ---------- Event-fed state ----------
+
+    @cached_property
+    def feed(self) -> DomaEventFeed:
+        return DomaEventFeed(self.db, 'doma_events')
+
+    @cached_property
+    def token_cache(self) -> NameTokenCache:
+        cache = NameTokenCache(self.db, self.names)
+        self.feed.subscribe(NAME_TOKEN_EVENT_TYPES, cache.apply_event)
+        return cache
+
+    @cached_property
+    def listings_book(self) -> ListingsBook:
+        book = ListingsBook(name_resolver=self.token_cache.cached_name)
+        self.feed.subscribe(LISTING_EVENT_TYPES, book.apply_event)
+        return book
+
+    @cached_property
+    def offer_book(self) -> OfferBook:
+        book = OfferBook()
+        self.feed.subscribe(OFFER_EVENT_TYPES, book.apply_event)
+        return book
+
+    @cached_property
+    def name_stats(self) -> NameStatsCache:
+        cache = NameStatsCache(max_age=self._setting('name_stats_max_age_seconds', 300))
+        self.feed.subscribe(NAME_STATS_EVENT_TYPES, cache.apply_event)
+        return cache
+
+    @cached_property
+    def commands(self) -> CommandTracker:
+        tracker = CommandTracker(self.doma, fallback_after=self._setting('command_fallback_seconds', 30),
+                                 executor=self.doma_executor)
+        self.feed.subscribe(COMMAND_EVENT_TYPES, tracker.apply_event)
+        return tracker
+
+    @cached_property
+    def inline_search(self) -> InlineSearch:
+        return InlineSearch(self.names, page_size=self._setting('inline_page_size', 20),
+                            cache=LRUCache(maxsize=self._setting('inline_cache_size', 2000),
+                                           ttl=self._setting('inline_cache_ttl_seconds', 60)))
+
+    def warm_up(self, profile=None) -> None:
+        """
+        Open connections and fill caches before the first update is handled.
+
+        Each step is best effort: a failure is logged and startup continues with a cold member.
+
+        Parameters:
+        - profile: Optional startup.StartupProfile; each step is recorded as a 'warm_*' phase.
+        """
+        def step(name, fn):
+            try:
+                fn()
+            except Exception as e:
+                print(f"Warm-up step '{name}' failed: {e}")
+            if profile is not None:
+                profile.mark(f'warm_{name}')
+
+        step('mongo', self.db.ping)
+        step('conversations', self.conversations.ensure_indexes)
+        step('name_tokens', self.token_cache.ensure_indexes)
+        step('executors', lambda: [pool.prestart() for pool in (self.mongo_executor, self.doma_executor)])
+
+    def hot_names(self):
+        """Names of the newest listings, which users open first; read the book on the loop."""
+        items, _, _ = self.listings_book.recent(page_size=self._setting('warm_names', 50))
+        return [item['name'] for item in items if item.get('name')]
+
+    def close(self) -> None:
+        """Close connections and executors that were opened."""
+        for name in ('mongo_executor', 'doma_executor', 'ai_executor'):
+            if name in self.__dict__:
+                self.__dict__[name].shutdown()
+        if 'db' in self.__dict__:
+            self.db.close()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import time
+from typing import List, Optional, Tuple
+
+from metrics import MetricsRegistry
+
+__all__ = ["StartupProfile"]
+
+
+class StartupProfile:
+    """
+    Records how long each startup phase took.
+
+    Call mark(name) at the end of each phase; the phase lasts from the previous mark (or 'started').
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        """
+        Parameters:
+        - started: time.perf_counter() value taken when the process started (defaults to now).
+        """
+        self.started = time.perf_counter() if started is None else started
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, name: str) -> float:
+        """End a phase and return its duration in seconds."""
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self.phases.append((name, elapsed))
+        return elapsed
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def publish(self, metrics: MetricsRegistry) -> None:
+        """Expose the phases as startup_phase_seconds{phase=...} gauges."""
+        for name, elapsed in self.phases:
+            metrics.set_gauge("startup_phase_seconds", round(elapsed, 6), phase=name)
+        metrics.set_gauge("startup_seconds", round(self.total, 6))
+
+    def report(self) -> str:
+        width = max((len(name) for name, _ in self.phases), default=5)
+        lines = [f"{name:<{width}}  {elapsed * 1000:9.1f} ms" for name, elapsed in self.phases]
+        lines.append(f"{'total':<{width}}  {self.total * 1000:9.1f} ms")
+        return "\n".join(lines)
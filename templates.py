@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import string
+from typing import Dict, Iterable, Mapping, Optional, Sequence
+
+__all__ = [
+    "Template",
+    "TEMPLATES",
+    "compile_template",
+    "load_templates",
+    "render",
+    "render_rows",
+]
+
+
+# Handler texts. '{msgid}' is replaced by the catalog text when the template is compiled;
+# '{0}', '{1}', ... are positional slots filled at render time.
+TEMPLATES: Dict[str, str] = {
+    "button_expired": "{button_expired}",
+    "busy": "{busy}",
+    "rate_limited": "{rate_limited}",
+    "main_menu": "{main_menu_1}! {main_menu_2}?",
+    "about": "{about_1}\n\n{about_2}",
+    "choose_language": "{change_language_1}:",
+    "language_changed": "{change_language_2}.",
+    "manage_subscription": "{manage_subscription_1}. {manage_subscription_2}.",
+    "no_subscription": "{manage_subscription_x1}. {manage_subscription_x2}.",
+    "info_subscription": "{info_subscription_1} `{0}`. {info_subscription_2}?",
+    "subscription_removed": "{remove_subscription_1}.",
+    "subscription_not_found": "{remove_subscription_2}.",
+    "sub_added": "{sub_added}.",
+    "sub_already_existed": "{sub_already_existed}!",
+    "ai_consult": "{ai_consult_1}. {ai_consult_2}:\n`{ai_consult_3}`",
+    "ai_searching": "{ai_is_searching_1}... {ai_is_searching_2}.",
+    "ai_searching_progress": "{ai_is_searching_1}... {ai_is_searching_2}. ({0}/{1})",
+    "enter_filter": "{enter_a_filter_string_1}. {enter_a_filter_string_2}.",
+    "enter_caip10": "{enter_a_caip10_address_1}. {enter_a_caip10_address_2}.",
+    "searching": "{searching} `{0}`...",
+    "last_week_domains": "{last_week_domains}:\n\n",
+    "recent_activities": "{recent_activities}:\n\n",
+    "activity": "{event}: `{0}`\n{status}: `{1}`\n{tx_hash}: `{2}`\n{event_time}: `{3}`\n\n",
+    "command_usage": "{command_usage}: `/command <correlationId>`",
+    "command_waiting": "{command_waiting} `{0}`...",
+    "command_status": "{command}: `{0}`\n{status}: `{1}`\n{failure_reason}: `{2}`",
+}
+
+_formatter = string.Formatter()
+
+
+class Template:
+    """
+    A message compiled for one language: the static text is joined once and only the positional
+    slots are filled per render (a single str.format call).
+    """
+
+    __slots__ = ("name", "slots", "_format")
+
+    def __init__(self, name: str, format_string: str, slots: int):
+        self.name = name
+        self.slots = slots
+        self._format = format_string
+
+    def render(self, *values) -> str:
+        if len(values) != self.slots:
+            raise TypeError(f"template '{self.name}' takes {self.slots} values, got {len(values)}")
+        return self._format.format(*values)
+
+    def render_rows(self, rows: Iterable[Sequence]) -> str:
+        """Render one block per row and join them (instead of growing a string with +=)."""
+        fmt = self._format.format
+        return "".join([fmt(*row) for row in rows])
+
+    def __repr__(self) -> str:
+        return f"Template({self.name!r}, {self._format!r})"
+
+
+def compile_template(name: str, spec: str, catalog: Mapping[str, str],
+                     fallback: Optional[Mapping[str, str]] = None) -> Template:
+    """
+    Compile a template spec against a translation catalog.
+
+    Parameters:
+    - name: Template name (used in error messages).
+    - spec: Text with '{msgid}' references and '{0}'-style positional slots.
+    - catalog: msgid -> msgstr of the target language.
+    - fallback: Catalog used for msgids missing from 'catalog' (usually English).
+
+    Returns:
+    - The compiled Template.
+    """
+    parts = []
+    slots = set()
+    for literal, field, format_spec, conversion in _formatter.parse(spec):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field.isdigit():
+            slots.add(int(field))
+            parts.append("{" + field + (f"!{conversion}" if conversion else "")
+                         + (f":{format_spec}" if format_spec else "") + "}")
+            continue
+        text = catalog.get(field)
+        if text is None and fallback is not None:
+            text = fallback.get(field)
+        if text is None:
+            text = field
+        parts.append(text.replace("{", "{{").replace("}", "}}"))
+    if slots and slots != set(range(len(slots))):
+        raise ValueError(f"template '{name}' must number its slots from 0 without gaps")
+    return Template(name, "".join(parts), len(slots))
+
+
+_templates: Dict[str, Dict[str, Template]] = {}
+
+
+def load_templates(translations: Mapping[str, Mapping[str, str]],
+                   specs: Mapping[str, str] = TEMPLATES) -> None:
+    """Compile every template for every language once; call after msg_loader.load_translations()."""
+    fallback = translations.get("en")
+    _templates.clear()
+    for lang, catalog in translations.items():
+        _templates[lang] = {name: compile_template(name, spec, catalog, fallback) for name, spec in specs.items()}
+
+
+def _template(lang: str, name: str) -> Template:
+    templates = _templates.get(lang) or _templates["en"]
+    return templates[name]
+
+
+def render(lang: str, name: str, *values) -> str:
+    """Render a compiled template (English when the language is unknown)."""
+    return _template(lang, name).render(*values)
+
+
+def render_rows(lang: str, name: str, rows: Iterable[Sequence]) -> str:
+    """Render a compiled template once per row and join the results."""
+    return _template(lang, name).render_rows(rows)
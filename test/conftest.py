@@ -0,0 +1,136 @@
+import pytest
+
+
+class FakeCursor(list):
+    def to_list(self):
+        return list(self)
+
+
+_MISSING = object()
+
+
+def _field(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return _MISSING
+        doc = doc[part]
+    return doc
+
+
+def _matches_condition(value, cond):
+    if not isinstance(cond, dict):
+        # As in MongoDB, null also matches a missing field
+        return (None if value is _MISSING else value) == cond
+    for op, arg in cond.items():
+        if op == "$exists":
+            ok = (value is not _MISSING) == bool(arg)
+        elif op == "$in":
+            ok = value in arg
+        elif op == "$ne":
+            ok = value != arg
+        elif value is _MISSING or value is None:
+            ok = False
+        elif op == "$lt":
+            ok = value < arg
+        elif op == "$lte":
+            ok = value <= arg
+        elif op == "$gt":
+            ok = value > arg
+        elif op == "$gte":
+            ok = value >= arg
+        else:
+            raise NotImplementedError(op)
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc, query):
+    """True if the document matches a MongoDB query (equality, dotted fields, $or and comparisons)."""
+    for field, cond in (query or {}).items():
+        if field == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        else:
+            if not _matches_condition(_field(doc, field), cond):
+                return False
+    return True
+
+
+class FakeMongo:
+    """In-memory stand-in for mongo.Mongo: documents per collection, kept in insertion order."""
+
+    def __init__(self):
+        self.collections = {}
+        self.indexes = []
+        self.reads = 0
+        self.deletes = 0
+
+    def docs(self, collection):
+        """The stored documents of a collection (the live list)."""
+        return self.collections.setdefault(collection, [])
+
+    def by_id(self, collection, key="_id"):
+        """The stored documents of a collection keyed by 'key', without counting a read."""
+        return {doc[key]: doc for doc in self.docs(collection)}
+
+    def create_index(self, collection, keys, **kwargs):
+        self.indexes.append((collection, keys, kwargs))
+
+    def insert(self, collection, data):
+        self.docs(collection).extend(dict(d) for d in (data if isinstance(data, list) else [data]))
+
+    def find_one(self, collection, query=None):
+        self.reads += 1
+        for doc in self.docs(collection):
+            if matches(doc, query):
+                return dict(doc)
+        return None
+
+    def find_many(self, collection, query=None, sort_by="_id", sort_order="asc", limit=0):
+        self.reads += 1
+        rows = [dict(d) for d in self.docs(collection) if matches(d, query)]
+        keys = sort_by if isinstance(sort_by, list) else [(sort_by, -1 if sort_order == "desc" else 1)]
+        for field, direction in reversed(keys):
+            present = [d for d in rows if _field(d, field) is not _MISSING]
+            absent = [d for d in rows if _field(d, field) is _MISSING]
+            present.sort(key=lambda d: _field(d, field), reverse=direction < 0)
+            rows = absent + present if direction > 0 else present + absent
+        return FakeCursor(rows[:limit] if limit else rows)
+
+    def count(self, collection, query=None):
+        return sum(1 for d in self.docs(collection) if matches(d, query))
+
+    @staticmethod
+    def _apply(doc, update):
+        doc.update(update.get("$set", {}))
+        for field, value in update.get("$addToSet", {}).items():
+            if value not in doc.setdefault(field, []):
+                doc[field].append(value)
+        for field, value in update.get("$pull", {}).items():
+            doc[field] = [v for v in doc.get(field, []) if v != value]
+
+    def update(self, collection, query, update):
+        for doc in self.docs(collection):
+            if matches(doc, query):
+                self._apply(doc, update)
+
+    def upsert(self, collection, query, update):
+        for doc in self.docs(collection):
+            if matches(doc, query):
+                self._apply(doc, update)
+                return
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        doc.update(update.get("$setOnInsert", {}))
+        self._apply(doc, update)
+        self.docs(collection).append(doc)
+
+    def delete(self, collection, query):
+        self.deletes += 1
+        self.collections[collection] = [d for d in self.docs(collection) if not matches(d, query)]
+
+
+@pytest.fixture
+def mongo():
+    """An empty FakeMongo."""
+    return FakeMongo()
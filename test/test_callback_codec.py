@@ -0,0 +1,35 @@
+import pytest
+
+import callback_codec as cc
+from callback_codec import CallbackCodec, CallbackExpired
+from lru_cache import LRUCache
+
+
+def test_short_payloads_are_encoded_directly():
+    codec = CallbackCodec()
+    address = "eip155:97476:0x" + "ab" * 20
+    data = codec.encode(cc.PAGE_OWNER, address, 300)
+    assert len(data) <= cc.MAX_CALLBACK_BYTES
+    assert len(codec.cache) == 0
+    assert codec.decode(data) == (cc.PAGE_OWNER, [address, 300])
+    # A fresh process decodes direct payloads too
+    assert CallbackCodec().decode(data)[1] == [address, 300]
+
+
+def test_long_text_is_hashed_and_expires_with_the_cache():
+    codec = CallbackCodec(cache=LRUCache(maxsize=1))
+    long_filter = "very-long-search-filter-" * 4
+    data = codec.encode(cc.PAGE_DOMAIN, long_filter, 2)
+    assert len(data) <= cc.MAX_CALLBACK_BYTES
+    assert codec.decode(data) == (cc.PAGE_DOMAIN, [long_filter, 2])
+
+    codec.encode(cc.INFO_DOMAIN, "x" * 80)  # evicts the first hashed value
+    with pytest.raises(CallbackExpired):
+        codec.decode(data)
+
+
+def test_plain_text_prefixes_keep_their_format():
+    import nav
+
+    assert nav.callback_data("manage_subscription", 3) == b"manage_subscription:3"
+    assert nav.callback_data(cc.INFO_SUB, "a.com").startswith(cc.INFO_SUB)
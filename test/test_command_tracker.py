@@ -0,0 +1,69 @@
+import asyncio
+
+from command_tracker import CommandTracker
+from executors import BoundedExecutor
+
+
+def command_event(event_type, relay_id, raw_error=None):
+    failure = None
+    if raw_error:
+        failure = {"chainId": "eip155:1", "address": None, "methodName": None, "methodArgs": None,
+                   "error": None, "rawError": raw_error}
+    return {"type": event_type, "relayId": relay_id, "createdAt": "2025-01-01T00:00:00.000Z",
+            "eventData": {"type": event_type, "relayId": relay_id, "failureData": failure,
+                          "transactions": [{"type": "t", "status": "s", "chainId": "eip155:1", "hash": "0xabc"}]}}
+
+
+class FakeClient:
+    def __init__(self, status):
+        self.status = status
+        self.calls = []
+
+    def query_command(self, correlation_id):
+        self.calls.append(correlation_id)
+        return {"status": self.status, "type": "CLAIM", "failureReason": None, "updatedAt": None}
+
+
+def test_wait_resolves_from_events_without_querying():
+    client = FakeClient("PENDING")
+    tracker = CommandTracker(client, fallback_after=5)
+
+    async def scenario():
+        waiter = asyncio.ensure_future(tracker.wait("c1", timeout=2))
+        await asyncio.sleep(0)
+        tracker.apply_event(command_event("COMMAND_CREATED", "c1"))
+        assert not waiter.done()
+        tracker.apply_event(command_event("COMMAND_FAILED", "c1", raw_error="reverted"))
+        return await waiter
+
+    state = asyncio.run(scenario())
+    assert state["status"] == "FAILED"
+    assert state["failureReason"] == "reverted"
+    assert state["transactions"] == ["0xabc"]
+    assert client.calls == []
+    # Already terminal: returns immediately
+    assert asyncio.run(tracker.wait("c1", timeout=0.01))["status"] == "FAILED"
+
+
+def test_wait_falls_back_to_query_and_times_out():
+    tracker = CommandTracker(FakeClient("SUCCEEDED"), fallback_after=0.01)
+    assert asyncio.run(tracker.wait("c2", timeout=1))["source"] == "query"
+
+    pending = CommandTracker(FakeClient("PENDING"), fallback_after=0.01)
+    try:
+        asyncio.run(pending.wait("c3", timeout=0.05))
+        assert False, "expected a timeout"
+    except asyncio.TimeoutError:
+        pass
+    assert pending.status("c3")["status"] == "PENDING"
+    assert not pending._waiters
+
+
+def test_fallback_query_runs_on_the_given_pool():
+    pool = BoundedExecutor("doma", 1)
+    client = FakeClient("SUCCEEDED")
+    tracker = CommandTracker(client, fallback_after=0.01, executor=pool)
+
+    assert asyncio.run(tracker.wait("c4", timeout=1))["status"] == "SUCCEEDED"
+    assert client.calls == ["c4"]
+    assert pool.metrics.snapshot()['executor_run_seconds{pool="doma"}']['count'] == 1
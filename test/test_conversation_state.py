@@ -0,0 +1,55 @@
+import asyncio
+
+from conversation_state import ConversationStore, PromptRouter
+from lru_cache import LRUCache, MISSING
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.raw_text = text
+
+
+def test_state_survives_a_restart_and_expires(mongo):
+    ConversationStore(mongo).set(1, "search_domain", {"mode": "owner"})
+    ConversationStore(mongo).set(2, "ai_consult", ttl=-1)
+
+    store = ConversationStore(mongo, cache=LRUCache(maxsize=10))  # a new process
+    assert store.cached(1) is MISSING
+    assert store.get(1)["state"] == "search_domain"
+    assert store.cached(1)["data"] == {"mode": "owner"}
+    assert store.get(2) is None
+
+
+def test_clear_is_free_for_users_without_a_prompt(mongo):
+    store = ConversationStore(mongo)
+    assert store.get(1) is None
+    store.clear(1)
+    assert mongo.deletes == 0
+
+    store.set(1, "search_domain")
+    store.clear(1)
+    assert mongo.deletes == 1 and store.cached(1) is None and mongo.docs("conversation_state") == []
+
+
+def test_delete_ignores_a_cache_already_cleared(mongo):
+    store = ConversationStore(mongo)
+    store.set(1, "search_domain")
+
+    # The bot clears the cache on the loop before the delete reaches the Mongo pool
+    store.cache.put(1, None)
+    store.delete(1)
+    assert mongo.deletes == 1 and mongo.docs("conversation_state") == []
+
+
+def test_prompt_router_passes_text_and_data():
+    prompts = PromptRouter()
+    seen = []
+
+    @prompts.route("find_domains_by_owner")
+    async def reply(event, text, page=1):
+        seen.append((text, page))
+
+    asyncio.run(prompts.dispatch(FakeMessage("eip155:1:0xab"), {"state": "find_domains_by_owner", "data": {"page": 2}}))
+    asyncio.run(prompts.dispatch(FakeMessage("ignored"), {"state": "unknown"}))
+    assert seen == [("eip155:1:0xab", 2)]
+    assert "find_domains_by_owner" in prompts
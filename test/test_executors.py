@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+from executors import BoundedExecutor
+from metrics import MetricsRegistry
+
+
+def test_pool_runs_off_loop_and_records_queue_wait():
+    metrics = MetricsRegistry()
+    pool = BoundedExecutor("mongo", max_workers=2, max_queue=1, metrics=metrics)
+    loop_thread = []
+
+    def blocking(i):
+        time.sleep(0.05)
+        return i, threading.current_thread().name
+
+    async def scenario():
+        loop_thread.append(threading.current_thread().name)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        tick_task = asyncio.ensure_future(ticker())
+        results = await asyncio.gather(*(pool.run(blocking, i) for i in range(5)))
+        tick_task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    pool.shutdown(wait=True)
+
+    assert [r[0] for r in results] == list(range(5))
+    assert all(r[1].startswith("mongo-pool") and r[1] != loop_thread[0] for r in results)
+    # The loop kept running while the calls blocked
+    assert ticks >= 5
+    snap = metrics.snapshot()
+    assert snap['executor_queue_wait_seconds{pool="mongo"}']["count"] == 5
+    assert snap['executor_queue_wait_seconds{pool="mongo"}']["max"] >= 0.04
+    assert snap['executor_backpressure_total{pool="mongo"}'] >= 1
+    assert snap['executor_running{pool="mongo"}'] == 0
+    assert 'executor_saturation{pool="mongo"} 0' in metrics.render()
+
+
+def test_exceptions_propagate():
+    pool = BoundedExecutor("doma", max_workers=1)
+
+    def boom():
+        raise ValueError("bad")
+
+    try:
+        asyncio.run(pool.run(boom))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    pool.shutdown()
@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+from fanout import gather_within
+
+
+async def answer(value, delay):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def fail(delay):
+    await asyncio.sleep(delay)
+    raise RuntimeError("search failed")
+
+
+def test_partial_results_at_deadline():
+    progress = []
+
+    async def on_progress(finished, total):
+        progress.append((finished, total))
+
+    async def scenario():
+        slow = asyncio.ensure_future(answer("slow", 5))
+        calls = {"a": answer(["a.com"], 0.01), "b": fail(0.02), "c": slow}
+        start = time.monotonic()
+        results, errors, timed_out = await gather_within(calls, 0.2, on_progress=on_progress)
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(0)
+        return results, errors, timed_out, elapsed, slow.cancelled()
+
+    results, errors, timed_out, elapsed, cancelled = asyncio.run(scenario())
+    assert results == {"a": ["a.com"]}
+    assert isinstance(errors["b"], RuntimeError)
+    assert timed_out == ["c"]
+    assert cancelled
+    assert elapsed < 1
+    assert progress == [(1, 3), (2, 3)]
+
+
+def test_progress_errors_do_not_stop_the_fan_out():
+    async def on_progress(finished, total):
+        raise RuntimeError("message was deleted")
+
+    results, errors, timed_out = asyncio.run(
+        gather_within({"a": answer(1, 0), "b": answer(2, 0.01)}, 1, on_progress=on_progress))
+    assert results == {"a": 1, "b": 2}
+    assert not errors and not timed_out
@@ -197,4 +197,25 @@ def test_missing_data_field_raises(monkeypatch):
     client = DomaGraphQLClient(api_key=config.doma_api_key)
     with pytest.raises(GraphQLClientError) as ei:
         client.query_name("example.com")
-    assert "missing 'data' field" in str(ei.value).lower()
\ No newline at end of file
+    assert "missing 'data' field" in str(ei.value).lower()
+
+def test_name_batch_maps_partial_errors_to_names(monkeypatch):
+    seen = {}
+
+    def fake_urlopen(req, timeout):
+        payload = json.loads(req.data.decode("utf-8"))
+        seen["payload"] = payload
+        return FakeResponse({
+            "data": {"n0": {"name": "a.com"}, "n1": None},
+            "errors": [{"message": "Name not found", "path": ["n1"]}],
+        })
+
+    monkeypatch.setattr(caller_graphql.request, "urlopen", fake_urlopen)
+
+    client = DomaGraphQLClient(api_key=config.doma_api_key)
+    docs, errors = client.query_name_batch(["a.com", "missing.com"])
+
+    assert seen["payload"]["operationName"] == "NameBatch"
+    assert seen["payload"]["variables"] == {"n0": "a.com", "n1": "missing.com"}
+    assert docs == [{"name": "a.com"}, None]
+    assert errors == [None, "Name not found"]
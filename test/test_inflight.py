@@ -0,0 +1,55 @@
+import asyncio
+
+from telethon import events
+
+from inflight import InflightRegistry, deduplicated
+from metrics import MetricsRegistry
+
+
+class FakeEvent:
+    def __init__(self, sender_id, data):
+        self.sender_id = sender_id
+        self.data = data
+        self.answered = 0
+
+    async def answer(self):
+        self.answered += 1
+
+
+def test_duplicate_taps_are_answered_and_dropped():
+    metrics = MetricsRegistry()
+    registry = InflightRegistry(debounce=60)
+    calls = []
+
+    @deduplicated(registry, metrics)
+    async def page_domain(event):
+        calls.append(event.data)
+        await asyncio.sleep(0.01)
+
+    async def tap(event):
+        try:
+            await page_domain(event)
+        except events.StopPropagation:
+            pass
+
+    async def scenario():
+        first, second = FakeEvent(1, b"page_domain:a:2"), FakeEvent(1, b"page_domain:a:2")
+        await asyncio.gather(tap(first), tap(second))
+        third = FakeEvent(1, b"page_domain:a:2")  # within the debounce window
+        await tap(third)
+        await tap(FakeEvent(2, b"page_domain:a:2"))  # another user
+        await tap(FakeEvent(1, b"page_domain:a:3"))  # another page
+        return second, third
+
+    second, third = asyncio.run(scenario())
+    assert calls == [b"page_domain:a:2", b"page_domain:a:2", b"page_domain:a:3"]
+    assert second.answered == 1 and third.answered == 1
+    assert metrics.snapshot()['taps_dropped_total{handler="page_domain"}'] == 2
+
+
+def test_registry_frees_key_after_debounce():
+    registry = InflightRegistry(debounce=0)
+    assert registry.begin(1, b"x")
+    assert not registry.begin(1, b"x")
+    registry.end(1, b"x")
+    assert registry.begin(1, b"x")
@@ -0,0 +1,57 @@
+import pytest
+
+from inline_search import InlineSearch
+from lru_cache import MISSING
+
+
+class FakeNames:
+    def __init__(self, names):
+        self.names = names
+        self.calls = []
+
+    def get_names_page(self, *, name_filter, page=1, page_size=10):
+        self.calls.append((name_filter, page, page_size))
+        found = [n for n in self.names if name_filter in n]
+        items = found[(page - 1) * page_size:page * page_size]
+        return {"names": items, "totalCount": len(found), "totalPages": -(-len(found) // page_size), "page": page}
+
+
+def test_small_result_sets_are_reused_for_longer_queries():
+    names = FakeNames([f"ab{i}.com" for i in range(30)] + ["abc.io", "zz.com"])
+    search = InlineSearch(names, page_size=10, fetch_size=100)
+
+    first, next_offset = search.search(" AB ")
+    assert first == [f"ab{i}.com" for i in range(10)] and next_offset == 10
+    assert search.search("ab", 30) == (["abc.io"], None)
+    assert search.search("abc") == (["abc.io"], None)
+    assert search.search("ab1") == (["ab1.com"] + [f"ab{i}.com" for i in range(10, 19)], 10)
+    assert names.calls == [("ab", 1, 100)]
+
+
+def test_large_result_sets_are_fetched_per_chunk():
+    names = FakeNames([f"ab{i:03d}.com" for i in range(250)])
+    search = InlineSearch(names, page_size=50, fetch_size=100)
+
+    assert search.search("ab", 150)[1] == 200
+    assert search.search("ab", 200) == ([f"ab{i:03d}.com" for i in range(200, 250)], None)
+    assert search.search("abc") == ([], None)
+    assert names.calls == [("ab", 2, 100), ("ab", 3, 100), ("abc", 1, 100)]
+    assert search.search("a") == ([], None)
+
+
+def test_page_size_must_divide_fetch_size():
+    with pytest.raises(ValueError):
+        InlineSearch(FakeNames([]), page_size=30, fetch_size=100)
+
+
+def test_cached_search_never_requests():
+    names = FakeNames([f"ab{i}.com" for i in range(15)])
+    search = InlineSearch(names, page_size=10, fetch_size=100)
+
+    assert search.cached_search("ab") is MISSING
+    assert search.cached_search("a") == ([], None)
+    assert names.calls == []
+    search.search("ab")
+    assert search.cached_search("ab", 10) == ([f"ab{i}.com" for i in range(10, 15)], None)
+    assert search.cached_search("ab1") == search.search("ab1")
+    assert names.calls == [("ab", 1, 100)]
@@ -0,0 +1,219 @@
+from datetime import datetime, timedelta, timezone
+
+from listings_book import ListingsBook
+
+
+def _ts(**delta):
+    return (datetime.now(timezone.utc) - timedelta(**delta)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _future(**delta):
+    return (datetime.now(timezone.utc) + timedelta(**delta)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _item(order_id, name, price, created, token_id=None, decimals=18, symbol="ETH"):
+    return {
+        "id": order_id,
+        "externalId": order_id,
+        "price": str(price),
+        "currency": {"name": symbol, "symbol": symbol, "decimals": decimals},
+        "expiresAt": _future(days=30),
+        "createdAt": created,
+        "name": name,
+        "tokenId": token_id or f"t-{order_id}",
+    }
+
+
+class FakeListingsService:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def get_listings(self, *, skip=None, take=None, created_since=None, **_):
+        self.calls.append((skip, take, created_since))
+        index = (skip or 0) // take
+        items = self.pages[index]
+        return {"items": items, "hasNextPage": index + 1 < len(self.pages)}
+
+
+def test_bootstrap_pages_through_all_listings():
+    pages = [[_item(f"o{i}", f"n{i}.com", 10 ** 18, _ts(hours=i)) for i in range(2)],
+             [_item("o9", "n9.ai", 10 ** 18, _ts(hours=9))]]
+    svc = FakeListingsService(pages)
+    book = ListingsBook()
+
+    assert book.bootstrap(svc, take=2) == 3
+    assert [c[0] for c in svc.calls] == [0, 2]
+    assert len(book) == 3
+
+
+def test_recent_is_newest_first_and_paginated():
+    book = ListingsBook()
+    for i in range(25):
+        book.add(_item(f"o{i}", f"n{i}.com", 10 ** 18, _ts(minutes=i)))
+
+    items, total, pages = book.recent(page=1)
+    assert total == 25 and pages == 3
+    assert [it["name"] for it in items[:2]] == ["n0.com", "n1.com"]
+
+    items, _, _ = book.recent(page=3)
+    assert [it["name"] for it in items] == [f"n{i}.com" for i in range(20, 25)]
+
+
+def test_recent_skips_expired_and_out_of_window():
+    book = ListingsBook(window_days=7)
+    book.add(_item("old", "old.com", 1, _ts(days=8)))
+    expired = _item("exp", "exp.com", 1, _ts(hours=1))
+    expired["expiresAt"] = _ts(minutes=1)
+    book.add(expired)
+    book.add(_item("ok", "ok.com", 1, _ts(hours=1)))
+
+    items, total, _ = book.recent()
+    assert total == 1 and items[0]["name"] == "ok.com"
+
+
+def test_tld_and_price_indexes():
+    book = ListingsBook()
+    book.add(_item("a", "a.com", 3 * 10 ** 6, _ts(minutes=1), decimals=6, symbol="USDC"))
+    book.add(_item("b", "b.ai", 1 * 10 ** 18, _ts(minutes=2)))
+    book.add(_item("c", "c.com", 2 * 10 ** 6, _ts(minutes=3), decimals=6, symbol="USDC"))
+
+    items, total, _ = book.recent(tld="com")
+    assert total == 2 and {it["name"] for it in items} == {"a.com", "c.com"}
+
+    items, _, _ = book.by_price()
+    assert [it["name"] for it in items] == ["b.ai", "c.com", "a.com"]
+    assert book.tlds() == ["ai", "com"]
+
+
+def test_events_list_cancel_and_purchase():
+    book = ListingsBook()
+    book.add(_item("seed", "seed.com", 1, _ts(hours=1), token_id="tok1"))
+
+    book.apply_event({
+        "id": 1,
+        "type": "NAME_TOKEN_LISTED",
+        "tokenId": "tok1",
+        "eventData": {
+            "type": "NAME_TOKEN_LISTED",
+            "tokenId": "tok1",
+            "tokenAddress": "0xabc",
+            "orderbook": "DOMA",
+            "orderId": "new",
+            "createdAt": _ts(seconds=5),
+            "startsAt": _ts(seconds=5),
+            "expiresAt": _future(days=1),
+            "seller": "0xseller",
+            "payment": {"price": "5000000", "tokenAddress": "0xusdc", "currencySymbol": "USDC"},
+        },
+    })
+    items, total, _ = book.recent()
+    assert total == 2
+    newest = items[0]
+    assert newest["externalId"] == "new"
+    assert newest["name"] == "seed.com"
+    assert newest["currency"]["decimals"] == 6
+
+    book.apply_event({
+        "id": 2,
+        "type": "NAME_TOKEN_LISTING_CANCELLED",
+        "eventData": {"type": "NAME_TOKEN_LISTING_CANCELLED", "tokenId": "tok1", "tokenAddress": "0xabc",
+                      "orderbook": "DOMA", "orderId": "new", "createdAt": _ts(seconds=1)},
+    })
+    assert len(book) == 1
+
+    book.apply_event({
+        "id": 3,
+        "type": "NAME_TOKEN_PURCHASED",
+        "eventData": {"type": "NAME_TOKEN_PURCHASED", "tokenId": "tok1", "tokenAddress": "0xabc",
+                      "orderbook": "DOMA", "orderId": "other", "createdAt": _ts(seconds=1),
+                      "purchasedAt": _ts(seconds=1), "seller": "0xs", "buyer": "0xb",
+                      "payment": {"price": "1", "tokenAddress": "0x0", "currencySymbol": "ETH"}},
+    })
+    assert len(book) == 0
+
+
+def test_unnamed_listings_wait_for_names_resolved_off_the_loop():
+    book = ListingsBook(name_resolver=lambda token_id: None)
+    book.apply_event({
+        "id": 1,
+        "type": "NAME_TOKEN_LISTED",
+        "eventData": {
+            "type": "NAME_TOKEN_LISTED",
+            "tokenId": "tok2",
+            "tokenAddress": "0xabc",
+            "orderbook": "DOMA",
+            "orderId": "o1",
+            "createdAt": _ts(seconds=5),
+            "startsAt": _ts(seconds=5),
+            "expiresAt": _future(days=1),
+            "seller": "0xseller",
+            "payment": {"price": "1", "tokenAddress": "0x0", "currencySymbol": "ETH"},
+        },
+    })
+    assert book.unnamed() == ["tok2"]
+    assert book.recent()[1] == 0
+
+    assert book.apply_names({"tok2": "late.ai"}) == 1
+    assert book.unnamed() == []
+    items, total, _ = book.recent(tld="ai")
+    assert total == 1 and items[0]["name"] == "late.ai"
+
+
+def test_stale_listings_leave_every_index():
+    book = ListingsBook(window_days=7)
+    book.add(_item("old", "old.xyz", 1, _ts(days=8), token_id="t-old"))
+    expired = _item("exp", "exp.ai", 1, _ts(hours=1), token_id="t-exp")
+    expired["expiresAt"] = _ts(minutes=1)
+    book.add(expired)
+    book.add(_item("ok", "ok.com", 1, _ts(hours=1)))
+
+    assert book.prune() == 2
+    assert len(book) == 1
+    assert book.tlds() == ["com"]
+    assert set(book._order_by_token) == {"t-ok"}
+    assert [k for _, k in book._by_created] == ["ok"]
+    assert [k for _, k in book._by_price] == ["ok"]
+    assert [k for _, k in book._by_expiry] == ["ok"]
+    assert book.prune() == 0
+
+
+def test_removing_the_last_listing_drops_empty_index_entries():
+    book = ListingsBook()
+    book.add(_item("a", "a.com", 1, _ts(minutes=1), token_id="tok"))
+    book.remove("a")
+
+    assert book._by_tld == {} and book._order_by_token == {} and book._name_by_token == {}
+
+
+def test_events_during_a_load_are_replayed_after_it():
+    pages = [[_item("o1", "a.com", 1, _ts(hours=1), token_id="tok1"),
+              _item("o2", "b.com", 1, _ts(hours=2), token_id="tok2")]]
+    book = ListingsBook()
+
+    book.begin_load()
+    items = book.fetch(FakeListingsService(pages))
+    assert len(book) == 0
+    # Cancelled while the snapshot was in flight
+    book.apply_event({
+        "id": 1,
+        "type": "NAME_TOKEN_LISTING_CANCELLED",
+        "eventData": {"type": "NAME_TOKEN_LISTING_CANCELLED", "tokenId": "tok1", "tokenAddress": "0xabc",
+                      "orderbook": "DOMA", "orderId": "o1", "createdAt": _ts(seconds=1)},
+    })
+    assert book.load(items) == 2
+    assert [it["externalId"] for it in book.recent()[0]] == ["o2"]
+
+
+def test_failed_load_leaves_an_empty_book_that_follows_events():
+    class Down:
+        def get_listings(self, **kwargs):
+            raise ConnectionError("subgraph down")
+
+    book = ListingsBook()
+    try:
+        book.bootstrap(Down())
+    except ConnectionError:
+        pass
+    book.add(_item("o3", "c.com", 1, _ts(minutes=1)))
+    assert len(book) == 1 and book._loading is None
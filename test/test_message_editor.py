@@ -0,0 +1,82 @@
+import asyncio
+
+from telethon import Button
+from telethon.errors import MessageIdInvalidError, MessageNotModifiedError
+
+from message_editor import MessageEditor, content_digest
+from send_queue import SendQueue
+
+
+class FakeMessage:
+    def __init__(self, id):
+        self.id = id
+
+
+class FakeCallback:
+    def __init__(self, message_id=7, fail=None):
+        self.chat_id = 1
+        self.message_id = message_id
+        self.fail = fail
+        self.edits = []
+        self.sent = []
+
+    async def edit(self, text, buttons=None):
+        if self.fail is not None:
+            raise self.fail
+        self.edits.append(text)
+
+    async def respond(self, text, buttons=None):
+        self.sent.append(text)
+        return FakeMessage(99)
+
+
+def page(n):
+    return [[Button.inline(f"name{n}.com", b"~id")], [Button.inline("»", f"p{n + 1}".encode())]]
+
+
+def test_unchanged_content_is_not_sent_again():
+    async def scenario():
+        editor = MessageEditor(SendQueue(global_rate=1000, chat_rate=1000, chat_burst=1000))
+        event = FakeCallback()
+        results = [await editor.edit(event, "page 1", page(1)),
+                   await editor.edit(event, "page 1", page(1)),
+                   await editor.edit(event, "page 2", page(2))]
+        return results, event
+
+    results, event = asyncio.run(scenario())
+    assert results == [True, False, True]
+    assert event.edits == ["page 1", "page 2"]
+
+
+def test_not_modified_and_failed_edits():
+    async def scenario():
+        editor = MessageEditor(SendQueue(global_rate=1000, chat_rate=1000, chat_burst=1000))
+        same = FakeCallback(fail=MessageNotModifiedError(request=None))
+        gone = FakeCallback(message_id=8, fail=MessageIdInvalidError(request=None))
+        return await editor.edit(same, "x"), await editor.edit(gone, "y"), gone, editor
+
+    unchanged, resent, gone, editor = asyncio.run(scenario())
+    assert unchanged is False
+    assert resent is True and gone.sent == ["y"]
+    assert editor.cache.get((1, 99)) == content_digest("y")
+
+
+def test_other_edit_errors_are_raised():
+    async def scenario():
+        editor = MessageEditor(SendQueue(global_rate=1000, chat_rate=1000, chat_burst=1000))
+        broken = FakeCallback(fail=ConnectionError("network down"))
+        try:
+            await editor.edit(broken, "z")
+        except ConnectionError:
+            return broken, editor
+        raise AssertionError("expected the edit error")
+
+    broken, editor = asyncio.run(scenario())
+    assert broken.sent == []
+    assert (1, 7) not in editor.cache
+
+
+def test_digest_covers_buttons():
+    assert content_digest("t", page(1)) != content_digest("t", page(2))
+    assert content_digest("t", page(1)) == content_digest("t", page(1))
+    assert content_digest("t") != content_digest("t", Button.inline("a", b"a"))
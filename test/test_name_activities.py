@@ -0,0 +1,91 @@
+from doma_name_activities_service import DomaNameActivitiesService
+
+
+class FakeClient:
+    def __init__(self, activities):
+        # Oldest first, as returned with sortOrder ASC
+        self.activities = sorted(activities, key=lambda a: a["createdAt"])
+        self.calls = []
+
+    def query_name_activities(self, *, name, skip=0, take=100, sortOrder=None, **_):
+        self.calls.append((skip, sortOrder))
+        page = self.activities[skip:skip + take]
+        return {"items": page, "hasNextPage": skip + take < len(self.activities)}
+
+
+def activity(tx, created):
+    return {"__typename": "NameRenewedActivity", "type": "RENEWED", "txHash": tx, "sld": "a", "tld": "com",
+            "createdAt": created}
+
+
+def store(mongo, *events):
+    # Stored in arrival order; ids ascend like Poll API event ids
+    stored = mongo.docs("doma_events")
+    for e in events:
+        mongo.insert("doma_events", dict(e, id=len(stored) + 1))
+
+
+def event(tx, created=None, happened=None):
+    stored = {"type": "NAME_RENEWED", "name": "a.com", "eventData": {"type": "NAME_RENEWED", "txHash": tx}}
+    if created:
+        stored["createdAt"] = created
+    if happened:
+        stored["eventData"]["createdAt"] = happened
+    return stored
+
+
+def test_empty_store_keeps_the_subgraph_history(mongo):
+    client = FakeClient([activity("0x1", "2025-01-01T00:00:00.000Z"), activity("0x2", "2025-01-02T00:00:00.000Z")])
+    service = DomaNameActivitiesService(client, mongo=mongo)
+
+    first = service.get_local_name_activities("a.com")
+    assert [it["txHash"] for it in first["items"]] == ["0x2", "0x1"]
+    assert service.get_local_name_activities("a.com") == first
+    assert len(client.calls) == 1
+
+
+def test_activity_stored_and_in_the_subgraph_is_listed_once(mongo):
+    # Received after its chain time, so the subgraph also returns it as older than the first stored event
+    client = FakeClient([activity("0x1", "2025-01-01T00:00:00.000Z"), activity("0x2", "2025-01-02T00:00:00.000Z")])
+    store(mongo, event("0x2", "2025-01-02T00:00:05.000Z"), event("0x3", "2025-01-03T00:00:00.000Z"))
+    service = DomaNameActivitiesService(client, mongo=mongo)
+
+    items = service.get_local_name_activities("a.com")["items"]
+    assert [it["txHash"] for it in items] == ["0x3", "0x2", "0x1"]
+
+
+def test_backfill_stops_paging_at_the_first_stored_event(mongo):
+    # 250 activities, 28 per month from January on; only the first page is older than the stored event
+    client = FakeClient([activity(f"0x{i}", f"2025-{1 + i // 28:02d}-{1 + i % 28:02d}T00:00:00.000Z")
+                         for i in range(250)])
+    store(mongo, event("0xnew", "2025-02-10T00:00:00.000Z"))
+    service = DomaNameActivitiesService(client, mongo=mongo)
+
+    items = service.get_local_name_activities("a.com")["items"]
+    assert client.calls == [(0, "ASC")]
+    assert items[0]["txHash"] == "0xnew"
+    assert items[1]["createdAt"] == "2025-02-09T00:00:00.000Z"
+    assert len(items) == 1 + 28 + 9
+
+
+def test_events_without_receipt_time_are_listed_and_own_time_wins(mongo):
+    client = FakeClient([activity("0x1", "2025-01-01T00:00:00.000Z")])
+    # Stored before bg_poll.py stamped receipt times, then one carrying its own timestamp
+    store(mongo, event("0x2"), event("0x3", created="2025-01-05T00:00:09.000Z",
+                                happened="2025-01-05T00:00:00.000Z"))
+    service = DomaNameActivitiesService(client, mongo=mongo)
+
+    items = service.get_local_name_activities("a.com")["items"]
+    assert [it["txHash"] for it in items] == ["0x3", "0x2", "0x1"]
+    assert items[0]["createdAt"] == "2025-01-05T00:00:00.000Z"
+
+
+def test_first_stored_event_is_found_once_the_store_fills(mongo):
+    client = FakeClient([activity("0x1", "2025-01-01T00:00:00.000Z"), activity("0x2", "2025-01-03T00:00:00.000Z")])
+    service = DomaNameActivitiesService(client, mongo=mongo)
+    assert service._first_stored_event_at() is None
+
+    store(mongo, event("0x9", created="2025-01-02T00:00:00.000Z"))
+    assert service._first_stored_event_at() == "2025-01-02T00:00:00.000Z"
+    items = service.get_local_name_activities("a.com")["items"]
+    assert [it["txHash"] for it in items] == ["0x9", "0x1"]
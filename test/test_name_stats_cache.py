@@ -0,0 +1,87 @@
+from name_stats_cache import NameStatsCache
+
+
+def offer_event(event_type, token_id, order_id, price="0", symbol="USDC"):
+    data = {"type": event_type, "tokenAddress": "0x2", "tokenId": token_id, "orderId": order_id,
+            "orderbook": "DOMA", "createdAt": "2025-01-01T00:00:00.000Z"}
+    if event_type == "NAME_TOKEN_OFFER_RECEIVED":
+        data.update({"buyer": "0xb", "seller": "0xs", "expiresAt": "2099-01-01T00:00:00.000Z",
+                     "payment": {"price": price, "tokenAddress": "0xc", "currencySymbol": symbol}})
+    return {"type": event_type, "eventData": data}
+
+
+class FakeOffersService:
+    def __init__(self, stats):
+        self.stats = stats
+        self.batches = []
+
+    def get_name_statistics_batch(self, token_ids):
+        self.batches.append(list(token_ids))
+        return {tid: dict(self.stats[tid]) for tid in token_ids if tid in self.stats}
+
+
+def stats(active, highest_price=None, order_id="o0"):
+    highest = None
+    if highest_price is not None:
+        highest = {"id": order_id, "externalId": order_id, "price": highest_price,
+                   "currency": {"symbol": "USDC", "decimals": 6}}
+    return {"name": "a.com", "highestOffer": highest, "activeOffers": active, "offersLast3Days": active}
+
+
+def test_miss_is_queued_and_filled_in_one_batch():
+    service = FakeOffersService({"t1": stats(1, "5000000"), "t2": stats(0)})
+    cache = NameStatsCache()
+
+    assert cache.get("t1") is None
+    assert cache.get("t2") is None
+    assert cache.get("t3") is None
+    assert cache.refresh(service, batch_size=25) == 2
+    assert service.batches == [["t1", "t2", "t3"]]
+    assert cache.get("t1")["activeOffers"] == 1
+    # Unknown tokens are not asked for again until viewed again
+    assert cache.due() == []
+
+
+def test_offer_events_update_cached_stats():
+    service = FakeOffersService({"t1": stats(1, "5000000", order_id="o1")})
+    cache = NameStatsCache()
+    cache.put("t1", service.stats["t1"])
+
+    cache.apply_event(offer_event("NAME_TOKEN_OFFER_RECEIVED", "t1", "o2", price="9000000"))
+    cache.apply_event(offer_event("NAME_TOKEN_OFFER_RECEIVED", "t9", "o3", price="1"))
+    current = cache.get("t1")
+    assert current["activeOffers"] == 2 and current["offersLast3Days"] == 2
+    assert current["highestOffer"]["externalId"] == "o2"
+    assert cache.get("t9") is None
+
+    cache.apply_event(offer_event("NAME_TOKEN_OFFER_CANCELLED", "t1", "o1"))
+    assert cache.get("t1")["activeOffers"] == 1
+    assert cache.due() == ["t9"]
+    cache.apply_event(offer_event("NAME_TOKEN_OFFER_CANCELLED", "t1", "o2"))
+    assert cache.due() == ["t9", "t1"]
+
+
+def test_offers_in_another_currency_are_not_compared():
+    cache = NameStatsCache()
+    cache.put("t1", stats(1, "5000000", order_id="o1"))
+
+    # 1 WETH is not below 5 USDC just because its amount is smaller in base units
+    cache.apply_event(offer_event("NAME_TOKEN_OFFER_RECEIVED", "t1", "o2", price="1", symbol="WETH"))
+    current = cache.get("t1")
+    assert current["activeOffers"] == 2
+    assert current["highestOffer"]["externalId"] == "o1"
+    assert cache.due() == ["t1"]
+
+
+def test_hot_entries_are_recomputed_when_old():
+    service = FakeOffersService({"t1": stats(3), "t2": stats(4)})
+    cache = NameStatsCache(max_age=0)
+    cache.put("t1", service.stats["t1"])
+    cache.put("t2", service.stats["t2"])
+
+    cache.get("t2")
+    cache.get("t2")
+    cache.get("t1")
+    assert cache.due(limit=1) == ["t2"]
+    assert cache.refresh(service) == 2
+    assert cache.due() == []
@@ -0,0 +1,134 @@
+from lru_cache import MISSING
+from name_token_cache import NameTokenCache
+
+
+class FakeNamesService:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.calls = []
+
+    def get_name_tokens(self, name):
+        self.calls.append(name)
+        return self.tokens.get(name, [])
+
+
+def test_lookup_falls_back_once_then_serves_from_memory_and_mongo(mongo):
+    names = FakeNamesService({"a.com": [{"tokenId": "t1", "networkId": "eip155:1"}]})
+    cache = NameTokenCache(mongo, names)
+
+    assert cache.token_id("a.com") == "t1"
+    assert cache.network_id("a.com") == "eip155:1"
+    assert names.calls == ["a.com"]
+    assert mongo.by_id("name_tokens")["t1"]["name"] == "a.com"
+
+    # A fresh process finds the persisted mapping without calling the subgraph
+    cold = NameTokenCache(mongo, names)
+    assert cold.token_id("a.com") == "t1"
+    assert cold.name_for("t1") == "a.com"
+    assert names.calls == ["a.com"]
+
+
+def test_negative_entries_are_cached_until_tokenized(mongo):
+    cache = NameTokenCache(mongo, FakeNamesService({}))
+
+    assert cache.token_id("b.com") is None
+    assert cache.token_id("b.com") is None
+    assert cache.names.calls == ["b.com"]
+
+    cache.apply_event({"type": "NAME_TOKENIZED", "eventData": {
+        "type": "NAME_TOKENIZED", "networkId": "eip155:1", "finalized": True, "blockNumber": "1",
+        "domaRecordAddress": "0x0", "name": "b.com", "expiresAt": "2030-01-01T00:00:00.000Z",
+        "nameservers": [], "dsKeys": [], "claimedBy": "0x1"}})
+    cache.apply_event({"type": "NAME_TOKEN_MINTED", "eventData": {
+        "type": "NAME_TOKEN_MINTED", "networkId": "eip155:1", "finalized": True, "blockNumber": "2",
+        "tokenAddress": "0x2", "tokenId": "t2", "owner": "0x1", "name": "b.com",
+        "expiresAt": "2030-01-01T00:00:00.000Z"}})
+
+    assert cache.token_id("b.com") == "t2"
+    assert cache.names.calls == ["b.com"]
+
+
+def test_burn_forgets_token(mongo):
+    cache = NameTokenCache(mongo, None)
+    cache.put("c.com", "t3", "eip155:1")
+
+    cache.apply_event({"type": "NAME_TOKEN_BURNED", "eventData": {
+        "type": "NAME_TOKEN_BURNED", "networkId": "eip155:1", "finalized": True, "blockNumber": "3",
+        "tokenAddress": "0x2", "tokenId": "t3", "owner": "0x1"}})
+
+    # Gone from memory at once, from MongoDB once flushed
+    assert "t3" in mongo.by_id("name_tokens")
+    assert cache.name_for("t3") is None
+    assert cache.flush() == 1
+    assert "t3" not in mongo.by_id("name_tokens")
+    assert cache.name_for("t3") is None
+    assert cache.token_id("c.com") is None
+
+
+def test_events_only_touch_memory_until_flushed(mongo):
+    cache = NameTokenCache(mongo, None)
+
+    cache.apply_event({"type": "NAME_TOKEN_MINTED", "eventData": {
+        "type": "NAME_TOKEN_MINTED", "networkId": "eip155:1", "finalized": True, "blockNumber": "2",
+        "tokenAddress": "0x2", "tokenId": "t4", "owner": "0x1", "name": "d.com",
+        "expiresAt": "2030-01-01T00:00:00.000Z"}})
+
+    assert mongo.docs("name_tokens") == [] and mongo.reads == 0
+    assert cache.cached_name("t4") == "d.com"
+    assert cache.cached_name("t5") is None
+    assert cache.flush() == 1
+    assert mongo.by_id("name_tokens")["t4"]["name"] == "d.com"
+    assert cache.flush() == 0
+
+
+def test_names_for_reads_misses_in_one_query(mongo):
+    mongo.insert("name_tokens", [{"_id": "t6", "name": "f.com"}, {"_id": "t7", "name": "g.com"}])
+    cache = NameTokenCache(mongo, None)
+    cache.put("e.com", "t5")
+
+    assert cache.names_for(["t5", "t6", "t7", "t8"]) == {"t5": "e.com", "t6": "f.com", "t7": "g.com"}
+    assert mongo.reads == 1
+    assert cache.cached_name("t6") == "f.com"
+
+
+def burned(token_id):
+    return {"type": "NAME_TOKEN_BURNED", "eventData": {
+        "type": "NAME_TOKEN_BURNED", "networkId": "eip155:1", "finalized": True, "blockNumber": "3",
+        "tokenAddress": "0x2", "tokenId": token_id, "owner": "0x1"}}
+
+
+def test_burning_one_chain_keeps_the_names_other_tokens(mongo):
+    cache = NameTokenCache(mongo, None)
+    cache.put("m.com", "t1", "eip155:1")
+    cache.put("m.com", "t2", "eip155:2")
+    cache.put("m.com", "t1", "eip155:1")
+    assert cache.token_id("m.com") == "t1"
+
+    cache.apply_event(burned("t1"))
+    # Before and after the delete is flushed, the other chain's token is found
+    assert cache.token_id("m.com") == "t2"
+    cache.flush()
+    assert cache.token_id("m.com") == "t2"
+
+    cache.apply_event(burned("t9"))
+    assert cache.token_id("m.com") == "t2"
+
+
+def test_negative_entries_expire(mongo):
+    names = FakeNamesService({})
+    cache = NameTokenCache(mongo, names, negative_ttl=-1)
+
+    assert cache.token_id("n.com") is None
+    names.tokens["n.com"] = [{"tokenId": "t5", "networkId": "eip155:1"}]
+    assert cache.token_id("n.com") == "t5"
+    assert names.calls == ["n.com", "n.com"]
+
+
+def test_subgraph_fallback_queues_its_writes(mongo):
+    cache = NameTokenCache(mongo, FakeNamesService({"o.com": [{"tokenId": "t6", "networkId": "eip155:1"}]}))
+
+    assert cache.stored("o.com") is MISSING
+    assert cache.fetch("o.com") == ("t6", "eip155:1")
+    assert cache.cached("o.com") == ("t6", "eip155:1")
+    assert mongo.docs("name_tokens") == []
+    assert cache.flush() == 1 and mongo.by_id("name_tokens")["t6"]["name"] == "o.com"
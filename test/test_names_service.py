@@ -0,0 +1,69 @@
+from caller_graphql import GraphQLClientError
+from doma_names_service import DomaNamesService
+from lru_cache import LRUCache
+
+
+class FakeClient:
+    def __init__(self, missing=(), fail=False):
+        self.missing = set(missing)
+        self.fail = fail
+        self.batches = []
+
+    def query_name_batch(self, names):
+        self.batches.append(list(names))
+        if self.fail:
+            raise GraphQLClientError("boom", status=502)
+        docs = [None if n in self.missing else {"name": n} for n in names]
+        errors = ["Name not found" if n in self.missing else None for n in names]
+        return docs, errors
+
+
+def test_get_names_batches_dedupes_and_keeps_input_order():
+    client = FakeClient(missing={"x.com"})
+    svc = DomaNamesService(client)
+
+    out = svc.get_names(["b.com", "a.com", "x.com", "b.com", "c.com"], batch_size=2)
+
+    assert client.batches == [["b.com", "a.com"], ["x.com", "c.com"]]
+    assert [r["name"] for r in out] == ["b.com", "a.com", "x.com", "b.com", "c.com"]
+    assert out[0]["data"] == {"name": "b.com"} and out[0]["error"] is None
+    assert out[2]["data"] is None and out[2]["error"] == "Name not found"
+
+
+def test_get_names_uses_cache_and_reports_batch_failures():
+    client = FakeClient()
+    svc = DomaNamesService(client, cache=LRUCache(maxsize=10, ttl=60))
+    svc.get_names(["a.com"])
+
+    client.fail = True
+    out = svc.get_names(["a.com", "b.com"])
+
+    assert client.batches == [["a.com"], ["b.com"]]
+    assert out[0]["data"] == {"name": "a.com"}
+    assert out[1]["data"] is None and "boom" in out[1]["error"]
+
+
+class FakePagedClient:
+    def __init__(self, total):
+        self.total = total
+        self.calls = []
+
+    def query_name_list(self, *, skip=None, take=None, name=None, ownedBy=None, claimStatus=None):
+        self.calls.append((skip, take, name, ownedBy))
+        items = [{"name": f"d{i}.com"} for i in range(skip, min(skip + take, self.total))]
+        return {"items": items, "totalCount": self.total, "totalPages": (self.total - 1) // take + 1}
+
+
+def test_get_names_page_returns_total_with_one_small_request():
+    client = FakePagedClient(total=5000)
+    svc = DomaNamesService(client, cache=LRUCache(maxsize=10, ttl=60))
+
+    first = svc.get_names_page(name_filter="d")
+    assert first["totalCount"] == 5000 and first["totalPages"] == 500
+    assert len(first["names"]) == 10
+    assert client.calls == [(0, 10, "d", None)]
+
+    third = svc.get_names_page(name_filter="d", page=3)
+    assert third["names"][0] == "d20.com"
+    svc.get_names_page(name_filter="d", page=3)
+    assert client.calls[1:] == [(20, 10, "d", None)]
@@ -0,0 +1,29 @@
+import msg_loader
+import nav
+
+
+def test_keyboards_are_built_once_and_shared():
+    translations = msg_loader.load_translations('translations')
+    nav.load_keyboards(translations)
+
+    en, fr = nav.keyboards('en'), nav.keyboards('fr')
+    assert nav.keyboards('en') is en
+    assert nav.keyboards('xx') is en
+    assert en.main_menu[0].text == translations['en']['main_menu']
+    assert fr.main_menu[0].text == translations['fr']['main_menu']
+    assert isinstance(en.settings, tuple) and en.settings[-1] is en.main_menu
+    assert [row[0].data for row in en.start_user][0] == b'get_recent_listing'
+
+    # Dynamic renderers reuse the shared main menu row
+    _, buttons = nav.list_domains(translations['fr'], ['a.com'], total=1)
+    assert buttons[-1] is fr.main_menu
+
+
+def test_pages_keep_the_subgraph_order_and_whole_lists_are_sorted():
+    translations = msg_loader.load_translations('translations')
+    nav.load_keyboards(translations)
+
+    _, buttons = nav.list_domains(translations['en'], ['b.com', 'a.com'], total=12, page=2)
+    assert [row[0].text for row in buttons[:2]] == ['b.com', 'a.com']
+    _, buttons = nav.list_domains(translations['en'], ['b.com', 'a.com'])
+    assert [row[0].text for row in buttons[:2]] == ['a.com', 'b.com']
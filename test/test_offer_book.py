@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta, timezone
+
+from offer_book import OfferBook
+
+
+def _ts(**delta):
+    return (datetime.now(timezone.utc) + timedelta(**delta)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _offer(order_id, price, token_id="tok1", decimals=18, symbol="WETH", expires=None):
+    return {
+        "id": order_id,
+        "externalId": order_id,
+        "price": str(price),
+        "currency": {"name": symbol, "symbol": symbol, "decimals": decimals},
+        "expiresAt": expires or _ts(days=3),
+        "createdAt": _ts(minutes=-1),
+        "name": "example.com",
+        "tokenId": token_id,
+    }
+
+
+class FakeOffersService:
+    def __init__(self, offers, active):
+        self.offers = offers
+        self.active = active
+        self.calls = []
+
+    def get_name_statistics(self, token_id):
+        self.calls.append(("stats", token_id))
+        return {"name": "example.com", "activeOffers": self.active, "offersLast3Days": self.active}
+
+    def get_offers(self, *, token_id=None, status=None, skip=None, take=None, **_):
+        self.calls.append(("offers", token_id, status, skip))
+        page = self.offers[skip:skip + take]
+        return {"items": page, "hasNextPage": skip + take < len(self.offers)}
+
+
+def test_seed_loads_active_offers_and_learns_name():
+    svc = FakeOffersService([_offer("a", 1 * 10 ** 18), _offer("b", 3 * 10 ** 18), _offer("c", 2 * 10 ** 18)],
+                            active=3)
+    book = OfferBook()
+
+    assert book.seed("tok1", svc, take=2) == 3
+    assert book.token_id_for("example.com") == "tok1"
+    assert book.count("tok1") == 3
+    assert book.best("tok1", "WETH")["externalId"] == "b"
+    assert [o["externalId"] for o in book.depth("tok1")] == ["b", "c", "a"]
+
+
+def test_seed_skips_offer_query_when_no_active_offers():
+    svc = FakeOffersService([], active=0)
+    book = OfferBook()
+
+    assert book.seed("tok1", svc) == 0
+    assert svc.calls == [("stats", "tok1")]
+    assert book.is_seeded("tok1")
+    assert book.best_by_currency("tok1") == {}
+
+
+def test_events_update_seeded_tokens_only():
+    book = OfferBook()
+    book.add(_offer("a", 1 * 10 ** 18))
+
+    received = {
+        "type": "NAME_TOKEN_OFFER_RECEIVED",
+        "eventData": {"type": "NAME_TOKEN_OFFER_RECEIVED", "tokenId": "tok1", "tokenAddress": "0x1",
+                      "orderbook": "DOMA", "orderId": "b", "createdAt": _ts(), "expiresAt": _ts(days=1),
+                      "buyer": "0xb", "seller": "0xs",
+                      "payment": {"price": "5000000", "tokenAddress": "0x2", "currencySymbol": "USDC"}},
+    }
+    book.apply_event(received)
+    assert book.count("tok1") == 2
+    # 5 USDC and 1 WETH are ranked separately, never against each other
+    assert book.best("tok1", "USDC")["externalId"] == "b"
+    assert book.best("tok1", "WETH")["externalId"] == "a"
+
+    other = dict(received, eventData=dict(received["eventData"], tokenId="tok2", orderId="z"))
+    book.apply_event(other)
+    assert not book.is_seeded("tok2")
+
+    book.apply_event({
+        "type": "NAME_TOKEN_OFFER_CANCELLED",
+        "eventData": {"type": "NAME_TOKEN_OFFER_CANCELLED", "tokenId": "tok1", "tokenAddress": "0x1",
+                      "orderbook": "DOMA", "orderId": "b", "createdAt": _ts()},
+    })
+    assert book.count("tok1") == 1
+    assert book.best_by_currency("tok1") == {"WETH": book.best("tok1", "WETH")}
+    assert book.best("tok1", "WETH")["externalId"] == "a"
+
+
+def test_expired_offers_are_dropped_on_read():
+    book = OfferBook()
+    book.add(_offer("old", 9 * 10 ** 18, expires=_ts(minutes=-5)))
+    book.add(_offer("new", 1 * 10 ** 18))
+
+    assert book.count("tok1") == 1
+    assert book.best("tok1", "WETH")["externalId"] == "new"
+
+
+def test_failed_seed_installs_nothing():
+    class FailingService(FakeOffersService):
+        def get_offers(self, **kwargs):
+            raise RuntimeError("subgraph down")
+
+    book = OfferBook()
+    try:
+        book.install("tok1", book.fetch("tok1", FailingService([], active=2)))
+    except RuntimeError:
+        pass
+    assert not book.is_seeded("tok1")
+
+
+def test_fetch_does_not_touch_the_book_until_installed():
+    svc = FakeOffersService([_offer("a", 10 ** 18)], active=1)
+    book = OfferBook()
+    fetched = book.fetch("tok1", svc)
+    assert not book.is_seeded("tok1") and book.token_id_for("example.com") is None
+    assert book.install("tok1", fetched) == 1
+    assert book.token_id_for("example.com") == "tok1"
+
+
+def test_offers_are_ranked_per_currency():
+    book = OfferBook()
+    book.add(_offer("eth", 2 * 10 ** 18))                           # 2 WETH
+    book.add(_offer("usdc1", 900 * 10 ** 6, decimals=6, symbol="USDC"))
+    book.add(_offer("usdc2", 1500 * 10 ** 6, decimals=6, symbol="USDC"))
+
+    assert book.currencies("tok1") == ["USDC", "WETH"]
+    assert {k: v["externalId"] for k, v in book.best_by_currency("tok1").items()} == {"USDC": "usdc2", "WETH": "eth"}
+    assert [o["externalId"] for o in book.depth("tok1")] == ["usdc2", "usdc1", "eth"]
+    assert [o["externalId"] for o in book.depth("tok1", currency="WETH")] == ["eth"]
+
+
+def test_events_during_fetch_are_replayed_after_install():
+    svc = FakeOffersService([_offer("a", 1 * 10 ** 18), _offer("b", 2 * 10 ** 18)], active=2)
+    book = OfferBook()
+
+    book.begin_seed("tok1")
+    fetched = book.fetch("tok1", svc)
+    # Arrive on the loop while the fetch is in flight: a new offer and a cancellation of a fetched one
+    book.apply_event({
+        "type": "NAME_TOKEN_OFFER_RECEIVED",
+        "eventData": {"type": "NAME_TOKEN_OFFER_RECEIVED", "tokenId": "tok1", "tokenAddress": "0x1",
+                      "orderbook": "DOMA", "orderId": "c", "createdAt": _ts(), "expiresAt": _ts(days=1),
+                      "buyer": "0xb", "seller": "0xs",
+                      "payment": {"price": str(3 * 10 ** 18), "tokenAddress": "0x2", "currencySymbol": "WETH"}},
+    })
+    book.apply_event({
+        "type": "NAME_TOKEN_OFFER_CANCELLED",
+        "eventData": {"type": "NAME_TOKEN_OFFER_CANCELLED", "tokenId": "tok1", "tokenAddress": "0x1",
+                      "orderbook": "DOMA", "orderId": "a", "createdAt": _ts()},
+    })
+    assert not book.is_seeded("tok1")
+
+    assert book.install("tok1", fetched) == 2
+    assert [o["externalId"] for o in book.depth("tok1")] == ["c", "b"]
+    # A second fetch that finishes later does not overwrite the current book
+    assert book.install("tok1", book.fetch("tok1", svc)) == 2
+    assert [o["externalId"] for o in book.depth("tok1")] == ["c", "b"]
+
+
+def test_aborted_seed_stops_buffering():
+    book = OfferBook()
+    book.begin_seed("tok1")
+    book.abort_seed("tok1")
+    book.apply_event({
+        "type": "NAME_TOKEN_OFFER_CANCELLED",
+        "eventData": {"type": "NAME_TOKEN_OFFER_CANCELLED", "tokenId": "tok1", "tokenAddress": "0x1",
+                      "orderbook": "DOMA", "orderId": "a", "createdAt": _ts()},
+    })
+    assert not book.is_seeded("tok1") and book._seeding == {}
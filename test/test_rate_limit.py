@@ -0,0 +1,79 @@
+import asyncio
+
+from telethon import events
+
+from executors import BoundedExecutor
+from lru_cache import LRUCache, MISSING
+from metrics import MetricsRegistry
+from doma_names_service import DomaNamesService
+from rate_limit import BUSY, RATE_LIMITED, LoadShedder, RateLimiter, limited
+
+
+class FakeEvent:
+    def __init__(self, sender_id):
+        self.sender_id = sender_id
+
+
+def test_costs_are_charged_per_user_and_class():
+    metrics = MetricsRegistry()
+    limiter = RateLimiter({"search": (0.001, 4), "ai": (0.001, 1)}, metrics=metrics)
+
+    assert limiter.allow(1, "search", cost=2)
+    assert limiter.allow(1, "search", cost=2)
+    assert not limiter.allow(1, "search")
+    assert limiter.allow(1, "ai")          # separate class
+    assert limiter.allow(2, "search", 4)   # separate user
+    assert 'rate_limited_total{handler_class="search"} 1' in metrics.render()
+
+
+def test_shedding_follows_queue_depth_and_latency():
+    pool = BoundedExecutor("doma", max_workers=1)
+    shedder = LoadShedder(max_queued=2, max_latency=1.0)
+    assert not shedder.overloaded(pool)
+    pool.latency = 1.5
+    assert shedder.overloaded(pool)
+    pool.latency = 0.0
+    pool._pending = 4
+    assert shedder.overloaded(pool)
+    pool.shutdown()
+
+
+def test_limited_rejects_before_running_the_handler():
+    limiter = RateLimiter({"search": (0.001, 1)})
+    pool = BoundedExecutor("ai", max_workers=1)
+    shedder = LoadShedder(max_latency=1.0)
+    rejected, ran = [], []
+
+    async def on_reject(event, reason):
+        rejected.append(reason)
+
+    @limited(limiter, "search", on_reject=on_reject, shedder=shedder, pool=pool)
+    async def handler(event):
+        ran.append(event.sender_id)
+
+    async def call():
+        try:
+            await handler(FakeEvent(1))
+        except events.StopPropagation:
+            pass
+
+    asyncio.run(call())
+    asyncio.run(call())
+    pool.latency = 2.0
+    asyncio.run(call())
+    assert ran == [1]
+    assert rejected == [RATE_LIMITED, BUSY]
+    pool.shutdown()
+
+
+def test_cached_names_page_never_requests():
+    class NoClient:
+        def query_name_list(self, **kwargs):
+            raise AssertionError("must not be called")
+
+    svc = DomaNamesService(NoClient(), cache=LRUCache(maxsize=10))
+    assert svc.cached_names_page(name_filter="ab") is MISSING
+    page = {"names": ["ab.com"], "totalCount": 1, "totalPages": 1, "page": 1}
+    svc.cache.put(svc._page_key("ab", None, None, 1, 10), page)
+    assert svc.cached_names_page(name_filter="ab", page=1) == page
+    assert DomaNamesService(NoClient()).cached_names_page(name_filter="ab") is MISSING
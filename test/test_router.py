@@ -0,0 +1,65 @@
+import asyncio
+
+import callback_codec as cc
+from router import CallbackRouter
+
+
+class FakeEvent:
+    def __init__(self, data):
+        self.data = data
+        self.answered = False
+
+    async def answer(self, *args, **kwargs):
+        self.answered = True
+
+
+def make_router(calls, invalid):
+    async def on_invalid(event, error):
+        invalid.append(type(error).__name__)
+
+    router = CallbackRouter(on_invalid=on_invalid, on_unknown=lambda event: event.answer())
+
+    @router.route(b"settings")
+    async def settings(event):
+        calls.append(("settings",))
+
+    @router.route(b"language", str)
+    async def language(event, lang):
+        calls.append(("language", lang))
+
+    @router.route(b"get_recent_listing", int)
+    async def recent(event, page=1):
+        calls.append(("recent", page))
+
+    @router.route(cc.PAGE_DOMAIN)
+    async def page_domain(event, text, page):
+        calls.append(("page_domain", text, page))
+
+    return router
+
+
+def test_routes_by_longest_whole_prefix_with_parsed_arguments():
+    calls, invalid = [], []
+    router = make_router(calls, invalid)
+    unknown = FakeEvent(b"settings_x")
+
+    async def scenario():
+        for data in (b"settings", b"language:fr", b"get_recent_listing", b"get_recent_listing:3",
+                     cc.encode_callback(cc.PAGE_DOMAIN, "abc", 2), b"get_recent_listing:x"):
+            await router.dispatch(FakeEvent(data))
+        await router.dispatch(unknown)
+
+    asyncio.run(scenario())
+    assert calls == [("settings",), ("language", "fr"), ("recent", 1), ("recent", 3), ("page_domain", "abc", 2)]
+    assert invalid == ["InvalidCallback"]
+    assert unknown.answered
+
+
+def test_duplicate_routes_are_rejected():
+    router = CallbackRouter()
+    router.add(b"about", lambda event: None)
+    try:
+        router.add(b"about", lambda event: None)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
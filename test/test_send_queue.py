@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from telethon.errors import FloodWaitError
+
+from metrics import MetricsRegistry
+from send_queue import INTERACTIVE, NOTIFICATION, SendQueue
+
+
+def test_interactive_first_and_flood_wait_only_delays_its_chat():
+    metrics = MetricsRegistry()
+    queue = SendQueue(global_rate=1000, chat_rate=1000, chat_burst=10, metrics=metrics)
+    sent = []
+    floods = {"a": 1}
+
+    def sender(chat, text):
+        async def send():
+            if floods.get(chat):
+                floods[chat] -= 1
+                raise FloodWaitError(request=None, capture=0)
+            sent.append((chat, text, time.monotonic()))
+            return text
+        return send
+
+    async def scenario():
+        queue.submit("a", sender("a", "n1"), NOTIFICATION)
+        queue.submit("b", sender("b", "n2"), NOTIFICATION)
+        reply = await queue.call("c", sender("c", "reply"), INTERACTIVE)
+        await queue.drain(timeout=2)
+        return reply
+
+    assert asyncio.run(scenario()) == "reply"
+    assert [t for _, t, _ in sent] == ["reply", "n2", "n1"]
+    snap = metrics.snapshot()
+    assert snap["send_queue_flood_waits_total"] == 1
+    assert snap['send_queue_sent_total{priority="notification"}'] == 2
+
+
+def test_per_chat_rate_does_not_hold_back_other_chats():
+    queue = SendQueue(global_rate=1000, chat_rate=20, chat_burst=1)
+    sent = []
+
+    def sender(chat):
+        async def send():
+            sent.append((chat, time.monotonic()))
+        return send
+
+    async def scenario():
+        start = time.monotonic()
+        futures = [queue.submit("a", sender("a")) for _ in range(3)] + [queue.submit("b", sender("b"))]
+        await asyncio.gather(*futures)
+        return start
+
+    start = asyncio.run(scenario())
+    times_a = [t for c, t in sent if c == "a"]
+    time_b = [t for c, t in sent if c == "b"][0]
+    assert times_a[2] - times_a[0] >= 0.09
+    assert time_b - start < 0.04
+
+
+def test_send_errors_reach_the_caller():
+    queue = SendQueue()
+
+    async def broken():
+        raise ValueError("blocked by user")
+
+    async def scenario():
+        try:
+            await queue.call(1, broken)
+        except ValueError:
+            return True
+        return False
+
+    assert asyncio.run(scenario())
+
+
+def test_slow_send_does_not_block_other_chats_and_keeps_chat_order():
+    queue = SendQueue(global_rate=1000, chat_rate=1000, chat_burst=10, max_in_flight=2)
+    events = []
+    release = {}
+
+    def sender(chat, text, slow=False):
+        async def send():
+            events.append(("start", chat, text))
+            if slow:
+                release[chat] = asyncio.Event()
+                await release[chat].wait()
+            events.append(("end", chat, text))
+        return send
+
+    async def scenario():
+        slow = queue.submit("a", sender("a", "a1", slow=True))
+        after = queue.submit("a", sender("a", "a2"))
+        await queue.call("b", sender("b", "b1"))
+        # b was delivered while a1 was still waiting; a2 waits for a1
+        assert ("start", "a", "a2") not in events
+        release["a"].set()
+        await asyncio.gather(slow, after)
+
+    asyncio.run(scenario())
+    assert events.index(("end", "b", "b1")) < events.index(("end", "a", "a1"))
+    assert events.index(("end", "a", "a1")) < events.index(("start", "a", "a2"))
+
+
+def test_in_flight_sends_are_capped():
+    queue = SendQueue(global_rate=1000, chat_rate=1000, chat_burst=10, max_in_flight=2)
+    running = []
+    peak = []
+
+    def sender():
+        async def send():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+        return send
+
+    async def scenario():
+        await asyncio.gather(*[queue.submit(chat, sender()) for chat in range(6)])
+
+    asyncio.run(scenario())
+    assert max(peak) == 2
@@ -0,0 +1,37 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from services import ServiceContainer
+
+
+def test_members_are_built_lazily_once_and_share_the_registry():
+    services = ServiceContainer(SimpleNamespace(ai_workers=1))
+
+    assert "limiter" not in vars(services) and "metrics" not in vars(services)
+    limiter = services.limiter
+    assert services.limiter is limiter
+    # Members built on the way are shared, the others are still untouched
+    assert limiter.metrics is services.metrics
+    assert "shedder" not in vars(services) and "doma_executor" not in vars(services)
+    assert services.ai_executor.max_workers == 1
+    assert services.doma_executor.max_workers == 8
+
+
+def test_run_helpers_dispatch_to_their_pool():
+    services = ServiceContainer(SimpleNamespace())
+
+    def thread_name(suffix):
+        return threading.current_thread().name + suffix
+
+    async def scenario():
+        return (await services.run_mongo(thread_name, "!"),
+                await services.run_doma(thread_name, suffix="?"),
+                await services.run_ai(thread_name, ""))
+
+    mongo, doma, ai = asyncio.run(scenario())
+    assert mongo.startswith("mongo-pool") and mongo.endswith("!")
+    assert doma.startswith("doma-pool") and doma.endswith("?")
+    assert ai.startswith("ai-pool")
+    for pool in (services.mongo_executor, services.doma_executor, services.ai_executor):
+        pool.shutdown(wait=True)
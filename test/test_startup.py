@@ -0,0 +1,50 @@
+import os
+import threading
+import time
+
+import msg_loader
+from executors import BoundedExecutor
+from metrics import MetricsRegistry
+from startup import StartupProfile
+
+
+def test_translation_cache_is_reused_until_a_catalog_changes(tmp_path, monkeypatch):
+    folder = tmp_path / "translations"
+    folder.mkdir()
+    po = folder / "msg_en.po"
+    po.write_text('msgid "hello"\nmsgstr "Hello"\n', encoding="utf-8")
+    cache_file = str(tmp_path / "cache.json")
+
+    assert msg_loader.load_translations(str(folder), cache_file) == {"en": {"hello": "Hello"}}
+    assert os.path.exists(cache_file)
+
+    parsed = []
+    import polib
+    original = polib.pofile
+    monkeypatch.setattr(polib, "pofile", lambda path: parsed.append(path) or original(path))
+    assert msg_loader.load_translations(str(folder), cache_file) == {"en": {"hello": "Hello"}}
+    assert parsed == []
+
+    po.write_text('msgid "hello"\nmsgstr "Hi there"\n', encoding="utf-8")
+    os.utime(po, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert msg_loader.load_translations(str(folder), cache_file) == {"en": {"hello": "Hi there"}}
+    assert len(parsed) == 1
+
+
+def test_prestart_creates_every_worker():
+    pool = BoundedExecutor("test", max_workers=3)
+    before = threading.active_count()
+    pool.prestart()
+    assert threading.active_count() - before == 3
+    pool.shutdown(wait=True)
+
+
+def test_profile_marks_phases():
+    metrics = MetricsRegistry()
+    profile = StartupProfile()
+    profile.mark("imports")
+    profile.mark("translations")
+    profile.publish(metrics)
+    assert [name for name, _ in profile.phases] == ["imports", "translations"]
+    assert "translations" in profile.report() and "total" in profile.report()
+    assert 'startup_phase_seconds{phase="imports"}' in metrics.render()
@@ -0,0 +1,34 @@
+import string
+
+import pytest
+
+import msg_loader
+import templates
+from templates import TEMPLATES, compile_template
+
+
+def test_compiled_template_matches_hand_built_text():
+    catalog = {"event": "Event", "status": "Status", "tx_hash": "Tx {hash}", "event_time": "Time"}
+    t = compile_template("activity", TEMPLATES["activity"], catalog)
+    assert t.slots == 4
+    assert t.render("Name Claimed", "CLAIM", "0xab", "2025-01-01 10:00:00") == (
+        "Event: `Name Claimed`\nStatus: `CLAIM`\nTx {hash}: `0xab`\nTime: `2025-01-01 10:00:00`\n\n")
+    assert t.render_rows([("a", "b", "c", "d")] * 2) == t.render("a", "b", "c", "d") * 2
+    with pytest.raises(TypeError):
+        t.render("too", "few")
+
+
+def test_missing_msgid_falls_back_to_english():
+    t = compile_template("searching", TEMPLATES["searching"], {}, fallback={"searching": "Searching"})
+    assert t.render("{x}") == "Searching `{x}`..."
+
+
+def test_every_template_compiles_for_every_language():
+    translations = msg_loader.load_translations()
+    templates.load_templates(translations)
+    for spec in TEMPLATES.values():
+        for _, field, _, _ in string.Formatter().parse(spec):
+            if field and not field.isdigit():
+                assert all(field in catalog for catalog in translations.values()), field
+    assert templates.render("xx", "main_menu") == templates.render("en", "main_menu")
+    assert templates.render("en", "info_subscription", "a.com").count("`a.com`") == 1
@@ -0,0 +1,25 @@
+from lru_cache import LRUCache
+from tg_users_service import TelegramUserManager
+
+
+def test_taps_after_first_read_do_not_hit_mongo(mongo):
+    tum = TelegramUserManager(mongo, cache=LRUCache(maxsize=10, ttl=60))
+
+    assert tum.get_user(1) is None
+    tum.save_user(1, language="fr")
+    reads = mongo.reads
+    assert tum.get_user(1)["language"] == "fr"
+    assert tum.list_subscriptions(1) == []
+
+    tum.update_user(1, {"language": "es"})
+    tum.add_subscription(1, "a.com")
+    tum.add_subscription(1, "b.com")
+    tum.remove_subscription(1, "a.com")
+    assert tum.get_user(1)["language"] == "es"
+    assert tum.list_subscriptions(1) == ["b.com"]
+    assert mongo.reads == reads
+
+    # The cache agrees with what a cold read returns
+    cold = TelegramUserManager(mongo)
+    assert cold.get_user(1)["subscriptions"] == ["b.com"]
+    assert cold.get_user(1)["language"] == "es"
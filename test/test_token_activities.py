@@ -0,0 +1,75 @@
+from doma_token_activities_service import DomaTokenActivitiesService
+
+
+class FakeClient:
+    def __init__(self):
+        # Newest first, as returned with sortOrder DESC
+        self.items = []
+        self.calls = []
+
+    def add(self, tx, created):
+        self.items.insert(0, {"__typename": "TokenTransferredActivity", "type": "TRANSFERRED",
+                              "txHash": tx, "tokenId": "t1", "createdAt": created})
+
+    def query_token_activities(self, *, tokenId, skip=0, take=100, sortOrder=None, **_):
+        self.calls.append(skip)
+        return {"items": self.items[skip:skip + take], "hasNextPage": skip + take < len(self.items)}
+
+
+T0 = "2025-01-01T00:00:00.000Z"
+T1 = "2025-01-02T00:00:00.000Z"
+
+
+def test_refresh_keeps_activities_that_share_the_head_timestamp(mongo):
+    client = FakeClient()
+    service = DomaTokenActivitiesService(client, mongo=mongo)
+    client.add("0xa", T0)
+    client.add("0xb", T1)
+    assert service.refresh_token_activities("t1") == 2
+
+    # A second activity in the head's second arrives later, listed after the known one
+    client.items.insert(1, {"__typename": "TokenTransferredActivity", "type": "TRANSFERRED",
+                            "txHash": "0xc", "tokenId": "t1", "createdAt": T1})
+    assert service.refresh_token_activities("t1") == 1
+    assert service.refresh_token_activities("t1") == 0
+    assert sorted(it["txHash"] for it in service.get_token_history("t1", refresh=False)["items"]) == \
+        ["0xa", "0xb", "0xc"]
+
+
+def test_history_cursor_resumes_without_gaps_or_repeats(mongo):
+    client = FakeClient()
+    service = DomaTokenActivitiesService(client, mongo=mongo)
+    for i in range(5):
+        client.add(f"0x{i}", T0)
+    for i in range(5, 7):
+        client.add(f"0x{i}", T1)
+
+    seen = []
+    page = service.get_token_history("t1", take=3)
+    while True:
+        seen.extend(it["txHash"] for it in page["items"])
+        if page["nextCursor"] is None:
+            break
+        page = service.get_token_history("t1", cursor=page["nextCursor"], take=3)
+    assert sorted(seen) == [f"0x{i}" for i in range(7)]
+    assert len(seen) == 7
+    assert seen[:2] == ["0x6", "0x5"]
+    # Older pages come from the store only
+    assert client.calls == [0]
+
+
+def test_feed_events_queue_tokens_for_background_refresh(mongo):
+    client = FakeClient()
+    service = DomaTokenActivitiesService(client, mongo=mongo)
+    client.add("0x1", T0)
+
+    service.apply_event({"type": "NAME_TOKEN_TRANSFERRED", "eventData": {
+        "type": "NAME_TOKEN_TRANSFERRED", "networkId": "eip155:1", "finalized": True, "blockNumber": "1",
+        "tokenAddress": "0x2", "tokenId": "t1", "from": "0xa", "to": "0xb"}})
+    assert client.calls == []
+    assert service.refresh_stale() == 1
+    assert service.refresh_stale() == 0
+    assert client.calls == [0]
+    # Readers only touch the store
+    assert [it["txHash"] for it in service.get_token_history("t1", refresh=False)["items"]] == ["0x1"]
+    assert client.calls == [0]
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from executors import BoundedExecutor
+from metrics import MetricsRegistry
+from tracing import sample_loop_lag, traced
+
+
+class StopPropagation(Exception):
+    pass
+
+
+def test_handler_time_is_split_by_subsystem_and_errors_counted():
+    metrics = MetricsRegistry()
+    mongo = BoundedExecutor("mongo", max_workers=1, metrics=metrics)
+    doma = BoundedExecutor("doma", max_workers=1, metrics=metrics)
+
+    @traced(metrics)
+    async def page_owner(event):
+        await mongo.run(time.sleep, 0.02)
+        await doma.run(time.sleep, 0.05)
+        raise StopPropagation
+
+    @traced(metrics, name="broken")
+    async def handler(event):
+        raise KeyError("x")
+
+    async def scenario():
+        for fn in (page_owner, handler):
+            try:
+                await fn(None)
+            except (StopPropagation, KeyError):
+                pass
+
+    asyncio.run(scenario())
+    snap = metrics.snapshot()
+    assert snap['handler_seconds{handler="page_owner"}']["sum"] >= 0.07
+    assert snap['handler_subsystem_seconds{handler="page_owner",subsystem="doma"}']["sum"] >= 0.05
+    assert snap['handler_subsystem_seconds{handler="page_owner",subsystem="mongo"}']["sum"] >= 0.02
+    assert 'handler_errors_total{error="StopPropagation",handler="page_owner"}' not in snap
+    assert snap['handler_errors_total{error="KeyError",handler="broken"}'] == 1
+    mongo.shutdown()
+    doma.shutdown()
+
+
+def test_loop_lag_sampler_sees_blocking_code():
+    metrics = MetricsRegistry()
+
+    async def scenario():
+        sampler = asyncio.ensure_future(sample_loop_lag(metrics, interval=0.01))
+        await asyncio.sleep(0.005)
+        time.sleep(0.1)  # starve the loop
+        await asyncio.sleep(0.03)
+        sampler.cancel()
+
+    asyncio.run(scenario())
+    assert metrics.snapshot()["event_loop_lag"]["max"] >= 0.05
@@ -1,9 +1,34 @@
+from typing import Optional
+
+from lru_cache import LRUCache, MISSING
 from mongo import Mongo
 
 class TelegramUserManager:
-    def __init__(self, mongo: Mongo, collection: str = "telegram_users"):
+    def __init__(self, mongo: Mongo, collection: str = "telegram_users", cache: Optional[LRUCache] = None):
+        """
+        Parameters:
+        - mongo: Mongo wrapper holding the users collection.
+        - collection: Users collection name.
+        - cache: Optional write-through cache of user documents by user_id. The bot is the only writer
+          of profiles, so its own writes keep the cache current; the TTL bounds staleness otherwise.
+        """
         self.mongo = mongo
         self.collection = collection
+        self.cache = cache
+
+    def _cache_update(self, user_id: int, change) -> None:
+        if self.cache is None:
+            return
+        user = self.cache.get(user_id)
+        if user is MISSING:
+            return
+        if user is None:
+            # Known missing user; the next read finds the document
+            self.cache.pop(user_id)
+            return
+        user = dict(user)
+        change(user)
+        self.cache.put(user_id, user)
 
     def save_user(self,
                   user_id: int,
@@ -12,9 +37,7 @@ class TelegramUserManager:
                   first_name: str = None,
                   last_name: str = None):
         """Save a new user to MongoDB if not already existing."""
-        existing = self.mongo.find(self.collection, {"user_id": user_id})
-        existing_list = existing.to_list()
-        if len(existing_list) == 0:
+        if self.get_user(user_id) is None:
             user_data = {
                 "user_id": user_id,
                 "language": language,
@@ -23,41 +46,62 @@ class TelegramUserManager:
                 "last_name": last_name,
                 "subscriptions": []
             }
-            return self.mongo.insert(self.collection, user_data)
+            result = self.mongo.insert(self.collection, user_data)
+            if self.cache is not None:
+                self.cache.put(user_id, user_data)
+            return result
         return None
 
+    def cached_user(self, user_id: int):
+        """Cached user document (None for a known missing user), or MISSING when a read is needed."""
+        return self.cache.get(user_id) if self.cache is not None else MISSING
+
     def get_user(self, user_id: int):
-        """Retrieve user info from MongoDB."""
-        user_cursor = self.mongo.find(self.collection, {"user_id": user_id})
-        user_list = user_cursor.to_list()
-        if len(user_list) == 0:
-            return None
-        else:
-            return user_list[0]
+        """Retrieve user info, from the cache when possible, otherwise from MongoDB."""
+        user = self.cached_user(user_id)
+        if user is not MISSING:
+            return user
+        user = self.mongo.find_one(self.collection, {"user_id": user_id})
+        if self.cache is not None:
+            self.cache.put(user_id, user)
+        return user
 
     def update_user(self, user_id: int, update_data: dict):
         """Update user info in MongoDB."""
-        return self.mongo.update(self.collection, {"user_id": user_id}, {"$set": update_data})
+        result = self.mongo.update(self.collection, {"user_id": user_id}, {"$set": update_data})
+        self._cache_update(user_id, lambda user: user.update(update_data))
+        return result
 
     def add_subscription(self, user_id: int, event: str):
         """Add an event subscription for a user."""
-        return self.mongo.update(
+        result = self.mongo.update(
             self.collection,
             {"user_id": user_id},
             {"$addToSet": {"subscriptions": event}}
         )
 
+        def add(user):
+            subscriptions = list(user.get("subscriptions") or [])
+            if event not in subscriptions:
+                subscriptions.append(event)
+            user["subscriptions"] = subscriptions
+        self._cache_update(user_id, add)
+        return result
+
     def remove_subscription(self, user_id: int, event: str):
         """Remove an event subscription for a user."""
-        return self.mongo.update(
+        result = self.mongo.update(
             self.collection,
             {"user_id": user_id},
             {"$pull": {"subscriptions": event}}
         )
+        self._cache_update(user_id, lambda user: user.update(
+            subscriptions=[s for s in user.get("subscriptions") or [] if s != event]))
+        return result
 
     def list_subscriptions(self, user_id: int):
         """List all subscriptions of a user."""
-        user = self.mongo.find(self.collection, {"user_id": user_id})
-        for u in user:
-            return u.get("subscriptions", [])
-        return []
+        user = self.get_user(user_id)
+        if not user:
+            return []
+        return list(user.get("subscriptions", []))
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import MetricsRegistry
+
+__all__ = ["traced", "record_subsystem", "sample_loop_lag"]
+
+
+# Per-handler time spent waiting on each subsystem; set by traced(), filled by record_subsystem()
+_subsystem_times: ContextVar[Optional[Dict[str, float]]] = ContextVar("subsystem_times", default=None)
+
+# Exceptions Telethon uses for control flow rather than failures
+_CONTROL_FLOW = ("StopPropagation",)
+
+
+def record_subsystem(subsystem: str, seconds: float) -> None:
+    """Add time spent in a subsystem (mongo, doma, ai) to the handler being traced, if any."""
+    times = _subsystem_times.get()
+    if times is not None:
+        times[subsystem] = times.get(subsystem, 0.0) + seconds
+
+
+def traced(metrics: MetricsRegistry, name: Optional[str] = None):
+    """
+    Decorator for async event handlers recording calls, errors, wall time and per-subsystem time.
+
+    Parameters:
+    - metrics: Registry receiving handler_* metrics.
+    - name: Handler label; defaults to the function name.
+    """
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            times: Dict[str, float] = {}
+            token = _subsystem_times.set(times)
+            started = time.monotonic()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if type(e).__name__ not in _CONTROL_FLOW:
+                    metrics.inc("handler_errors_total", handler=label, error=type(e).__name__)
+                raise
+            finally:
+                _subsystem_times.reset(token)
+                metrics.inc("handler_calls_total", handler=label)
+                metrics.observe("handler_seconds", time.monotonic() - started, handler=label)
+                for subsystem, seconds in times.items():
+                    metrics.observe("handler_subsystem_seconds", seconds, handler=label, subsystem=subsystem)
+        return wrapper
+    return decorator
+
+
+async def sample_loop_lag(metrics: MetricsRegistry, interval: float = 0.5) -> None:
+    """
+    Measure how late the event loop wakes up from a sleep, forever.
+
+    A loop that is starved by blocking code shows up as a growing 'event_loop_lag_seconds'.
+    """
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.monotonic() - started - interval)
+        metrics.set_gauge("event_loop_lag_seconds", lag)
+        metrics.observe("event_loop_lag", lag)